@@ -15,6 +15,8 @@ from app.models.user import User
 from app.models.baby import Baby
 from app.models.activity import Activity
 from app.models.care_team import CareTeamMember
+from app.models.tombstone import Tombstone
+from app.models.rollup import ActivityDailyRollup
 
 config = context.config
 
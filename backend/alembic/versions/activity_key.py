@@ -0,0 +1,44 @@
+"""activity id key table
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Same as ACTIVITY_KEY_DDL in app.models.activity
+    op.create_table(
+        'activity_key',
+        sa.Column('id', sa.String(), primary_key=True)
+    )
+    # Fails on ids already duplicated since 006; resolve those rows first
+    op.execute("INSERT INTO activity_key (id) SELECT id FROM activity")
+    op.execute("""
+        CREATE FUNCTION activity_key_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO activity_key (id) VALUES (NEW.id);
+            ELSE
+                DELETE FROM activity_key WHERE id = OLD.id;
+            END IF;
+            RETURN NULL;
+        END $$
+    """)
+    op.execute(
+        "CREATE TRIGGER activity_key_sync AFTER INSERT OR DELETE ON activity "
+        "FOR EACH ROW EXECUTE FUNCTION activity_key_sync()"
+    )
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER activity_key_sync ON activity")
+    op.execute("DROP FUNCTION activity_key_sync()")
+    op.drop_table('activity_key')
@@ -0,0 +1,72 @@
+"""jsonb documents and activity metadata indexes
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+DOCUMENTS = [
+    ('activity', 'activity_metadata'),
+    ('baby', 'development_data'),
+    ('user', 'preferences'),
+    ('careteammember', 'permissions'),
+]
+
+# Same expressions as app.models.activity, so queries match them
+FEED_SIDE = "(activity_metadata ->> 'side')"
+# NULL unless amount_ml is a JSON number, so no stored value can fail the cast
+FEED_AMOUNT_ML = (
+    "(CASE WHEN jsonb_typeof(activity_metadata -> 'amount_ml') = 'number' "
+    "THEN CAST(activity_metadata ->> 'amount_ml' AS FLOAT) END)"
+)
+SLEEP_LOCATION = "(activity_metadata ->> 'location')"
+
+def upgrade() -> None:
+    for table, column in DOCUMENTS:
+        op.alter_column(
+            table, column,
+            type_=postgresql.JSONB(),
+            postgresql_using=f'{column}::jsonb'
+        )
+
+    op.create_index(
+        'idx_activity_metadata', 'activity', ['activity_metadata'],
+        postgresql_using='gin', postgresql_ops={'activity_metadata': 'jsonb_path_ops'}
+    )
+    op.create_index(
+        'idx_activity_feed_side', 'activity',
+        ['baby_id', sa.text(FEED_SIDE), 'start_time'],
+        postgresql_where=sa.text(f'{FEED_SIDE} IS NOT NULL')
+    )
+    op.create_index(
+        'idx_activity_feed_amount', 'activity',
+        ['baby_id', sa.text(FEED_AMOUNT_ML)],
+        postgresql_where=sa.text(f'{FEED_AMOUNT_ML} IS NOT NULL')
+    )
+    op.create_index(
+        'idx_activity_sleep_location', 'activity',
+        ['baby_id', sa.text(SLEEP_LOCATION), 'start_time'],
+        postgresql_where=sa.text(f'{SLEEP_LOCATION} IS NOT NULL')
+    )
+
+def downgrade() -> None:
+    op.drop_index('idx_activity_sleep_location', table_name='activity')
+    op.drop_index('idx_activity_feed_amount', table_name='activity')
+    op.drop_index('idx_activity_feed_side', table_name='activity')
+    op.drop_index('idx_activity_metadata', table_name='activity')
+    for table, column in DOCUMENTS:
+        op.alter_column(
+            table, column,
+            type_=sa.JSON(),
+            postgresql_using=f'{column}::json'
+        )
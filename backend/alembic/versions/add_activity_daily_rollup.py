@@ -0,0 +1,58 @@
+"""add activity daily rollup
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'activitydailyrollup',
+        sa.Column('baby_id', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        # The activitytype enum already exists from the activity table
+        sa.Column('type', postgresql.ENUM(name='activitytype', create_type=False), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('total_duration_seconds', sa.Float(), nullable=False),
+        sa.Column('total_amount_ml', sa.Float(), nullable=False),
+        sa.Column('first_start', sa.DateTime(), nullable=False),
+        sa.Column('last_start', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['baby_id'], ['baby.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('baby_id', 'day', 'type')
+    )
+
+    # Backfill from existing activities; same aggregation as RollupService
+    op.execute("""
+        INSERT INTO activitydailyrollup (
+            baby_id, day, type, count, total_duration_seconds, total_amount_ml,
+            first_start, last_start, created_at, updated_at
+        )
+        SELECT
+            baby_id,
+            CAST(start_time AS DATE),
+            type,
+            count(*),
+            coalesce(sum(extract(epoch FROM end_time - start_time)), 0),
+            coalesce(sum(CAST(activity_metadata ->> 'amount_ml' AS FLOAT)), 0),
+            min(start_time),
+            max(start_time),
+            now() AT TIME ZONE 'utc',
+            now() AT TIME ZONE 'utc'
+        FROM activity
+        GROUP BY baby_id, CAST(start_time AS DATE), type
+    """)
+
+def downgrade() -> None:
+    op.drop_table('activitydailyrollup')
@@ -0,0 +1,47 @@
+"""add delta sync tombstones and indexes
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'tombstone',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('entity_type', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.String(), nullable=False),
+        sa.Column('baby_id', sa.String(), nullable=True),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tombstone_id', 'tombstone', ['id'])
+    op.create_index('idx_tombstone_baby_updated', 'tombstone', ['baby_id', 'updated_at'])
+    op.create_index('idx_tombstone_user_updated', 'tombstone', ['user_id', 'updated_at'])
+
+    # Composite indexes for "changed since T" scans per baby
+    op.create_index('idx_activity_baby_updated', 'activity', ['baby_id', 'updated_at'])
+    op.create_index('idx_care_team_baby_updated', 'careteammember', ['baby_id', 'updated_at'])
+    op.create_index('idx_care_team_user', 'careteammember', ['user_id', 'baby_id'])
+    op.create_index('idx_baby_caregiver_updated', 'baby', ['primary_caregiver_id', 'updated_at'])
+
+def downgrade() -> None:
+    op.drop_index('idx_baby_caregiver_updated', table_name='baby')
+    op.drop_index('idx_care_team_user', table_name='careteammember')
+    op.drop_index('idx_care_team_baby_updated', table_name='careteammember')
+    op.drop_index('idx_activity_baby_updated', table_name='activity')
+    op.drop_index('idx_tombstone_user_updated', table_name='tombstone')
+    op.drop_index('idx_tombstone_baby_updated', table_name='tombstone')
+    op.drop_index('ix_tombstone_id', table_name='tombstone')
+    op.drop_table('tombstone')
@@ -0,0 +1,68 @@
+"""partition activity by month
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import settings
+from app.db.partitions import add_months, month_start, partition_name
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_activity_id', ['id']),
+    ('ix_activity_start_time', ['start_time']),
+    ('idx_activity_baby_time', ['baby_id', 'start_time']),
+    ('idx_activity_sync', ['sync_status', 'last_sync_attempt']),
+    ('idx_activity_baby_updated', ['baby_id', 'updated_at']),
+]
+
+def _rebuild_activity(partitioned: bool) -> None:
+    """Move activity's rows into a new table of the requested shape"""
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='activity')
+    op.execute("ALTER TABLE activity RENAME TO activity_old")
+    op.execute("ALTER TABLE activity_old RENAME CONSTRAINT activity_pkey TO activity_old_pkey")
+
+    partition_by = " PARTITION BY RANGE (start_time)" if partitioned else ""
+    op.execute(f"CREATE TABLE activity (LIKE activity_old INCLUDING DEFAULTS){partition_by}")
+    if partitioned:
+        op.execute("CREATE TABLE activity_default PARTITION OF activity DEFAULT")
+        oldest = op.get_bind().scalar(sa.text("SELECT min(start_time) FROM activity_old"))
+        current = month_start(datetime.utcnow())
+        month = month_start(oldest) if oldest is not None else current
+        last = add_months(current, settings.ACTIVITY_PARTITION_MONTHS_AHEAD)
+        while month <= last:
+            op.execute(
+                f"CREATE TABLE {partition_name(month)} PARTITION OF activity "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            )
+            month = add_months(month, 1)
+
+    # Same column order (LIKE), and indexes are built once after the copy
+    op.execute("INSERT INTO activity SELECT * FROM activity_old")
+    op.drop_table('activity_old')
+
+    # A partitioned table's unique keys must include the partition column
+    op.create_primary_key(
+        'activity_pkey', 'activity', ['id', 'start_time'] if partitioned else ['id']
+    )
+    op.create_foreign_key('activity_baby_id_fkey', 'activity', 'baby', ['baby_id'], ['id'])
+    op.create_foreign_key('activity_created_by_fkey', 'activity', 'user', ['created_by'], ['id'])
+    for name, columns in INDEXES:
+        op.create_index(name, 'activity', columns)
+
+def upgrade() -> None:
+    _rebuild_activity(partitioned=True)
+
+def downgrade() -> None:
+    # Months already archived (detached and dropped) are not restored
+    _rebuild_activity(partitioned=False)
@@ -1,9 +1,13 @@
-from typing import Generator, Annotated
-from fastapi import Depends, HTTPException, status, Header
+from typing import AsyncIterator, Generator, Annotated, Optional
+from fastapi import Depends, HTTPException, Query, status, Header
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer
 from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
+from app.core.etag import version_from_etag
+from app.core.principal_cache import Principal, principal_cache
+from app.core.token_revocation import token_revocations
+from app.db.routing import route_user, use_primary
 from app.db.session import get_db
 from app.services.factory import ServiceFactory
 from app.models.user import User
@@ -15,46 +19,135 @@ async def get_services(db: Annotated[AsyncSession, Depends(get_db)]) -> ServiceF
     """Dependency for getting service factory"""
     return ServiceFactory(db)
 
-async def get_current_user(
-    token: Annotated[str, Depends(security)],
+async def get_unit_of_work(
     services: Annotated[ServiceFactory, Depends(get_services)]
-) -> User:
-    """Dependency for getting current authenticated user"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        # Extract token from security dependency
-        token_str = token.credentials
-        
-        payload = jwt.decode(
-            token_str,
-            settings.SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
+) -> AsyncIterator[ServiceFactory]:
+    """Dependency for handlers whose writes should commit together.
+
+    Declare it with Depends(get_unit_of_work, scope="function") so the commit
+    happens before the response is sent and a failed commit becomes an error
+    response.
+    """
+    async with services.unit_of_work():
+        yield services
+
+class CursorParams:
+    """Query parameters for list endpoints that page with BaseService.get_page"""
+
+    def __init__(
+        self,
+        cursor: Annotated[Optional[str], Query(description="next_cursor or prev_cursor of a previous page")] = None,
+        limit: Annotated[int, Query(ge=1, le=200)] = 50
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+async def if_match_version(
+    if_match: Annotated[Optional[str], Header(description="ETag of the version being updated")] = None
+) -> Optional[int]:
+    """Dependency for updates: the version the client's If-Match ETag names.
+
+    Pass it to BaseService.update as expected_version; the write then only
+    applies if nobody else changed the record since the client read it, and
+    otherwise fails with 412. None without the header (or with `*`).
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    version = version_from_etag(if_match)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="If-Match must be a single ETag from this API"
         )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    except Exception:
-        raise credentials_exception
+    return version
+
+async def load_principal(
+    services: ServiceFactory,
+    user_id: str,
+    *,
+    min_token_version: int = 0
+) -> Optional[Principal]:
+    """The user's cached snapshot, loading and caching it on a miss.
+
+    A cached snapshot older than min_token_version (the token being checked
+    was issued after a change this worker has not heard about) is reloaded.
+    """
+    principal = await principal_cache.get(user_id)
+    if principal is not None and principal.token_version >= min_token_version:
+        return principal
 
+    # The snapshot is shared by every request until invalidated, so it must
+    # not come from a replica that has not seen the latest commit
+    use_primary(services.db)
     user = await services.user.get(user_id)
     if user is None:
-        raise credentials_exception
-    return user
+        return None
+    principal = Principal.from_user(user)
+    await principal_cache.set(principal)
+    return principal
+
+async def authenticate(services: ServiceFactory, token: str) -> Optional[Principal]:
+    """The principal an access token was issued to, or None when the token is
+    invalid, expired, a refresh token, of a revoked family, or issued before
+    the user's token_version changed"""
+    try:
+        claims = principal_cache.decode_claims(token)
+    except JWTError:
+        return None
+    except Exception:
+        return None
+    if claims.type != "access":
+        return None
+    if claims.family and await token_revocations.is_revoked(claims.family):
+        return None
+
+    await route_user(services.db, claims.sub)
+    principal = await load_principal(services, claims.sub, min_token_version=claims.version)
+    if principal is None or principal.token_version != claims.version:
+        return None
+    return principal
+
+async def get_current_user(
+    token: Annotated[str, Depends(security)],
+    services: Annotated[ServiceFactory, Depends(get_services)]
+) -> Principal:
+    """Dependency for getting current authenticated user.
+
+    Returns a cached snapshot (id, is_active, version); the database is only
+    queried when the snapshot is not cached. Use get_current_user_model when
+    the full User row is needed. Refresh tokens, tokens of a revoked family
+    and tokens issued before the user's token_version changed are rejected.
+    """
+    principal = await authenticate(services, token.credentials)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
 
 async def get_active_user(
-    current_user: Annotated[User, Depends(get_current_user)]
-) -> User:
+    current_user: Annotated[Principal, Depends(get_current_user)]
+) -> Principal:
     """Dependency for getting current active user"""
     if not current_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_user_model(
+    current_user: Annotated[Principal, Depends(get_active_user)],
+    services: Annotated[ServiceFactory, Depends(get_services)]
+) -> User:
+    """Dependency for handlers that need the full User row"""
+    user = await services.user.get(current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
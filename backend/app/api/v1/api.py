@@ -1,5 +1,9 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth
+from app.api.v1.endpoints import auth, export, realtime, summaries, sync
 
 api_router = APIRouter()
-api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
\ No newline at end of file
+api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
+api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
+api_router.include_router(summaries.router, prefix="/babies", tags=["summaries"])
+api_router.include_router(export.router, prefix="/babies", tags=["export"])
+api_router.include_router(realtime.router, prefix="/babies", tags=["realtime"])
\ No newline at end of file
@@ -1,24 +1,62 @@
 from datetime import timedelta
-from typing import Annotated
+from typing import Annotated, Optional
+import logging
+import time
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt, JWTError
+from pydantic import ValidationError
 from app.core.security import (
     create_access_token,
     create_refresh_token,
-    verify_password,
-    get_password_hash
+    new_token_id
 )
+from app.core.hashing import password_hasher
 from app.core.config import settings
-from app.schemas.auth import Token, Login, RefreshToken
+from app.core.token_revocation import token_revocations
+from app.models.user import User as UserModel
+from app.schemas.auth import Token, Login, RefreshToken, TokenPayload, ChangePassword
 from app.schemas.user import UserCreate, User, UserWithToken, UserInDB
-from app.api.deps import get_services
+from app.api.deps import get_services, get_current_user_model, load_principal
 from app.services.factory import ServiceFactory
-from fastapi.encoders import jsonable_encoder
+from app.core.serialization import to_schema
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def issue_tokens(user_id: str, token_version: int, family: Optional[str] = None) -> Token:
+    """An access and refresh token pair; a new family unless one is given"""
+    family = family or new_token_id()
+    return Token(
+        access_token=create_access_token(user_id, version=token_version, family=family),
+        refresh_token=create_refresh_token(user_id, version=token_version, family=family),
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60  # Convert to seconds
+    )
+
+def decode_refresh_token(token: str) -> TokenPayload:
+    """Verify a refresh token, raising 401 if it is not one"""
+    try:
+        payload = TokenPayload(**jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.JWT_ALGORITHM]
+        ))
+    except (JWTError, ValidationError):
+        payload = None
+    # Tokens issued before rotation have no jti and cannot be rotated
+    if payload is None or payload.type != "refresh" or not payload.jti or not payload.fam:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+    return payload
+
+def family_expiry() -> float:
+    # A family lives until the last token rotated into it expires
+    return time.time() + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+
 @router.post("/register", response_model=UserWithToken)
 async def register(
     user_in: UserCreate,
@@ -48,22 +86,20 @@ async def register(
         "full_name": user_in.full_name,
         "is_active": True,
         "preferences": user_in.preferences or {},
-        "hashed_password": get_password_hash(user_in.password)
+        "hashed_password": await password_hasher.hash(user_in.password)
     }
     
     # Create user
     user = await services.user.create(user_data)
     
     # Generate tokens
-    access_token = create_access_token(user.id)
-    refresh_token = create_refresh_token(user.id)
+    tokens = issue_tokens(user.id, user.token_version)
     
-    # Convert SQLAlchemy model to dictionary and add tokens
-    user_data = jsonable_encoder(user)
+    # Convert the ORM row field by field and add tokens
     return UserWithToken(
-        **user_data,
-        access_token=access_token,
-        refresh_token=refresh_token
+        **dict(to_schema(User, user)),
+        access_token=tokens.access_token,
+        refresh_token=tokens.refresh_token
     )
 
 @router.post("/login", response_model=Token)
@@ -80,18 +116,14 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not verify_password(form_data.password, user.hashed_password):
+    if not await password_hasher.verify(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return Token(
-        access_token=create_access_token(user.id),
-        refresh_token=create_refresh_token(user.id),
-        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60  # Convert to seconds
-    )
+    return issue_tokens(user.id, user.token_version)
 
 @router.post("/login/access-token", response_model=Token)
 async def login_access_token(
@@ -106,51 +138,73 @@ async def login_access_token(
             detail="Incorrect email or password"
         )
     
-    if not verify_password(login_data.password, user.hashed_password):
+    if not await password_hasher.verify(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
-    return Token(
-        access_token=create_access_token(user.id),
-        refresh_token=create_refresh_token(user.id),
-        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60  # Convert to seconds
-    )
+    return issue_tokens(user.id, user.token_version)
 
 @router.post("/refresh-token", response_model=Token)
 async def refresh_access_token(
     refresh_token: RefreshToken,
     services: Annotated[ServiceFactory, Depends(get_services)]
 ) -> Token:
-    """Get a new access token using refresh token"""
-    try:
-        payload = jwt.decode(
-            refresh_token.refresh_token,
-            settings.SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid refresh token"
-            )
-    except JWTError:
+    """Exchange a refresh token for a new access token and refresh token.
+
+    Refresh tokens are single use. Presenting one that was already exchanged
+    means it was copied, so its whole family is revoked and the device has
+    to log in again.
+    """
+    payload = decode_refresh_token(refresh_token.refresh_token)
+    if await token_revocations.is_revoked(payload.fam, exact=True):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token"
         )
-    
-    user = await services.user.get(user_id)
-    if not user:
+
+    principal = await load_principal(services, payload.sub, min_token_version=payload.version)
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
-    
-    return Token(
-        access_token=create_access_token(user.id),
-        refresh_token=create_refresh_token(user.id),
-        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60  # Convert to seconds
-    )
\ No newline at end of file
+    if not principal.is_active or principal.token_version != payload.version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+
+    if not await token_revocations.claim(payload.jti, payload.exp):
+        logger.warning("Refresh token reuse for user %s, revoking family %s", payload.sub, payload.fam)
+        await token_revocations.revoke(payload.fam, family_expiry())
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+
+    return issue_tokens(principal.id, principal.token_version, family=payload.fam)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(refresh_token: RefreshToken) -> Response:
+    """Revoke the refresh token's family and the access tokens issued with it"""
+    payload = decode_refresh_token(refresh_token.refresh_token)
+    await token_revocations.revoke(payload.fam, family_expiry())
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/change-password", response_model=Token)
+async def change_password(
+    password_in: ChangePassword,
+    current_user: Annotated[UserModel, Depends(get_current_user_model)],
+    services: Annotated[ServiceFactory, Depends(get_services)]
+) -> Token:
+    """Change the password; every other session is logged out and this one
+    gets a new token pair"""
+    if not await password_hasher.verify(password_in.current_password, current_user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Incorrect password"
+        )
+    user = await services.user.change_password(user=current_user, new_password=password_in.new_password)
+    return issue_tokens(user.id, user.token_version)
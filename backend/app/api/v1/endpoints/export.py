@@ -0,0 +1,93 @@
+from datetime import datetime
+from enum import Enum
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from app.api.deps import get_services, get_active_user
+from app.core.etag import is_not_modified, not_modified, set_validators
+from app.core.principal_cache import Principal
+from app.models.enums import ActivityType
+from app.services.export import encode_csv, encode_ndjson, gzip_stream
+from app.services.factory import ServiceFactory
+from app.services.filters import ActivityFilter
+
+router = APIRouter()
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+@router.get("/{baby_id}/activities/export")
+async def export_activities(
+    baby_id: str,
+    request: Request,
+    current_user: Annotated[Principal, Depends(get_active_user)],
+    services: Annotated[ServiceFactory, Depends(get_services)],
+    format: ExportFormat = ExportFormat.NDJSON,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    type: Annotated[Optional[list[ActivityType]], Query()] = None,
+    feed_side: Optional[str] = None,
+    min_amount_ml: Annotated[Optional[float], Query(ge=0)] = None,
+    max_amount_ml: Annotated[Optional[float], Query(ge=0)] = None,
+    sleep_location: Optional[str] = None,
+    compress: bool = False
+) -> Response:
+    """Stream the baby's full activity history, oldest first.
+
+    Filter with `start` <= start_time < `end`, one or more `type`s, and the
+    feed side, feed amount range or sleep location (which imply the type).
+    With `compress` the body is a gzip file. Rows are encoded as they are
+    read from the database, so the export can be any length. Responses
+    carry an ETag and Last-Modified; a matching If-None-Match or
+    If-Modified-Since gets 304 without the history being read.
+    """
+    if start is not None and end is not None and start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+    if min_amount_ml is not None and max_amount_ml is not None and min_amount_ml > max_amount_ml:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_amount_ml must not be more than max_amount_ml"
+        )
+
+    if baby_id not in await services.access.accessible_baby_ids(current_user.id, [baby_id]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Baby not found"
+        )
+
+    filter = ActivityFilter(
+        start=start,
+        end=end,
+        types=type,
+        feed_side=feed_side,
+        min_amount_ml=min_amount_ml,
+        max_amount_ml=max_amount_ml,
+        sleep_location=sleep_location
+    )
+    validator = await services.export.validator(baby_id=baby_id, filter=filter)
+    if is_not_modified(request, validator):
+        return not_modified(validator)
+
+    rows = services.export.activities(baby_id=baby_id, filter=filter)
+    body = encode_csv(rows) if format == ExportFormat.CSV else encode_ndjson(rows)
+    media_type = MEDIA_TYPES[format]
+    filename = f"activities-{baby_id}.{format.value}"
+    if compress:
+        body = gzip_stream(body)
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    return set_validators(StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    ), validator)
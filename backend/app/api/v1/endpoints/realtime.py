@@ -0,0 +1,98 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from app.api.deps import authenticate
+from app.core.change_feed import TooManySubscribers, change_feed
+from app.core.config import settings
+from app.core.principal_cache import Principal
+from app.core.serialization import dumps
+from app.db.session import AsyncSessionLocal
+from app.services.factory import ServiceFactory
+
+router = APIRouter()
+
+PING = {"type": "ping"}
+
+def _token(websocket: WebSocket) -> Optional[str]:
+    # Browsers cannot set headers on a WebSocket handshake, so the access
+    # token may also come as ?token=
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:]
+    return websocket.query_params.get("token")
+
+async def _authorize(token: Optional[str], baby_id: str) -> Optional[Principal]:
+    """The user if the token is valid and they are on the baby's care team.
+
+    Uses a session of its own so no connection is held while subscribed;
+    with the principal cache and access index warm it runs no queries.
+    """
+    if not token:
+        return None
+    async with AsyncSessionLocal() as db:
+        services = ServiceFactory(db)
+        principal = await authenticate(services, token)
+        if principal is None or not principal.is_active:
+            return None
+        if baby_id not in await services.access.accessible_baby_ids(principal.id, [baby_id]):
+            return None
+        return principal
+
+async def _wait_closed(websocket: WebSocket) -> None:
+    # Clients have nothing to send; reading is how a disconnect is noticed
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+
+@router.websocket("/{baby_id}/events")
+async def baby_events(websocket: WebSocket, baby_id: str) -> None:
+    """Push the baby's activity and baby changes as they are committed.
+
+    Messages are JSON: {"type": "change", "entity", "op", "baby_id", "id",
+    "version", "data"} per change, {"type": "ping"} every
+    REALTIME_HEARTBEAT_SECONDS, and {"type": "resync"} when the connection
+    fell behind and events were dropped; the client then catches up with
+    /sync/changes. Access is checked again at every ping, and the socket is
+    closed (1008) once the token expires or the user leaves the care team.
+    """
+    token = _token(websocket)
+    if await _authorize(token, baby_id) is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    try:
+        subscriber = change_feed.subscribe(baby_id)
+    except TooManySubscribers:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    closed = asyncio.create_task(_wait_closed(websocket))
+    event: Optional[asyncio.Future] = None
+    try:
+        while not closed.done():
+            event = asyncio.ensure_future(subscriber.get())
+            done, _ = await asyncio.wait(
+                {event, closed},
+                timeout=settings.REALTIME_HEARTBEAT_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if event in done:
+                await websocket.send_text(dumps(event.result()).decode())
+                continue
+            event.cancel()
+            if closed.done():
+                break
+            if await _authorize(token, baby_id) is None:
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                break
+            await websocket.send_text(dumps(PING).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        change_feed.unsubscribe(subscriber)
+        closed.cancel()
+        if event is not None:
+            event.cancel()
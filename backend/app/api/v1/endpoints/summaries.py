@@ -0,0 +1,40 @@
+from datetime import date, datetime, timedelta
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import Response
+from app.api.deps import get_services, get_active_user
+from app.core.principal_cache import Principal
+from app.core.serialization import model_response
+from app.schemas.rollup import ActivitySummary
+from app.services.factory import ServiceFactory
+
+router = APIRouter()
+
+@router.get("/{baby_id}/summary", response_model=ActivitySummary)
+async def get_activity_summary(
+    baby_id: str,
+    current_user: Annotated[Principal, Depends(get_active_user)],
+    services: Annotated[ServiceFactory, Depends(get_services)],
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> Response:
+    """Sleep, feed and diaper totals per day (UTC) for a date range.
+
+    Defaults to the last 7 days including today.
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=6)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+
+    if baby_id not in await services.access.accessible_baby_ids(current_user.id, [baby_id]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Baby not found"
+        )
+
+    summary = await services.rollup.summary(baby_id=baby_id, start=start, end=end)
+    return model_response(ActivitySummary, summary)
@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Annotated, AsyncIterator, Optional
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response, StreamingResponse
+from app.api.deps import get_services, get_active_user
+from app.core.principal_cache import Principal
+from app.core.serialization import dumps, model_response
+from app.schemas.sync import ActivitySyncBatch, ActivitySyncResponse
+from app.services.factory import ServiceFactory
+
+router = APIRouter()
+
+@router.post("/activities", response_model=ActivitySyncResponse)
+async def upload_activities(
+    batch: ActivitySyncBatch,
+    current_user: Annotated[Principal, Depends(get_active_user)],
+    services: Annotated[ServiceFactory, Depends(get_services)]
+) -> Response:
+    """Upload a batch of activities recorded offline"""
+    result = await services.sync.upload_activities(
+        user_id=current_user.id,
+        items=batch.activities
+    )
+    return model_response(ActivitySyncResponse, result)
+
+@router.get("/changes")
+async def get_changes(
+    current_user: Annotated[Principal, Depends(get_active_user)],
+    services: Annotated[ServiceFactory, Depends(get_services)],
+    since: Optional[datetime] = None
+) -> StreamingResponse:
+    """Stream everything that changed for the user since `since` as NDJSON.
+
+    Each line is either a chunk `{"entity": ..., "items": [...]}` or, last,
+    `{"high_water_mark": ...}`. Deleted rows arrive as `tombstone` items.
+    The high-water mark is stored as the user's last_sync and should be sent
+    back as `since` on the next call.
+    """
+    until = services.delta.high_water_mark()
+
+    async def body() -> AsyncIterator[bytes]:
+        async for chunk in services.delta.changes_since(
+            user_id=current_user.id,
+            since=since,
+            until=until
+        ):
+            line = {"entity": chunk.entity, "items": chunk.items}
+            yield dumps(line) + b"\n"
+
+        await services.user.update_last_sync(user_id=current_user.id, last_sync=until)
+        yield dumps({"high_water_mark": until}) + b"\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
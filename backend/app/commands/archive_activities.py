@@ -0,0 +1,81 @@
+"""Archive old activity months (Postgres).
+
+Each month partition that ended more than ACTIVITY_ARCHIVE_AFTER_MONTHS ago
+is detached from activity, copied to <archive dir>/activity_pYYYY_MM.csv.gz
+and dropped. Daily rollups are kept, so summaries still cover archived
+months. Usage (from the backend directory):
+
+    python -m app.commands.archive_activities [--older-than-months N] [--archive-dir DIR] [--keep-tables] [--dry-run]
+
+Restore a month by creating its partition again and loading the file:
+
+    gunzip -c activity_p2024_01.csv.gz | psql -c "\\copy activity FROM STDIN WITH (FORMAT csv, HEADER)"
+"""
+import argparse
+import asyncio
+import gzip
+import os
+from datetime import datetime
+from app.core.config import settings
+from app.db import session
+from app.db.partitions import add_months, detach_partition, list_partitions, month_start
+
+async def dump_table(conn, name: str, path: str) -> int:
+    """COPY a table to a gzipped CSV file; returns the rows written"""
+    raw = await conn.get_raw_connection()
+    partial = path + ".partial"
+    with gzip.open(partial, "wb") as out:
+        async def write(chunk: bytes) -> None:
+            out.write(chunk)
+
+        status = await raw.driver_connection.copy_from_table(
+            name, output=write, format="csv", header=True
+        )
+    os.replace(partial, path)
+    return int(status.split()[-1])
+
+async def archive(older_than_months: int, archive_dir: str, keep_tables: bool, dry_run: bool) -> None:
+    engine = session.init_engine()
+    try:
+        cutoff = add_months(month_start(datetime.utcnow()), -older_than_months)
+        async with engine.connect() as conn:
+            partitions = [
+                p for p in await list_partitions(conn)
+                if p.end is not None and p.end <= cutoff
+            ]
+        if not partitions:
+            print(f"No activity partitions end before {cutoff:%Y-%m-%d}")
+            return
+
+        os.makedirs(archive_dir, exist_ok=True)
+        for partition in partitions:
+            path = os.path.join(archive_dir, f"{partition.name}.csv.gz")
+            if dry_run:
+                print(f"would archive {partition.name} to {path}")
+                continue
+            # Detach in its own transaction so the parent is only locked briefly
+            async with engine.begin() as conn:
+                await detach_partition(conn, partition.name)
+            async with engine.connect() as conn:
+                rows = await dump_table(conn, partition.name, path)
+                if not keep_tables:
+                    await conn.exec_driver_sql(f"DROP TABLE {partition.name}")
+                    await conn.commit()
+            print(f"archived {partition.name}: {rows} rows to {path} ({os.path.getsize(path)} bytes)")
+    finally:
+        await session.dispose_engine()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive old activity partitions")
+    parser.add_argument(
+        "--older-than-months", type=int, default=settings.ACTIVITY_ARCHIVE_AFTER_MONTHS,
+        help="Archive months that ended at least this many months ago"
+    )
+    parser.add_argument("--archive-dir", default=settings.ACTIVITY_ARCHIVE_DIR)
+    parser.add_argument("--keep-tables", action="store_true", help="Detach and dump, but do not drop")
+    parser.add_argument("--dry-run", action="store_true", help="Only list what would be archived")
+    args = parser.parse_args()
+    asyncio.run(archive(args.older_than_months, args.archive_dir, args.keep_tables, args.dry_run))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Rebuild activity daily rollups from raw activities.
+
+Usage (from the backend directory):
+
+    python -m app.commands.rebuild_rollups [--baby-id ID] [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+import argparse
+import asyncio
+from datetime import date
+from app.db.session import AsyncSessionLocal, init_engine, dispose_engine
+from app.services.rollup import RollupService
+
+async def rebuild(baby_id: str | None, start: date | None, end: date | None) -> None:
+    init_engine()
+    try:
+        async with AsyncSessionLocal() as session:
+            await RollupService(session).rebuild(baby_id=baby_id, start=start, end=end)
+    finally:
+        await dispose_engine()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild activity daily rollups")
+    parser.add_argument("--baby-id", help="Only rebuild this baby's rollups")
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to rebuild (UTC)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day to rebuild (UTC)")
+    args = parser.parse_args()
+    asyncio.run(rebuild(args.baby_id, args.start, args.end))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from app.core.cache import TTLCache
+from app.core.config import Settings, settings
+from app.core.redis_client import get_redis, supervise
+from app.models.enums import CareTeamRole
+
+logger = logging.getLogger(__name__)
+
+ALL_PERMISSIONS = "*"
+
+@dataclass(frozen=True, slots=True)
+class BabyAccess:
+    role: CareTeamRole
+    permissions: frozenset[str]
+    version: int
+
+    def allows(self, permission: str) -> bool:
+        return ALL_PERMISSIONS in self.permissions or permission in self.permissions
+
+UserAccess = dict[str, BabyAccess]
+
+class AccessIndex:
+    """Per-process map of user_id -> {baby_id: BabyAccess}.
+
+    Entries are loaded lazily by AccessService and dropped when a care team
+    or baby write commits. With Redis enabled, invalidations are published so
+    every worker drops its copy; the TTL bounds staleness if a message is lost.
+    """
+
+    channel = "access-index:invalidate"
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._users: TTLCache[str, UserAccess] = TTLCache(maxsize, ttl, on_evict=self._forget)
+        # baby_id -> users whose cached entry mentions it, kept in step with
+        # _users as entries are evicted or expire
+        self._baby_users: dict[str, set[str]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        # Set once the listener has subscribed; a later subscribe is a
+        # reconnect that may have missed invalidations
+        self._subscribed = False
+
+    def configure(self, settings: Settings) -> None:
+        """Apply the size and TTL of an app's settings, dropping what is cached"""
+        self._users = TTLCache(
+            settings.ACCESS_INDEX_SIZE,
+            settings.ACCESS_INDEX_TTL_SECONDS,
+            on_evict=self._forget
+        )
+        self._baby_users.clear()
+
+    def _forget(self, user_id: str, access: UserAccess) -> None:
+        for baby_id in access:
+            users = self._baby_users.get(baby_id)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._baby_users[baby_id]
+
+    def get(self, user_id: str) -> Optional[UserAccess]:
+        return self._users.get(user_id)
+
+    def set(self, user_id: str, access: UserAccess) -> None:
+        if self._users.maxsize <= 0 or self._users.ttl <= 0:
+            # Caching is off; nothing would ever evict the reverse entries
+            return
+        self._users.set(user_id, access)
+        for baby_id in access:
+            self._baby_users.setdefault(baby_id, set()).add(user_id)
+
+    def _drop_user(self, user_id: str, baby_id: Optional[str] = None, version: int = 0) -> None:
+        access = self._users.get(user_id)
+        if access is None:
+            return
+        current = access.get(baby_id) if baby_id else None
+        # An older or duplicate message must not evict a newer entry
+        if current is not None and current.version > version:
+            return
+        self._users.pop(user_id)
+
+    def _drop_baby(self, baby_id: str) -> None:
+        for user_id in list(self._baby_users.get(baby_id, ())):
+            self._users.pop(user_id)
+
+    def apply(self, message: dict) -> None:
+        """Apply an invalidation message locally"""
+        if message.get("baby_id") and message.get("all_users"):
+            self._drop_baby(message["baby_id"])
+        if message.get("user_id"):
+            self._drop_user(message["user_id"], message.get("baby_id"), message.get("version", 0))
+
+    async def invalidate(self, messages: Iterable[dict]) -> None:
+        """Invalidate locally and broadcast to the other workers.
+
+        Each message has a user_id and/or a baby_id; `all_users` drops every
+        user with access to the baby, and `version` is the written row's
+        version so stale messages are ignored.
+        """
+        messages = list(messages)
+        for message in messages:
+            self.apply(message)
+
+        redis = get_redis()
+        if redis is None or not messages:
+            return
+        try:
+            await redis.publish(self.channel, json.dumps(messages))
+        except Exception:
+            logger.warning("Access index invalidation publish failed", exc_info=True)
+
+    async def _listen(self) -> None:
+        redis = get_redis()
+        pubsub = redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        if self._subscribed:
+            # Invalidations sent while disconnected are gone; reload everything
+            self.clear()
+        self._subscribed = True
+        try:
+            async for raw in pubsub.listen():
+                if raw.get("type") != "message":
+                    continue
+                try:
+                    for message in json.loads(raw["data"]):
+                        self.apply(message)
+                except Exception:
+                    logger.warning("Bad access index invalidation message", exc_info=True)
+        finally:
+            await pubsub.aclose()
+
+    def start_listener(self) -> None:
+        """Subscribe to invalidations from other workers when Redis is enabled"""
+        if get_redis() is not None and self._listener is None:
+            self._listener = asyncio.create_task(supervise("Access index", self._listen))
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._subscribed = False
+
+    def clear(self) -> None:
+        self._users.clear()
+        self._baby_users.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {**self._users.stats(), "babies": len(self._baby_users)}
+
+access_index = AccessIndex(
+    maxsize=settings.ACCESS_INDEX_SIZE,
+    ttl=settings.ACCESS_INDEX_TTL_SECONDS
+)
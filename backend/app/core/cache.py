@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+from typing import Generic, TypeVar, Hashable, Optional, Callable
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+class TTLCache(Generic[K, V]):
+    """Bounded in-process LRU cache whose entries expire after a TTL.
+
+    `on_evict(key, value)` is called whenever an entry leaves the cache other
+    than through clear(): evicted, expired, replaced or popped.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+        on_evict: Optional[Callable[[K, V], None]] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._on_evict = on_evict
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> Optional[V]:
+        """Get a value, counting the lookup as a hit or a miss"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.misses += 1
+            if self._on_evict is not None:
+                self._on_evict(key, value)
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        if ttl is None:
+            ttl = self.ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        if self._on_evict is not None:
+            self.pop(key)
+        self._data[key] = (self._clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted, (_, old) = self._data.popitem(last=False)
+            if self._on_evict is not None:
+                self._on_evict(evicted, old)
+
+    def pop(self, key: K) -> Optional[V]:
+        """Remove a value and return it if it was present"""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return None
+        if self._on_evict is not None:
+            self._on_evict(key, entry[1])
+        return entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
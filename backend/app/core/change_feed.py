@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from typing import Iterable, Optional
+import orjson
+from app.core.config import Settings, settings
+from app.core.metrics import realtime_connections, realtime_events, realtime_resyncs
+from app.core.redis_client import get_redis, supervise
+from app.core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Sent in place of the events a slow subscriber could not keep up with; the
+# client catches up through delta sync
+RESYNC = {"type": "resync"}
+
+class TooManySubscribers(Exception):
+    """The worker already holds REALTIME_MAX_CONNECTIONS subscriptions"""
+
+class Subscriber:
+    """One connection's bounded queue of change events for a baby"""
+
+    def __init__(self, baby_id: str, maxsize: int):
+        self.baby_id = baby_id
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize)
+
+    def offer(self, event: dict) -> None:
+        """Queue an event without ever waiting on the consumer.
+
+        When the queue is full its events are replaced by a single RESYNC,
+        so a slow connection costs bounded memory and never delays delivery
+        to the others.
+        """
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC)
+            realtime_resyncs.inc()
+
+    async def get(self) -> dict:
+        return await self._queue.get()
+
+class ChangeFeed:
+    """Per-process fan-out of change events to subscribed connections.
+
+    Events are dicts with at least a baby_id. With Redis enabled, publish()
+    goes through a channel every worker listens on, and each worker delivers
+    to its own subscribers; without Redis the feed is an in-process broker
+    (tests, a single worker) and delivers directly.
+    """
+
+    channel = "change-feed"
+
+    def __init__(self, max_subscribers: int, queue_size: int):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[Subscriber]] = {}
+        self._count = 0
+        self._listener: Optional[asyncio.Task] = None
+        # Set once the listener has subscribed; a later subscribe is a
+        # reconnect that may have missed events
+        self._subscribed = False
+
+    def configure(self, settings: Settings) -> None:
+        """Apply the limits of an app's settings to new subscriptions"""
+        self.max_subscribers = settings.REALTIME_MAX_CONNECTIONS
+        self.queue_size = settings.REALTIME_QUEUE_SIZE
+
+    def subscribe(self, baby_id: str) -> Subscriber:
+        if self._count >= self.max_subscribers:
+            raise TooManySubscribers(f"{self._count} subscriptions open on this worker")
+        subscriber = Subscriber(baby_id, self.queue_size)
+        self._subscribers.setdefault(baby_id, set()).add(subscriber)
+        self._count += 1
+        realtime_connections.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.baby_id)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[subscriber.baby_id]
+        self._count -= 1
+        realtime_connections.dec()
+
+    def deliver(self, events: Iterable[dict]) -> None:
+        """Hand events to this worker's subscribers"""
+        for event in events:
+            realtime_events.inc()
+            for subscriber in list(self._subscribers.get(event["baby_id"], ())):
+                subscriber.offer(event)
+
+    async def publish(self, events: Iterable[dict]) -> None:
+        """Deliver events to subscribers on every worker"""
+        events = list(events)
+        if not events:
+            return
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.publish(self.channel, dumps(events))
+                return
+            except Exception:
+                logger.warning("Change feed publish failed, delivering locally", exc_info=True)
+        self.deliver(events)
+
+    def _resync_all(self) -> None:
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                subscriber.offer(RESYNC)
+
+    async def _listen(self) -> None:
+        redis = get_redis()
+        pubsub = redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        if self._subscribed:
+            # Events published while disconnected are gone; have every
+            # client catch up through delta sync
+            self._resync_all()
+        self._subscribed = True
+        try:
+            async for raw in pubsub.listen():
+                if raw.get("type") != "message":
+                    continue
+                try:
+                    self.deliver(orjson.loads(raw["data"]))
+                except Exception:
+                    logger.warning("Bad change feed message", exc_info=True)
+        finally:
+            await pubsub.aclose()
+
+    def start_listener(self) -> None:
+        """Receive events published by every worker when Redis is enabled"""
+        if get_redis() is not None and self._listener is None:
+            self._listener = asyncio.create_task(supervise("Change feed", self._listen))
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._subscribed = False
+
+    def stats(self) -> dict[str, int]:
+        return {"subscribers": self._count, "babies": len(self._subscribers)}
+
+change_feed = ChangeFeed(
+    max_subscribers=settings.REALTIME_MAX_CONNECTIONS,
+    queue_size=settings.REALTIME_QUEUE_SIZE
+)
@@ -41,19 +41,138 @@ class Settings(BaseSettings):
             return v
         return f"postgresql://{values.get('POSTGRES_USER')}:{values.get('POSTGRES_PASSWORD')}@{values.get('POSTGRES_SERVER')}/{values.get('POSTGRES_DB')}"
 
+    # Read replicas (async URLs, same schema as the primary). Request sessions
+    # read from them; writes, and a user's reads for REPLICA_STICKY_SECONDS
+    # after they write, go to the primary.
+    SQLALCHEMY_REPLICA_URIS: List[str] = []
+    REPLICA_STICKY_SECONDS: float = 5.0
+
+    @validator("SQLALCHEMY_REPLICA_URIS", pre=True)
+    def assemble_replica_uris(cls, v: str | List[str]) -> List[str]:
+        if isinstance(v, str) and not v.startswith("["):
+            return [i.strip() for i in v.split(",") if i.strip()]
+        return v
+
+    # Database pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    # Seconds a request waits for a free connection before failing with 503
+    DB_POOL_TIMEOUT: float = 5.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Prepared statements cached per connection (asyncpg)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Behind PgBouncer in transaction mode: no app-side pool, no cached
+    # prepared statements
+    DB_PGBOUNCER: bool = False
+
+    # Activity partitions (Postgres): monthly partitions kept created this
+    # many months ahead, checked at startup and every
+    # ACTIVITY_PARTITION_CHECK_HOURS (0 disables)
+    ACTIVITY_PARTITION_MONTHS_AHEAD: int = 3
+    ACTIVITY_PARTITION_CHECK_HOURS: float = 6
+    # Months kept attached before archive_activities detaches and dumps them
+    ACTIVITY_ARCHIVE_AFTER_MONTHS: int = 24
+    ACTIVITY_ARCHIVE_DIR: str = "archive"
+
     # Redis
     REDIS_HOST: str
     REDIS_PORT: int = 6379
+    REDIS_ENABLED: bool = False
 
     # JWT
     SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Revoked refresh token families held in each worker's Bloom filter
+    TOKEN_REVOCATION_CAPACITY: int = 100000
+    TOKEN_REVOCATION_ERROR_RATE: float = 0.001
+    # How long startup waits for the filter to load before serving anyway;
+    # until it has, every check goes to Redis
+    TOKEN_REVOCATION_LOAD_TIMEOUT_SECONDS: float = 10
+
+    # Principal cache (authenticated user snapshots)
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_REDIS_TTL_SECONDS: int = 300
+    TOKEN_CACHE_SIZE: int = 10000
+
+    # Sync retry worker
+    SYNC_RETRY_WORKER_ENABLED: bool = False
+    SYNC_RETRY_INTERVAL_SECONDS: float = 5
+    SYNC_RETRY_BATCH_SIZE: int = 100
+    SYNC_RETRY_CONCURRENCY: int = 4
+    SYNC_RETRY_BASE_DELAY_SECONDS: int = 10
+    SYNC_RETRY_MAX_DELAY_SECONDS: int = 3600
+    SYNC_RETRY_MAX_ATTEMPTS: int = 10
+
+    # Care team access index
+    ACCESS_INDEX_SIZE: int = 10000
+    ACCESS_INDEX_TTL_SECONDS: int = 300
+
+    # Password hashing worker pool
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_HASH_USE_PROCESSES: bool = False
+
+    # Metrics
+    METRICS_ENABLED: bool = True
+
+    # Query diagnostics
+    # Log statements slower than this with their plan; 0 disables
+    SLOW_QUERY_MS: int = 500
+    SLOW_QUERY_EXPLAIN: bool = True
+    # Log the slow statement's parameter values, not just their types; they
+    # can hold personal data and secrets, so keep this off in production
+    SLOW_QUERY_LOG_PARAMETERS: bool = False
+    # Count statements per request and report N+1 patterns
+    QUERY_DIAGNOSTICS_ENABLED: bool = False
+    N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Startup
+    # Connections each worker opens before serving its first request
+    DB_WARMUP_CONNECTIONS: int = 5
+    # Load the access index for this many most recently synced users
+    STARTUP_PRIME_USERS: int = 0
 
     # API Settings
     MAX_SYNC_BATCH_SIZE: int = 100
     RATE_LIMIT_PER_MINUTE: int = 100
+    RATE_LIMIT_ENABLED: bool = True
+    # Stricter limit for login, registration and token refresh, per client IP
+    RATE_LIMIT_AUTH_PER_MINUTE: int = 10
+    # Only enable behind a proxy that sets X-Forwarded-For
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+
+    @validator("RATE_LIMIT_PER_MINUTE", "RATE_LIMIT_AUTH_PER_MINUTE")
+    def require_positive_limit(cls, v: int) -> int:
+        if v <= 0:
+            raise ValueError("must be positive; set RATE_LIMIT_ENABLED=false to turn limiting off")
+        return v
+
+    # Delta sync
+    DELTA_SYNC_CHUNK_SIZE: int = 500
+    # Rows changed within this many seconds of a request wait for the next sync,
+    # so transactions still committing are not skipped by the high-water mark
+    DELTA_SYNC_SAFETY_SECONDS: int = 5
+
+    # Realtime change feed (WebSocket subscriptions per baby)
+    REALTIME_MAX_CONNECTIONS: int = 1000
+    # Events queued per connection before it is told to resync instead
+    REALTIME_QUEUE_SIZE: int = 100
+    # Ping interval, and how often a connection's access is checked again
+    REALTIME_HEARTBEAT_SECONDS: float = 30
+
+    # Write-behind buffer for bookkeeping columns such as User.last_sync;
+    # 0 writes them immediately
+    WRITE_BEHIND_FLUSH_MS: int = 500
+    # Rows buffered before a write forces a flush
+    WRITE_BEHIND_MAX_KEYS: int = 10000
+
+    # Exports
+    # Rows fetched from the server-side cursor per round trip and per write
+    EXPORT_CHUNK_SIZE: int = 1000
 
     class Config:
         case_sensitive = True
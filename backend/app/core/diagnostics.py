@@ -0,0 +1,169 @@
+"""Query diagnostics: slow-query log and per-request N+1 detection.
+
+The slow-query log is cheap enough for production: every statement slower
+than SLOW_QUERY_MS is logged with the count and types of its parameters and,
+if SLOW_QUERY_EXPLAIN is set, its plan. Parameter values (password hashes,
+emails, tokens) are only logged with SLOW_QUERY_LOG_PARAMETERS, which is meant
+for development. With QUERY_DIAGNOSTICS_ENABLED, each request also counts its
+statements by SQL shape and logs any shape run N_PLUS_ONE_THRESHOLD or more
+times, with the application call site that issued it. That mode costs a dict
+update per statement and is meant for development and for short production
+investigations.
+"""
+import logging
+import os
+import sys
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import Settings, settings as default_settings
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Frames in these files are plumbing, never the call site
+SKIP_FILES = (os.path.abspath(__file__), os.path.join(APP_DIR, "db"))
+
+EXPLAIN_PREFIX = {"postgresql": "EXPLAIN ", "sqlite": "EXPLAIN QUERY PLAN "}
+
+class RequestQueries:
+    """Statements seen during one request, keyed by SQL text"""
+    __slots__ = ("total", "counts", "sites")
+
+    def __init__(self):
+        self.total = 0
+        self.counts: dict[str, int] = {}
+        self.sites: dict[str, str] = {}
+
+current_queries: ContextVar[Optional[RequestQueries]] = ContextVar("current_queries", default=None)
+
+def call_site(limit: int = 3) -> str:
+    """The innermost application frames that led to the current statement.
+
+    On an async session statements run inside a greenlet whose own stack
+    ends at SQLAlchemy; the awaiting coroutines are on the parent greenlet.
+    """
+    frame = sys._getframe(1)
+    try:
+        import greenlet
+        parent = greenlet.getcurrent().parent
+        if parent is not None and parent.gr_frame is not None:
+            frame = parent.gr_frame
+    except ImportError:
+        pass
+
+    sites = []
+    while frame is not None and len(sites) < limit:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and not filename.startswith(SKIP_FILES):
+            sites.append(f"{os.path.relpath(filename, os.path.dirname(APP_DIR))}:{frame.f_lineno} {frame.f_code.co_name}")
+        frame = frame.f_back
+    return " <- ".join(sites) or "unknown"
+
+def _explain(conn, statement: str, parameters: Any) -> str:
+    prefix = EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None:
+        return "(no EXPLAIN for this dialect)"
+    conn.info["diagnostics_explaining"] = True
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+    except Exception as exc:
+        return f"(EXPLAIN failed: {exc})"
+    finally:
+        conn.info["diagnostics_explaining"] = False
+    return "\n".join(" ".join(str(col) for col in row) for row in rows)
+
+def describe_parameters(parameters: Any, executemany: bool = False) -> str:
+    """The shape of a statement's parameters without their values"""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = describe_parameters(parameters[0]) if parameters else "none"
+        return f"{len(parameters)} rows of {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+def instrument_engine(engine: Engine, settings: Settings = default_settings) -> None:
+    """Attach the slow-query log and, if enabled, N+1 counting to an engine"""
+    slow_seconds = settings.SLOW_QUERY_MS / 1000
+    threshold = settings.N_PLUS_ONE_THRESHOLD
+    count_statements = settings.QUERY_DIAGNOSTICS_ENABLED
+    explain = settings.SLOW_QUERY_EXPLAIN
+    log_parameters = settings.SLOW_QUERY_LOG_PARAMETERS
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("diagnostics_explaining"):
+            return
+        if context is not None:
+            # On the context, not the connection, so a failed statement
+            # leaves nothing behind
+            context.diagnostics_started = time.perf_counter()
+        if not count_statements:
+            return
+        queries = current_queries.get()
+        if queries is None:
+            return
+        queries.total += 1
+        count = queries.counts.get(statement, 0) + 1
+        queries.counts[statement] = count
+        if count == threshold:
+            queries.sites[statement] = call_site()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("diagnostics_explaining"):
+            return
+        started = getattr(context, "diagnostics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if not slow_seconds or elapsed < slow_seconds:
+            return
+        plan = ""
+        streaming = context is not None and context.execution_options.get("stream_results")
+        if explain and not executemany and not streaming:
+            plan = "\n" + _explain(conn, statement, parameters)
+        logger.warning(
+            "Slow query (%.1f ms) from %s:\n%s\nparameters: %s%s",
+            elapsed * 1000, call_site(), statement,
+            repr(parameters) if log_parameters else describe_parameters(parameters, executemany),
+            plan
+        )
+
+class QueryDiagnosticsMiddleware:
+    """Counts statements per request, reports repeated shapes (N+1) and adds
+    an X-DB-Statements header to each response"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        token = current_queries.set(queries)
+
+        async def send_with_count(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-statements", str(queries.total).encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            current_queries.reset(token)
+            for statement, site in queries.sites.items():
+                logger.warning(
+                    "Possible N+1 in %s %s: statement ran %d times, issued from %s:\n%s",
+                    scope["method"], scope["path"], queries.counts[statement], site, statement
+                )
+            logger.debug("%s %s ran %d statements", scope["method"], scope["path"], queries.total)
@@ -0,0 +1,94 @@
+"""HTTP validators (ETag, Last-Modified) derived from row versions.
+
+A single row's ETag is strong and encodes its version and updated_at, so
+If-Match can be turned back into the version an update expects. Lists get a
+weak ETag over the ids and versions of the rows on the page (or over a count
+and the newest updated_at, for whole collections), with Last-Modified the
+newest updated_at among them. Services compute validators with version-only
+queries, so a matching If-None-Match is answered with 304 before any full
+row is loaded or serialized.
+"""
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional
+from fastapi import Request, Response, status
+
+_RESOURCE_TAG = re.compile(r'^"(\d+)-[0-9a-f]+"$')
+
+@dataclass(frozen=True)
+class Validator:
+    etag: str
+    last_modified: Optional[datetime] = None
+
+def _micros(moment: Optional[datetime]) -> int:
+    if moment is None:
+        return 0
+    return int(moment.replace(tzinfo=timezone.utc).timestamp() * 1_000_000)
+
+def resource_validator(version: Optional[int], updated_at: Optional[datetime]) -> Validator:
+    """Strong validator for one row; a row with no version yet is at version 1,
+    as BaseService.update expects"""
+    return Validator(f'"{version or 1}-{_micros(updated_at):x}"', updated_at)
+
+def list_validator(rows: Iterable[tuple[Any, Optional[int], Optional[datetime]]]) -> Validator:
+    """Weak validator for a page of (id, version, updated_at) rows"""
+    digest = hashlib.blake2b(digest_size=12)
+    last_modified = None
+    for id, version, updated_at in rows:
+        digest.update(f"{id}:{version}:{_micros(updated_at)};".encode())
+        if updated_at is not None and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    return Validator(f'W/"{digest.hexdigest()}"', last_modified)
+
+def collection_validator(count: int, last_modified: Optional[datetime]) -> Validator:
+    """Weak validator for a whole collection from its size and newest change.
+
+    Any insert or delete changes the count or the newest updated_at, and any
+    update moves updated_at forward.
+    """
+    return Validator(f'W/"{count}-{_micros(last_modified):x}"', last_modified)
+
+def version_from_etag(etag: str) -> Optional[int]:
+    """The row version a resource ETag was built from, None if it is not one"""
+    match = _RESOURCE_TAG.match(etag.strip())
+    return int(match.group(1)) if match else None
+
+def _opaque(tag: str) -> str:
+    # Weak comparison, as If-None-Match uses
+    return tag.strip().removeprefix("W/")
+
+def _http_date(moment: datetime) -> str:
+    # Stored timestamps are naive UTC
+    return format_datetime(moment.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+def is_not_modified(request: Request, validator: Validator) -> bool:
+    """Whether the client's cached copy is current (If-None-Match, or
+    If-Modified-Since when no ETag was sent)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        current = _opaque(validator.etag)
+        return any(_opaque(tag) == current for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and validator.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        modified = validator.last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+        return since.tzinfo is not None and modified <= since
+    return False
+
+def set_validators(response: Response, validator: Validator) -> Response:
+    response.headers["ETag"] = validator.etag
+    if validator.last_modified is not None:
+        response.headers["Last-Modified"] = _http_date(validator.last_modified)
+    return response
+
+def not_modified(validator: Validator) -> Response:
+    return set_validators(Response(status_code=status.HTTP_304_NOT_MODIFIED), validator)
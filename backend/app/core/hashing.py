@@ -0,0 +1,88 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+from app.core.config import Settings, settings
+from app.core.security import verify_password, get_password_hash
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full and the request should be shed"""
+
+class PasswordHasher:
+    """Runs bcrypt hashing and verification off the event loop.
+
+    At most `workers` calls run at once; up to `max_queue` more may wait for a
+    free worker. Anything beyond that fails fast with PasswordHasherBusy so a
+    login spike cannot pile up unbounded work behind the pool.
+    """
+
+    def __init__(self, workers: int, max_queue: int, use_processes: bool = False):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+
+    def configure(self, settings: Settings) -> None:
+        """Apply the pool size of an app's settings; the pool is rebuilt when
+        next used"""
+        self.shutdown()
+        self.workers = settings.PASSWORD_HASH_WORKERS
+        self.max_queue = settings.PASSWORD_HASH_MAX_QUEUE
+        self.use_processes = settings.PASSWORD_HASH_USE_PROCESSES
+
+    @property
+    def pending(self) -> int:
+        """Calls currently running or waiting for a worker"""
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hasher"
+                )
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.workers + self.max_queue:
+            raise PasswordHasherBusy()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+
+        self._pending += 1
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Generate a password hash"""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against a hash"""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def warm_up(self) -> None:
+        """Start every worker now rather than on the first logins"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, int) for _ in range(self.workers)))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._semaphore = None
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    use_processes=settings.PASSWORD_HASH_USE_PROCESSES
+)
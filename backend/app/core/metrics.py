@@ -0,0 +1,299 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Metrics are created once at import with fixed label names and fixed
+histogram buckets. Recording looks up a child by a tuple of label values
+(cached after the first request for that combination) and bumps a few
+numbers, so the per-request cost is a dict lookup and a bisect.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children: dict[tuple[str, ...], object] = {}
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+class Counter(_Metric):
+    kind = "counter"
+    _new_child = _Value
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.label_names, values)} {child.value}"
+
+class Gauge(Counter):
+    kind = "gauge"
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bucket plus +Inf; cumulated when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                labels = _format_labels(self.label_names, values, f'le="{le}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, values)} {child.sum}"
+            yield f"{self.name}_count{_format_labels(self.label_names, values)} {cumulative}"
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register a callback that refreshes gauges right before rendering"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)).labels()
+db_queries = registry.register(Counter("db_queries_total", "SQL statements executed")).labels()
+db_query_latency = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", buckets=QUERY_BUCKETS
+)).labels()
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request", ("route",), buckets=COUNT_BUCKETS
+))
+db_pool_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", buckets=QUERY_BUCKETS
+)).labels()
+db_pool_timeouts = registry.register(Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up waiting for a pooled connection"
+)).labels()
+db_pool = registry.register(Gauge(
+    "db_pool_connections", "Pooled connections by engine and state", ("engine", "state")
+))
+realtime_connections = registry.register(Gauge(
+    "realtime_connections", "Open change feed subscriptions on this worker"
+)).labels()
+realtime_events = registry.register(Counter(
+    "realtime_events_total", "Change events received for delivery on this worker"
+)).labels()
+realtime_resyncs = registry.register(Counter(
+    "realtime_resyncs_total", "Subscriber queues that overflowed and were told to resync"
+)).labels()
+write_behind_rows = registry.register(Counter(
+    "write_behind_rows_total", "Rows written by write-behind flushes"
+)).labels()
+write_behind_dropped = registry.register(Counter(
+    "write_behind_dropped_total", "Buffered writes dropped because the buffer was full"
+)).labels()
+sync_retry_queue_depth = registry.register(Gauge(
+    "sync_retry_queue_depth", "Rows waiting for a sync retry", ("table",)
+))
+sync_retry_oldest_age = registry.register(Gauge(
+    "sync_retry_oldest_age_seconds", "Time the longest-waiting row has waited for a sync retry", ("table",)
+))
+sync_retry_rows = registry.register(Counter(
+    "sync_retry_rows_total", "Rows processed by the sync retry worker by outcome", ("table", "outcome")
+))
+
+class RequestStats:
+    """Per-request DB counters, reachable from engine events via a contextvar"""
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+_engines: dict[str, Engine] = {}
+
+def _collect_pool() -> None:
+    for name, engine in _engines.items():
+        pool = engine.pool
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            db_pool.labels(name, "size").set(pool.size())
+            db_pool.labels(name, "checked_out").set(pool.checkedout())
+            db_pool.labels(name, "checked_in").set(pool.checkedin())
+            db_pool.labels(name, "overflow").set(max(0, pool.overflow()))
+
+registry.add_collector(_collect_pool)
+
+def instrument_engine(engine: Engine, name: str = "primary") -> None:
+    """Count and time statements and report pool usage for a (sync) engine"""
+    _engines[name] = engine
+
+    # The start time lives on the execution context rather than the
+    # connection, so a statement that fails leaves nothing behind
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        db_queries.inc()
+        db_query_latency.observe(elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += elapsed
+
+def route_template(scope: Scope) -> str:
+    """The matched route's path with parameters as {name}, e.g.
+    /api/v1/babies/{baby_id}/summary.
+
+    Depending on the FastAPI version, the route's own path_format may or may
+    not include the prefixes of the routers it was included through, so the
+    prefix is taken from the request path: the segments before those the
+    route's own template matched. Prefix segments holding a parameter value
+    are replaced by the parameter's name.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    template = getattr(route, "path_format", None)
+    path: str = scope["path"]
+    if template is None:
+        return path
+    own = template[1:].split("/") if template.startswith("/") else []
+    segments = path.split("/")
+    if len(own) >= len(segments):
+        return template
+    prefix = segments[:len(segments) - len(own)]
+    params = scope.get("path_params") or {}
+    names = {
+        str(value): name for name, value in params.items()
+        if f"{{{name}}}" not in template
+    }
+    return "/".join(
+        [f"{{{names[segment]}}}" if segment in names else segment for segment in prefix] + own
+    )
+
+class MetricsMiddleware:
+    """Records request count, latency, in-flight requests and DB statements
+    per route. Routes are labelled by their path template, never the raw
+    path, so label cardinality stays bounded."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            current_request.reset(token)
+            path = route_template(scope)
+            method = scope["method"]
+            http_requests.labels(method, path, status).inc()
+            http_latency.labels(method, path).observe(elapsed)
+            db_queries_per_request.labels(path).observe(stats.queries)
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Optional
+from jose import jwt, JWTError
+from app.core.cache import TTLCache
+from app.core.config import Settings, settings
+from app.core.redis_client import get_redis, supervise
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Compact snapshot of an authenticated user"""
+    id: str
+    is_active: bool
+    version: int
+    token_version: int = 1
+
+    @classmethod
+    def from_user(cls, user: Any) -> "Principal":
+        return cls(
+            id=user.id,
+            is_active=bool(user.is_active),
+            version=user.version or 1,
+            token_version=user.token_version or 1
+        )
+
+@dataclass(frozen=True, slots=True)
+class TokenClaims:
+    """The claims of a verified token that requests are checked against"""
+    sub: str
+    type: str
+    version: int
+    family: Optional[str]
+
+class PrincipalCache:
+    """Two-tier cache of decoded tokens and user snapshots.
+
+    The first tier is a per-process TTL/LRU cache. When Redis is enabled a
+    second, shared tier sits behind it so that a user loaded by one worker
+    is not reloaded from Postgres by the others. Writes that change a user's
+    version or active flag must call `invalidate` once they commit; it is
+    published so every worker drops its first-tier copy.
+    """
+
+    key_prefix = "principal:"
+    channel = "principal-cache:invalidate"
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        token_maxsize: int,
+        redis_ttl: int
+    ):
+        self._principals: TTLCache[str, Principal] = TTLCache(maxsize, ttl)
+        self._tokens: TTLCache[str, TokenClaims] = TTLCache(token_maxsize, ttl)
+        self.redis_ttl = redis_ttl
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    def configure(self, settings: Settings) -> None:
+        """Apply the sizes and TTLs of an app's settings, dropping what is cached"""
+        self._principals = TTLCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+        self._tokens = TTLCache(settings.TOKEN_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+        self.redis_ttl = settings.PRINCIPAL_CACHE_REDIS_TTL_SECONDS
+
+    def decode_claims(self, token: str) -> TokenClaims:
+        """Decode and verify a JWT, raising JWTError if invalid"""
+        claims = self._tokens.get(token)
+        if claims is not None:
+            return claims
+
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.JWT_ALGORITHM]
+        )
+        user_id = payload.get("sub")
+        if user_id is None:
+            raise JWTError("Token has no subject")
+        claims = TokenClaims(
+            sub=user_id,
+            # Tokens issued before rotation carry neither type nor version
+            type=payload.get("type", "access"),
+            version=payload.get("version", 1),
+            family=payload.get("fam")
+        )
+
+        # Never cache a token beyond its own expiry
+        remaining = payload.get("exp", 0) - time.time()
+        self._tokens.set(token, claims, ttl=min(self._tokens.ttl, remaining))
+        return claims
+
+    def decode_token(self, token: str) -> str:
+        """Decode a JWT and return its subject, raising JWTError if invalid"""
+        return self.decode_claims(token).sub
+
+    async def get(self, user_id: str) -> Optional[Principal]:
+        """Get a cached snapshot, or None if the caller must load the user"""
+        principal = self._principals.get(user_id)
+        if principal is not None:
+            return principal
+
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(self.key_prefix + user_id)
+        except Exception:
+            logger.warning("Principal cache Redis read failed", exc_info=True)
+            return None
+        if raw is None:
+            self.redis_misses += 1
+            return None
+
+        self.redis_hits += 1
+        principal = Principal(**json.loads(raw))
+        self._principals.set(user_id, principal)
+        return principal
+
+    async def set(self, principal: Principal) -> None:
+        """Store a snapshot in every tier"""
+        self._principals.set(principal.id, principal)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(
+                self.key_prefix + principal.id,
+                json.dumps(asdict(principal)),
+                ex=self.redis_ttl
+            )
+        except Exception:
+            logger.warning("Principal cache Redis write failed", exc_info=True)
+
+    def drop_local(self, user_id: str) -> None:
+        self._principals.pop(user_id)
+
+    async def invalidate(self, user_id: str) -> None:
+        """Drop a user's snapshot on every worker after its version or active
+        flag changed"""
+        self.drop_local(user_id)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(self.key_prefix + user_id)
+            await redis.publish(self.channel, user_id)
+        except Exception:
+            logger.warning("Principal cache Redis invalidation failed", exc_info=True)
+
+    async def _listen(self) -> None:
+        redis = get_redis()
+        pubsub = redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for raw in pubsub.listen():
+                if raw.get("type") == "message":
+                    self.drop_local(raw["data"])
+        finally:
+            await pubsub.aclose()
+
+    def start_listener(self) -> None:
+        """Follow invalidations from other workers when Redis is enabled"""
+        if get_redis() is not None and self._listener is None:
+            self._listener = asyncio.create_task(supervise("Principal cache", self._listen))
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def clear(self) -> None:
+        self._principals.clear()
+        self._tokens.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters for each tier"""
+        return {
+            "principals": self._principals.stats(),
+            "tokens": self._tokens.stats(),
+            "redis": {"hits": self.redis_hits, "misses": self.redis_misses},
+        }
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    token_maxsize=settings.TOKEN_CACHE_SIZE,
+    redis_ttl=settings.PRINCIPAL_CACHE_REDIS_TTL_SECONDS
+)
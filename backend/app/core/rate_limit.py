@@ -0,0 +1,192 @@
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+from app.core.cache import TTLCache
+from app.core.config import Settings, settings as default_settings
+from app.core.principal_cache import principal_cache
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Token bucket kept in a Redis hash. Uses the Redis clock so that every
+# worker refills the bucket at the same rate.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+AUTH_PATHS = ("/auth/login", "/auth/register", "/auth/refresh-token")
+EXEMPT_PATHS = ("/health", "/metrics", "/docs", "/redoc")
+
+@dataclass(slots=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until at least one more request is allowed
+    retry_after: float
+    # Seconds until the bucket is full again
+    reset_after: float
+
+class TokenBucketLimiter:
+    """Token bucket rate limiter backed by Redis, or by process memory
+    when Redis is disabled or unreachable.
+
+    After a failed Redis call the limiter stays on local buckets for
+    `redis_retry_seconds` before trying Redis again, so an outage does not
+    cost every request a failing round trip.
+    """
+
+    def __init__(self, max_keys: int = 100000, redis_retry_seconds: float = 5.0):
+        self._buckets: TTLCache[str, list[float]] = TTLCache(max_keys, ttl=3600)
+        self._script = None
+        self.redis_retry_seconds = redis_retry_seconds
+        self._redis_down_until = 0.0
+
+    def _result(self, allowed: bool, tokens: float, limit: int, rate: float) -> RateLimitResult:
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=int(tokens),
+            retry_after=0.0 if allowed else (1 - tokens) / rate,
+            reset_after=(limit - tokens) / rate
+        )
+
+    def hit_local(self, key: str, limit: int, rate: float) -> RateLimitResult:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(limit), now]
+        tokens = min(limit, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        bucket[0], bucket[1] = tokens, now
+        # An idle bucket is full again after limit / rate seconds, at which
+        # point forgetting it is equivalent to keeping it
+        self._buckets.set(key, bucket, ttl=limit / rate)
+        return self._result(allowed, tokens, limit, rate)
+
+    async def hit(self, key: str, limit: int, per_seconds: float = 60) -> RateLimitResult:
+        """Take one token from the bucket for key"""
+        rate = limit / per_seconds
+        redis = get_redis()
+        if redis is None or time.monotonic() < self._redis_down_until:
+            return self.hit_local(key, limit, rate)
+        try:
+            if self._script is None:
+                self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+            allowed, tokens = await self._script(keys=[key], args=[limit, rate])
+        except Exception:
+            self._redis_down_until = time.monotonic() + self.redis_retry_seconds
+            logger.warning(
+                "Rate limiter Redis call failed, using local buckets for %.0fs",
+                self.redis_retry_seconds, exc_info=True
+            )
+            return self.hit_local(key, limit, rate)
+        return self._result(bool(allowed), float(tokens), limit, rate)
+
+class RateLimitMiddleware:
+    """Limits requests per user (or per IP when anonymous) and per route class.
+
+    Login, registration and token refresh form a separate, stricter class
+    keyed by client IP, since they are the brute-force targets and each
+    attempt costs a bcrypt hash.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: Optional[TokenBucketLimiter] = None,
+        settings: Optional[Settings] = None
+    ):
+        settings = settings or default_settings
+        self.app = app
+        self.limiter = limiter or TokenBucketLimiter()
+        self.auth_prefixes = tuple(settings.API_V1_STR + path for path in AUTH_PATHS)
+        self.limit = settings.RATE_LIMIT_PER_MINUTE
+        self.auth_limit = settings.RATE_LIMIT_AUTH_PER_MINUTE
+        self.trust_forwarded = settings.RATE_LIMIT_TRUST_FORWARDED
+
+    def _client_ip(self, scope: Scope) -> str:
+        if self.trust_forwarded:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _user_id(self, scope: Scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer" or not token:
+                    return None
+                try:
+                    return principal_cache.decode_token(token)
+                except Exception:
+                    return None
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        path: str = scope["path"]
+        if path.startswith(EXEMPT_PATHS) or path.endswith("/openapi.json"):
+            await self.app(scope, receive, send)
+            return
+
+        if path.startswith(self.auth_prefixes):
+            key = f"rl:auth:ip:{self._client_ip(scope)}"
+            limit = self.auth_limit
+        else:
+            user_id = self._user_id(scope)
+            ident = f"user:{user_id}" if user_id else f"ip:{self._client_ip(scope)}"
+            key = f"rl:default:{ident}"
+            limit = self.limit
+
+        result = await self.limiter.hit(key, limit)
+        headers = [
+            (b"x-ratelimit-limit", str(result.limit).encode()),
+            (b"x-ratelimit-remaining", str(result.remaining).encode()),
+            (b"x-ratelimit-reset", str(math.ceil(result.reset_after)).encode()),
+        ]
+
+        if not result.allowed:
+            body = b'{"detail":"Too many requests"}'
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": headers + [
+                    (b"retry-after", str(math.ceil(result.retry_after)).encode()),
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
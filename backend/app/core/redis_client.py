@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis = None
+
+def get_redis() -> Optional["Redis"]:
+    """Get the shared async Redis client, or None when Redis is disabled"""
+    global _redis
+    if not settings.REDIS_ENABLED:
+        return None
+    if _redis is None:
+        from redis.asyncio import Redis
+        _redis = Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            decode_responses=True
+        )
+    return _redis
+
+async def close_redis() -> None:
+    """Close the shared Redis client if one was created"""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+async def supervise(name: str, run: Callable[[], Awaitable[None]], *, delay: float = 1.0) -> None:
+    """Run a pub/sub listener, starting it again whenever it ends or fails.
+
+    A listener that dies on a Redis blip would otherwise miss every message
+    until the process restarts.
+    """
+    while True:
+        try:
+            await run()
+            logger.warning("%s listener stopped, restarting", name)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("%s listener failed, restarting", name, exc_info=True)
+        await asyncio.sleep(delay)
@@ -1,31 +1,59 @@
+import uuid
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Optional
 from passlib.context import CryptContext
 from jose import jwt
 from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def create_access_token(subject: str | Any, expires_delta: timedelta | None = None) -> str:
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-        )
-    
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(
-        to_encode, 
-        settings.SECRET_KEY, 
+def new_token_id() -> str:
+    return uuid.uuid4().hex
+
+def _encode(claims: dict[str, Any], expires_delta: timedelta) -> str:
+    to_encode = {"exp": datetime.utcnow() + expires_delta, **claims}
+    return jwt.encode(
+        to_encode,
+        settings.SECRET_KEY,
         algorithm=settings.JWT_ALGORITHM
     )
-    return encoded_jwt
 
-def create_refresh_token(subject: str | Any) -> str:
-    """Create a refresh token with longer expiration"""
-    expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    return create_access_token(subject=subject, expires_delta=expires_delta)
+def create_access_token(
+    subject: str | Any,
+    expires_delta: timedelta | None = None,
+    *,
+    version: int = 1,
+    family: Optional[str] = None
+) -> str:
+    """Create an access token. `version` is the user's token_version and
+    `family` the refresh token family it was issued with, so revoking
+    either also rejects the access token."""
+    if not expires_delta:
+        expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = {"sub": str(subject), "type": "access", "version": version}
+    if family:
+        claims["fam"] = family
+    return _encode(claims, expires_delta)
+
+def create_refresh_token(
+    subject: str | Any,
+    *,
+    version: int = 1,
+    family: Optional[str] = None
+) -> str:
+    """Create a single-use refresh token with longer expiration.
+
+    Each token has its own `jti`. Tokens rotated from one login share a
+    `fam`; pass the family of the token being rotated to continue it.
+    """
+    claims = {
+        "sub": str(subject),
+        "type": "refresh",
+        "version": version,
+        "jti": new_token_id(),
+        "fam": family or new_token_id(),
+    }
+    return _encode(claims, timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
@@ -0,0 +1,63 @@
+"""JSON serialization for API responses.
+
+ORJSONResponse is the app's default response class, used for anything
+returned without a response model (plain dicts, error bodies). Routes with a
+response model keep FastAPI's own path, which validates the return value and
+dumps it with pydantic-core.
+
+Hot endpoints that already hold exactly what they want to send can return
+model_response() instead. It converts the result once, straight from ORM
+attributes, and returns JSON bytes, so FastAPI skips re-validating it against
+the response model. Keep response_model on such routes for the OpenAPI schema.
+"""
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Mapping, Optional, TypeVar
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+T = TypeVar("T")
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """Serialize plain Python data (dicts, lists, datetimes, enums) to JSON"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    """Cached TypeAdapter, so validators and serializers are built once per type"""
+    return TypeAdapter(tp)
+
+def to_schema(tp: type[T], obj: Any) -> T:
+    """Convert an ORM object (or list of them) to a schema via from_attributes"""
+    return type_adapter(tp).validate_python(obj, from_attributes=True)
+
+def model_response(
+    tp: Any,
+    obj: Any,
+    *,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None
+) -> Response:
+    """JSON response for obj as type tp, converted and dumped in one pass"""
+    adapter = type_adapter(tp)
+    content = adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+    return Response(
+        content=content,
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json"
+    )
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Optional
+from app.core.config import Settings, settings
+from app.core.redis_client import get_redis, supervise
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings: no false negatives, and false
+    positives at about `error_rate` up to `capacity` items"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class TokenRevocations:
+    """Revoked refresh token families and used refresh token ids.
+
+    Revoked families sit in an exact set (Redis keys that expire with the
+    tokens, or a local dict without Redis) with a per-process Bloom filter in
+    front. The filter answers the common "not revoked" case for every
+    authenticated request without a round trip; only a hit is confirmed
+    against the exact set. Revocations are published so other workers add
+    them to their filters. The filter is only trusted while it is in sync:
+    from the end of the startup scan for as long as the listener stays
+    subscribed. Before that, and while the listener reconnects and scans
+    again, every check goes to the exact set.
+
+    Used refresh token ids are claimed atomically (SET NX) when a token is
+    rotated, so a second use of the same token is detected on any worker.
+    """
+
+    revoked_prefix = "token-revoked:"
+    used_prefix = "token-used:"
+    channel = "token-revocations"
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        # id -> expiry (epoch seconds), the exact sets without Redis
+        self._revoked: dict[str, float] = {}
+        self._used: dict[str, float] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._synced = False
+        self._loaded = asyncio.Event()
+
+    def configure(self, settings: Settings) -> None:
+        """Size the filter for an app's settings, keeping what was revoked"""
+        self.capacity = settings.TOKEN_REVOCATION_CAPACITY
+        self.error_rate = settings.TOKEN_REVOCATION_ERROR_RATE
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        for family in self._revoked:
+            self._bloom.add(family)
+
+    @staticmethod
+    def _ttl(expires_at: float) -> int:
+        return max(1, math.ceil(expires_at - time.time()))
+
+    @staticmethod
+    def _prune(entries: dict[str, float]) -> None:
+        now = time.time()
+        for key in [key for key, expires_at in entries.items() if expires_at <= now]:
+            del entries[key]
+
+    def _remember(self, entries: dict[str, float], key: str, expires_at: float) -> None:
+        if len(entries) >= self.capacity:
+            self._prune(entries)
+        entries[key] = expires_at
+
+    async def is_revoked(self, family: str, *, exact: bool = False) -> bool:
+        """Whether a token family was revoked.
+
+        No I/O unless the filter hits, it is not in sync, or `exact` asks to
+        check the exact set whatever the filter says (refresh token
+        exchanges, where a missed revocation would mint new tokens).
+        """
+        bloom_hit = family in self._bloom
+        redis = get_redis()
+        if not bloom_hit and not exact and (self._synced or redis is None):
+            return False
+        expires_at = self._revoked.get(family)
+        if expires_at is not None and expires_at > time.time():
+            return True
+        if redis is None:
+            return False
+        try:
+            return bool(await redis.exists(self.revoked_prefix + family))
+        except Exception:
+            logger.warning("Token revocation Redis read failed", exc_info=True)
+            # Refuse rather than accept a token that may be revoked; a plain
+            # filter miss is still accepted so an outage does not reject
+            # every request
+            return bloom_hit or exact
+
+    async def revoke(self, family: str, expires_at: float) -> None:
+        """Revoke every token of a family until its last token expires"""
+        self._bloom.add(family)
+        self._remember(self._revoked, family, expires_at)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(self.revoked_prefix + family, 1, ex=self._ttl(expires_at))
+            await redis.publish(self.channel, family)
+        except Exception:
+            logger.warning("Token revocation Redis write failed", exc_info=True)
+
+    async def claim(self, jti: str, expires_at: float) -> bool:
+        """Mark a refresh token used; False if it had already been used"""
+        redis = get_redis()
+        if redis is not None:
+            try:
+                return bool(await redis.set(self.used_prefix + jti, 1, ex=self._ttl(expires_at), nx=True))
+            except Exception:
+                logger.warning("Token claim Redis write failed, claiming locally", exc_info=True)
+        expires_at_before = self._used.get(jti)
+        if expires_at_before is not None and expires_at_before > time.time():
+            return False
+        self._remember(self._used, jti, expires_at)
+        return True
+
+    async def _load(self) -> None:
+        redis = get_redis()
+        loaded = 0
+        async for key in redis.scan_iter(match=self.revoked_prefix + "*", count=1000):
+            self._bloom.add(key[len(self.revoked_prefix):])
+            loaded += 1
+        if loaded > self.capacity:
+            logger.warning(
+                "%d revoked token families exceed TOKEN_REVOCATION_CAPACITY=%d; "
+                "more revocation checks will reach Redis", loaded, self.capacity
+            )
+
+    async def _listen(self) -> None:
+        redis = get_redis()
+        pubsub = redis.pubsub()
+        # Subscribe before loading so no revocation falls in between; every
+        # reconnect scans again for what was published while it was down
+        await pubsub.subscribe(self.channel)
+        try:
+            await self._load()
+            self._synced = True
+            self._loaded.set()
+            async for raw in pubsub.listen():
+                if raw.get("type") == "message":
+                    self._bloom.add(raw["data"])
+        finally:
+            self._synced = False
+            await pubsub.aclose()
+
+    def start_listener(self) -> None:
+        """Load existing revocations and follow new ones when Redis is enabled"""
+        if get_redis() is not None and self._listener is None:
+            self._listener = asyncio.create_task(supervise("Token revocation", self._listen))
+
+    async def wait_loaded(self, timeout: float) -> bool:
+        """Wait for the first scan, so the worker starts with the filter in
+        sync; False if it timed out (checks then go to Redis until it is)"""
+        if self._listener is None:
+            return True
+        try:
+            await asyncio.wait_for(self._loaded.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._synced = False
+        self._loaded.clear()
+
+    def clear(self) -> None:
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self._revoked.clear()
+        self._used.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "filter_bits": self._bloom.size,
+            "filter_hashes": self._bloom.hashes,
+            "filter_items": self._bloom.count,
+            "local_revoked": len(self._revoked),
+            "local_used": len(self._used),
+            "synced": int(self._synced),
+        }
+
+token_revocations = TokenRevocations(
+    capacity=settings.TOKEN_REVOCATION_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_ERROR_RATE
+)
@@ -0,0 +1,152 @@
+"""Monthly range partitions of the activity table (Postgres).
+
+activity is partitioned on start_time with one partition per calendar month,
+activity_pYYYY_MM, plus activity_default for rows no month partition covers
+(a badly set device clock, say). Queries bounded on start_time only touch the
+months they overlap, each month has its own small indexes, and autovacuum
+only has work in months that still change; old months are detached, dumped
+and dropped whole (app.commands.archive_activities) instead of deleted row
+by row.
+
+ensure_partitions() creates the months up to ACTIVITY_PARTITION_MONTHS_AHEAD
+ahead. It runs at startup and every ACTIVITY_PARTITION_CHECK_HOURS from
+every worker; an advisory lock lets one of them do the work.
+"""
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+PARENT = "activity"
+DEFAULT_PARTITION = "activity_default"
+# Unpartitioned table of every activity id (see app.models.activity)
+KEY_TABLE = "activity_key"
+# pg_advisory_xact_lock key for partition maintenance
+LOCK_KEY = 0x70617274
+
+_BOUND = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    # None for the default partition
+    start: Optional[datetime]
+    end: Optional[datetime]
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: datetime) -> str:
+    return f"{PARENT}_p{month:%Y_%m}"
+
+async def list_partitions(conn: AsyncConnection) -> list[Partition]:
+    """The table's attached partitions, oldest first, default last"""
+    result = await conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+        "FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:parent AS regclass)"
+    ), {"parent": PARENT})
+    partitions = []
+    for name, bound in result:
+        match = _BOUND.search(bound)
+        if match is None:
+            partitions.append(Partition(name, None, None))
+        else:
+            partitions.append(Partition(
+                name,
+                datetime.fromisoformat(match.group(1)),
+                datetime.fromisoformat(match.group(2))
+            ))
+    return sorted(partitions, key=lambda p: (p.start is None, p.start or datetime.min))
+
+async def create_partition(conn: AsyncConnection, month: datetime) -> str:
+    """Create and attach the partition for `month`.
+
+    Rows already in the default partition for that month are moved into the
+    new table first; Postgres refuses to attach a range the default holds.
+    Deleting them drops their ids from the key table, so they are registered
+    again once the partition is attached.
+    """
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    await conn.execute(text(
+        f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    ))
+    await conn.execute(text(
+        f"WITH moved AS ("
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE start_time >= :start AND start_time < :end "
+        f"RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    await conn.execute(text(
+        f"ALTER TABLE {PARENT} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start']:%Y-%m-%d}') TO ('{bounds['end']:%Y-%m-%d}')"
+    ))
+    await conn.execute(text(f"INSERT INTO {KEY_TABLE} (id) SELECT id FROM {name}"))
+    return name
+
+async def ensure_partitions(
+    conn: AsyncConnection,
+    *,
+    months_ahead: int,
+    since: Optional[datetime] = None,
+    now: Optional[datetime] = None
+) -> list[str]:
+    """Create missing month partitions from `since` (default: this month)
+    to `months_ahead` months ahead, and the default partition.
+
+    Returns the names created. If another connection holds the maintenance
+    lock, does nothing and returns [].
+    """
+    acquired = await conn.scalar(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": LOCK_KEY}
+    )
+    if not acquired:
+        return []
+
+    created = []
+    await conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"
+    ))
+    existing = {p.name for p in await list_partitions(conn)}
+    current = month_start(now or datetime.utcnow())
+    month = month_start(since) if since is not None else current
+    last = add_months(current, months_ahead)
+    while month <= last:
+        if partition_name(month) not in existing:
+            created.append(await create_partition(conn, month))
+        month = add_months(month, 1)
+    if created:
+        logger.info("Created activity partitions %s", ", ".join(created))
+    return created
+
+async def detach_partition(conn: AsyncConnection, name: str) -> None:
+    """Detach a partition; it stays behind as an ordinary table, and its ids
+    leave the key table with it"""
+    await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+    await conn.execute(text(
+        f"DELETE FROM {KEY_TABLE} k USING {name} p WHERE k.id = p.id"
+    ))
+
+async def maintain_partitions(engine: AsyncEngine, *, months_ahead: int, interval: float) -> None:
+    """Keep future partitions created, every `interval` seconds, until cancelled"""
+    while True:
+        try:
+            async with engine.begin() as conn:
+                await ensure_partitions(conn, months_ahead=months_ahead)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Activity partition maintenance failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,83 @@
+"""Connection pool configuration.
+
+engine_options() turns Settings into create_async_engine() keyword arguments.
+Against Postgres the app uses AppQueuePool, which records checkout waits and
+turns a checkout that times out into PoolExhausted, so a saturated pool
+fails requests after DB_POOL_TIMEOUT with a 503 rather than queueing them
+indefinitely. With DB_PGBOUNCER the pooling is left to PgBouncer: NullPool,
+and no prepared statements are cached or reused by name, since consecutive
+statements may run on different server connections.
+"""
+import time
+import uuid
+from typing import Any, Optional
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool
+from app.core.config import Settings
+from app.core.metrics import db_pool_timeouts, db_pool_wait
+
+class PoolExhausted(sa_exc.TimeoutError):
+    """No pooled connection became free within DB_POOL_TIMEOUT"""
+
+class AppQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited and raises
+    PoolExhausted when it gives up"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError as exc:
+            db_pool_timeouts.inc()
+            raise PoolExhausted(
+                f"No database connection free after {self._timeout}s "
+                f"({self.size()} pooled, {self.overflow()} overflow)"
+            ) from exc
+        finally:
+            db_pool_wait.observe(time.perf_counter() - started)
+
+def _statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+def engine_options(settings: Settings, url: Optional[str] = None) -> dict[str, Any]:
+    """Keyword arguments for create_async_engine(); url defaults to the primary"""
+    url = url or settings.SQLALCHEMY_DATABASE_URI
+    if url.startswith("sqlite"):
+        # SQLite picks its own pool; queue sizing does not apply
+        return {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+
+    connect_args: dict[str, Any] = {}
+    if url.startswith("postgresql+asyncpg"):
+        cache_size = 0 if settings.DB_PGBOUNCER else settings.DB_STATEMENT_CACHE_SIZE
+        # SQLAlchemy's prepared statement cache, and asyncpg's own
+        connect_args["prepared_statement_cache_size"] = cache_size
+        connect_args["statement_cache_size"] = cache_size
+        if settings.DB_PGBOUNCER:
+            connect_args["prepared_statement_name_func"] = _statement_name
+
+    if settings.DB_PGBOUNCER:
+        return {"poolclass": NullPool, "connect_args": connect_args}
+    return {
+        "poolclass": AppQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+def pool_stats(pool: Optional[Pool]) -> dict[str, Any]:
+    """Current usage of a pool; queue pools report their occupancy"""
+    if pool is None:
+        return {"pool": None}
+    stats: dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            timeout=pool.timeout(),
+        )
+    return stats
@@ -0,0 +1,132 @@
+"""Read-replica routing.
+
+When SQLALCHEMY_REPLICA_URIS is set, sessions are RoutingSessions. A session
+opted in with READ_REPLICA (request sessions from get_db) sends plain SELECTs
+to one replica, picked once per session. Everything else goes to the primary:
+INSERT/UPDATE/DELETE, flushes, SELECT ... FOR UPDATE, textual SQL and every
+statement after the session's first write, so a request reads its own writes.
+
+A user who wrote stays on the primary for REPLICA_STICKY_SECONDS, so the
+next request reads what the last one wrote whatever the replica lag. The
+window is kept per worker and, when Redis is enabled, shared through it.
+Other sessions (workers, commands) never opt in and always use the primary.
+"""
+import logging
+import random
+from typing import Optional
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import CompoundSelect, Select
+from sqlalchemy.sql.dml import UpdateBase
+from app.core.cache import TTLCache
+from app.core.config import Settings, settings
+from app.core.redis_client import get_redis
+from app.services import hooks
+
+logger = logging.getLogger(__name__)
+
+# db.info keys
+READ_REPLICA = "read_replica"
+USE_PRIMARY = "use_primary"
+# Dropped on rollback: a write that never committed starts no sticky window
+WROTE = hooks.pending("wrote")
+USER_ID = "routing_user_id"
+REPLICA = "replica"
+
+_primary: Optional[Engine] = None
+_replicas: list[Engine] = []
+
+def configure(primary: Engine, replicas: list[Engine]) -> None:
+    """Set the (sync) engines RoutingSession chooses from"""
+    global _primary, _replicas
+    _primary = primary
+    _replicas = list(replicas)
+
+def use_primary(db) -> None:
+    """Send the session's remaining reads to the primary"""
+    db.info[USE_PRIMARY] = True
+
+class StickyPrimary:
+    """Users who wrote recently and must read from the primary.
+
+    Marks are set locally as soon as a write is routed and shared through
+    Redis once it commits.
+    """
+
+    key_prefix = "sticky_primary:"
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._local: TTLCache[str, bool] = TTLCache(maxsize, ttl)
+
+    def configure(self, settings: Settings) -> None:
+        """Apply the sticky window of an app's settings"""
+        self._local = TTLCache(self._local.maxsize, settings.REPLICA_STICKY_SECONDS)
+
+    def mark_local(self, user_id: str) -> None:
+        self._local.set(user_id, True)
+
+    async def mark(self, user_id: str) -> None:
+        self.mark_local(user_id)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(self.key_prefix + user_id, 1, px=int(self._local.ttl * 1000))
+        except Exception:
+            logger.warning("Sticky primary Redis write failed", exc_info=True)
+
+    async def is_sticky(self, user_id: str) -> bool:
+        if self._local.get(user_id):
+            return True
+        redis = get_redis()
+        if redis is None:
+            return False
+        try:
+            return bool(await redis.exists(self.key_prefix + user_id))
+        except Exception:
+            logger.warning("Sticky primary Redis read failed", exc_info=True)
+            # Unknown: the primary is always correct
+            return True
+
+sticky_primary = StickyPrimary(maxsize=10000, ttl=settings.REPLICA_STICKY_SECONDS)
+
+async def route_user(db, user_id: str) -> None:
+    """Tie the session to the authenticated user: their writes start a
+    sticky window, and reads stay on the primary while one is open"""
+    if not _replicas:
+        return
+    db.info[USER_ID] = user_id
+    if db.info.get(READ_REPLICA) and await sticky_primary.is_sticky(user_id):
+        use_primary(db)
+
+@hooks.after_commit
+async def share_sticky_window(db) -> None:
+    user_id = db.info.get(USER_ID)
+    if db.info.pop(WROTE, False) and user_id is not None:
+        await sticky_primary.mark(user_id)
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if not _replicas:
+            return super().get_bind(mapper, clause=clause, **kw)
+        info = self.info
+        if self._flushing or isinstance(clause, UpdateBase):
+            info[USE_PRIMARY] = True
+            info[WROTE] = True
+            user_id = info.get(USER_ID)
+            if user_id is not None:
+                sticky_primary.mark_local(user_id)
+            return _primary
+
+        if (
+            info.get(READ_REPLICA)
+            and not info.get(USE_PRIMARY)
+            and isinstance(clause, (Select, CompoundSelect))
+            and getattr(clause, "_for_update_arg", None) is None
+        ):
+            replica = info.get(REPLICA)
+            if replica is None:
+                replica = info[REPLICA] = random.choice(_replicas)
+            return replica
+        # Textual SQL, locking reads and bare connection() calls
+        return _primary
@@ -0,0 +1,107 @@
+"""Database engine and sessions.
+
+Importing this module opens nothing. The engine is created by init_engine(),
+which the app lifespan calls in each worker after a preload-then-fork server
+has forked, so workers never share pooled connections. Scripts and workers
+that run outside the app call init_engine() themselves.
+
+With SQLALCHEMY_REPLICA_URIS set, request sessions read from replicas; see
+app.db.routing.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Optional
+from sqlalchemy import text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import Settings, settings as default_settings
+from app.core import diagnostics
+from app.core.metrics import instrument_engine
+from app.db.pool import engine_options, pool_stats as _pool_stats
+from app.db import routing
+
+engine: Optional[AsyncEngine] = None
+replica_engines: list[AsyncEngine] = []
+
+# Bound to the engine by init_engine()
+AsyncSessionLocal = async_sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=routing.RoutingSession,
+    expire_on_commit=False
+)
+
+def _create_engine(settings: Settings, url: str, name: str) -> AsyncEngine:
+    created = create_async_engine(url, **engine_options(settings, url))
+    if settings.METRICS_ENABLED:
+        instrument_engine(created.sync_engine, name)
+    if settings.SLOW_QUERY_MS or settings.QUERY_DIAGNOSTICS_ENABLED:
+        diagnostics.instrument_engine(created.sync_engine, settings)
+    return created
+
+def init_engine(settings: Settings = default_settings) -> AsyncEngine:
+    """Create the engines on first call and bind AsyncSessionLocal to them"""
+    global engine, replica_engines
+    if engine is None:
+        engine = _create_engine(settings, settings.SQLALCHEMY_DATABASE_URI, "primary")
+        replica_engines = [
+            _create_engine(settings, url, f"replica{i}")
+            for i, url in enumerate(settings.SQLALCHEMY_REPLICA_URIS)
+        ]
+        routing.configure(engine.sync_engine, [replica.sync_engine for replica in replica_engines])
+        AsyncSessionLocal.configure(bind=engine)
+    return engine
+
+async def warm_pool(connections: int) -> None:
+    """Open up to `connections` pooled connections so the first requests do
+    not pay for connection setup"""
+    # Nothing to keep warm without a queue pool (NullPool behind PgBouncer)
+    if engine is None or connections <= 0 or not isinstance(engine.pool, AsyncAdaptedQueuePool):
+        return
+    connections = min(connections, engine.pool.size())
+
+    opened = 0
+    all_open = asyncio.Event()
+
+    async def checkout() -> None:
+        nonlocal opened
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            opened += 1
+            if opened == connections:
+                all_open.set()
+            # Hold on until every connection is open so each one is new
+            await all_open.wait()
+
+    try:
+        await asyncio.gather(*(checkout() for _ in range(connections)))
+    finally:
+        all_open.set()
+
+def pool_stats() -> dict[str, Any]:
+    """Occupancy of the engine's connection pool, and of each replica's"""
+    stats = _pool_stats(engine.pool if engine is not None else None)
+    if replica_engines:
+        stats["replicas"] = [_pool_stats(replica.pool) for replica in replica_engines]
+    return stats
+
+async def dispose_engine() -> None:
+    global engine, replica_engines
+    for replica in replica_engines:
+        await replica.dispose()
+    replica_engines = []
+    if engine is not None:
+        await engine.dispose()
+        engine = None
+        routing.configure(None, [])
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """Dependency for getting a database session; its plain reads may go to
+    a replica"""
+    async with AsyncSessionLocal(info={routing.READ_REPLICA: True}) as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
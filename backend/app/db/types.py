@@ -0,0 +1,7 @@
+"""Column types shared by the models"""
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import JSONB
+
+# JSONB on Postgres: stored parsed, so it can be indexed (GIN, expression
+# indexes) and read without re-parsing each row. Plain JSON elsewhere.
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
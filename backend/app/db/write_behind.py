@@ -0,0 +1,151 @@
+"""Write-behind buffer for monotonic bookkeeping columns.
+
+Some columns are rewritten on nearly every request although only their
+latest value matters: User.last_sync moves forward on every delta sync. The
+buffer collects those writes in memory, keeping the highest value per row
+and column, and every WRITE_BEHIND_FLUSH_MS writes them all with one
+UPDATE ... FROM (VALUES ...) per table and set of columns. Values are only
+ever raised, so a flush never moves a column backwards past a value another
+worker wrote.
+
+The buffer holds at most WRITE_BEHIND_MAX_KEYS rows; recording one more
+flushes first. The lifespan starts the flusher and flushes what is left at
+shutdown. A buffered value is lost if the process dies before the next
+flush, so only use it for values that are safe to lose for that long.
+"""
+import asyncio
+import logging
+from typing import Any, Optional
+from sqlalchemy import Table, bindparam, case, column, or_, update, values
+from app.core.config import Settings, settings
+from app.core.metrics import write_behind_dropped, write_behind_rows
+from app.db import session
+
+logger = logging.getLogger(__name__)
+
+# (table, primary key) -> column -> highest value recorded
+Pending = dict[tuple[Table, Any], dict[str, Any]]
+
+def _merge(into: dict[str, Any], changes: dict[str, Any]) -> None:
+    for name, value in changes.items():
+        current = into.get(name)
+        if current is None or (value is not None and value > current):
+            into[name] = value
+
+def _raise_to(table: Table, name: str, value: Any) -> Any:
+    # GREATEST(col, value), also when col is NULL, on every dialect
+    target = table.c[name]
+    return case((or_(target.is_(None), target < value), value), else_=target)
+
+class WriteBehind:
+    def __init__(self, *, interval: float, max_keys: int):
+        self.interval = interval
+        self.max_keys = max_keys
+        self._pending: Pending = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def configure(self, settings: Settings) -> None:
+        """Apply the flush interval and size of an app's settings; takes
+        effect when the flusher next starts"""
+        self.interval = settings.WRITE_BEHIND_FLUSH_MS / 1000
+        self.max_keys = settings.WRITE_BEHIND_MAX_KEYS
+
+    @property
+    def running(self) -> bool:
+        """Whether recorded values will be flushed without being asked to"""
+        return self._task is not None
+
+    async def record(self, model: type, id: Any, **changes: Any) -> None:
+        """Raise the row's columns to these values at the next flush"""
+        key = (model.__table__, id)
+        if key not in self._pending and len(self._pending) >= self.max_keys:
+            await self.flush()
+            if len(self._pending) >= self.max_keys:
+                # The flush failed and kept its rows; this one has to go
+                write_behind_dropped.inc()
+                logger.warning("Write-behind buffer full, dropped %s %s", key[0].name, id)
+                return
+        _merge(self._pending.setdefault(key, {}), changes)
+
+    async def flush(self) -> int:
+        """Write everything recorded so far; the number of rows written"""
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                await self._write(pending)
+            except Exception:
+                logger.warning("Write-behind flush of %d rows failed", len(pending), exc_info=True)
+                # Keep them for the next flush, merged with anything newer
+                for key, changes in pending.items():
+                    if key in self._pending or len(self._pending) < self.max_keys:
+                        _merge(self._pending.setdefault(key, {}), changes)
+                    else:
+                        write_behind_dropped.inc()
+                return 0
+            write_behind_rows.inc(len(pending))
+            return len(pending)
+
+    async def _write(self, pending: Pending) -> None:
+        groups: dict[tuple[Table, tuple[str, ...]], list[tuple[Any, dict[str, Any]]]] = {}
+        for (table, id), changes in pending.items():
+            groups.setdefault((table, tuple(sorted(changes))), []).append((id, changes))
+
+        async with session.engine.begin() as conn:
+            for (table, names), rows in groups.items():
+                if conn.dialect.name == "postgresql":
+                    incoming = values(
+                        column("id", table.c.id.type),
+                        *(column(name, table.c[name].type) for name in names),
+                        name="incoming"
+                    ).data([(id, *(changes[name] for name in names)) for id, changes in rows])
+                    await conn.execute(
+                        update(table)
+                        .where(table.c.id == incoming.c.id)
+                        .values({name: _raise_to(table, name, incoming.c[name]) for name in names})
+                    )
+                else:
+                    # No VALUES in FROM elsewhere; one executemany instead
+                    await conn.execute(
+                        update(table)
+                        .where(table.c.id == bindparam("_id"))
+                        .values({
+                            name: _raise_to(table, name, bindparam(f"_{name}", type_=table.c[name].type))
+                            for name in names
+                        }),
+                        [
+                            {"_id": id, **{f"_{name}": changes[name] for name in names}}
+                            for id, changes in rows
+                        ]
+                    )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            # Stopping mid-flush must not lose the rows it took
+            await asyncio.shield(self.flush())
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write what is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict[str, int]:
+        return {"pending": len(self._pending)}
+
+write_behind = WriteBehind(
+    interval=settings.WRITE_BEHIND_FLUSH_MS / 1000,
+    max_keys=settings.WRITE_BEHIND_MAX_KEYS
+)
@@ -1,33 +1,131 @@
+"""ASGI application.
+
+Serve with the factory so each worker builds its own app:
+
+    uvicorn app.main:create_app --factory
+
+`app.main:app` still works; the module-level app is only built when first
+accessed. Importing this module has no side effects, so it is safe to preload
+in a master process before forking workers: the engine, connection pool,
+Redis listener and hashing pool are all created by the lifespan, per worker.
+"""
+import asyncio
 import logging
+from contextlib import asynccontextmanager
+from typing import Any, Optional
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.openapi.docs import get_swagger_ui_html
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.openapi.utils import get_openapi
-from app.core.config import settings
+from sqlalchemy import select
+from app.core.config import Settings, settings as default_settings
+from app.core.access_index import access_index
+from app.core.change_feed import change_feed
+from app.core.diagnostics import QueryDiagnosticsMiddleware
+from app.core.hashing import PasswordHasherBusy, password_hasher
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.principal_cache import Principal, principal_cache
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.redis_client import close_redis
+from app.core.serialization import ORJSONResponse
+from app.core.token_revocation import token_revocations
+from app.db.partitions import maintain_partitions
+from app.db.pool import PoolExhausted
+from app.db.routing import sticky_primary
+from app.db.write_behind import write_behind
+from app.db.session import AsyncSessionLocal, init_engine, warm_pool, dispose_engine, pool_stats
 from app.api.v1.api import api_router
+from app.models.user import User
+from app.services.access import AccessService
+from app.services.base import VersionConflict
+from app.services.pagination import InvalidCursor
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    swagger_ui_parameters={"persistAuthorization": True}
-)
-
-# Set all CORS enabled origins
-if settings.BACKEND_CORS_ORIGINS:
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=[str(origin) for origin in settings.BACKEND_CORS_ORIGINS],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
+async def prime_caches(users: int) -> None:
+    """Load principals and access for the most recently synced users"""
+    if users <= 0:
+        return
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(User)
+            .where(User.last_sync.is_not(None))
+            .order_by(User.last_sync.desc())
+            .limit(users)
+        )
+        access = AccessService(db)
+        for user in result.scalars():
+            await principal_cache.set(Principal.from_user(user))
+            await access.get_access(user.id)
+
+def configure_components(settings: Settings) -> None:
+    """Apply an app's settings to the process-wide caches and pools, which
+    are built from the environment at import"""
+    principal_cache.configure(settings)
+    access_index.configure(settings)
+    password_hasher.configure(settings)
+    token_revocations.configure(settings)
+    change_feed.configure(settings)
+    write_behind.configure(settings)
+    sticky_primary.configure(settings)
+
+def build_lifespan(settings: Settings):
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Here rather than at import, so preloading the module stays free of
+        # side effects; a no-op if the server already configured logging
+        logging.basicConfig(level=logging.INFO)
+        configure_components(settings)
+        engine = init_engine(settings)
+        try:
+            await warm_pool(settings.DB_WARMUP_CONNECTIONS)
+            await prime_caches(settings.STARTUP_PRIME_USERS)
+        except Exception:
+            # The pool reconnects on demand; a cold start is not fatal
+            logger.warning("Startup warm-up failed", exc_info=True)
+        await password_hasher.warm_up()
+        access_index.start_listener()
+        principal_cache.start_listener()
+        token_revocations.start_listener()
+        if not await token_revocations.wait_loaded(settings.TOKEN_REVOCATION_LOAD_TIMEOUT_SECONDS):
+            logger.warning("Revoked token families not loaded yet; checking Redis until they are")
+        change_feed.start_listener()
+        write_behind.start()
+
+        sync_worker = None
+        if settings.SYNC_RETRY_WORKER_ENABLED:
+            from app.workers.sync_retry import SyncRetryWorker
+            sync_worker = SyncRetryWorker()
+            sync_worker.start()
+
+        partition_task = None
+        if engine.dialect.name == "postgresql" and settings.ACTIVITY_PARTITION_CHECK_HOURS > 0:
+            partition_task = asyncio.create_task(maintain_partitions(
+                engine,
+                months_ahead=settings.ACTIVITY_PARTITION_MONTHS_AHEAD,
+                interval=settings.ACTIVITY_PARTITION_CHECK_HOURS * 3600
+            ))
+        yield
+        if partition_task is not None:
+            partition_task.cancel()
+            try:
+                await partition_task
+            except asyncio.CancelledError:
+                pass
+        if sync_worker is not None:
+            await sync_worker.stop()
+        # Before the engine goes away
+        await write_behind.stop()
+        await access_index.stop_listener()
+        await principal_cache.stop_listener()
+        await token_revocations.stop_listener()
+        await change_feed.stop_listener()
+        password_hasher.shutdown()
+        await close_redis()
+        await dispose_engine()
+
+    return lifespan
 
-@app.middleware("http")
 async def log_requests(request: Request, call_next):
     try:
         response = await call_next(request)
@@ -40,45 +138,134 @@ async def log_requests(request: Request, call_next):
             content={"detail": str(e)}
         )
 
-def custom_openapi():
-    if app.openapi_schema:
-        return app.openapi_schema
-    
-    openapi_schema = get_openapi(
-        title=settings.PROJECT_NAME,
-        version="1.0.0",
-        description="ParentPal API Documentation",
-        routes=app.routes,
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication service busy, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
+async def pool_exhausted_handler(request: Request, exc: PoolExhausted):
+    logger.warning("Database pool exhausted: %s %s: %s", request.method, request.url.path, exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service busy, please retry"},
+        headers={"Retry-After": "1"}
     )
-    
-    # Add Bearer token security scheme
-    openapi_schema["components"]["securitySchemes"] = {
-        "bearerAuth": {
-            "type": "http",
-            "scheme": "bearer",
-            "bearerFormat": "JWT"
-        }
-    }
-    
-    # Apply security globally
-    openapi_schema["security"] = [{"bearerAuth": []}]
-    
-    app.openapi_schema = openapi_schema
-    return app.openapi_schema
 
-app.openapi = custom_openapi
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(
+        status_code=400,
+        content={"detail": "Invalid pagination cursor"}
+    )
+
+async def version_conflict_handler(request: Request, exc: VersionConflict):
+    # A stale If-Match is a failed precondition rather than a conflict
+    return JSONResponse(
+        status_code=412 if "if-match" in request.headers else 409,
+        content={"detail": "Record was modified by another request, reload and retry"}
+    )
 
-@app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "db_pool": pool_stats(),
+        "realtime": change_feed.stats(),
+        "write_behind": write_behind.stats()
     }
 
-# Include API router with correct prefix
-app.include_router(api_router, prefix=settings.API_V1_STR)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the application; nothing here touches the network.
+
+    The lifespan applies these settings to the shared caches and pools, so
+    run one app per process.
+    """
+    settings = settings or default_settings
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        lifespan=build_lifespan(settings),
+        default_response_class=ORJSONResponse,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        swagger_ui_parameters={"persistAuthorization": True}
+    )
+
+    if settings.RATE_LIMIT_ENABLED:
+        app.add_middleware(RateLimitMiddleware, settings=settings)
+
+    # Set all CORS enabled origins
+    if settings.BACKEND_CORS_ORIGINS:
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=[str(origin) for origin in settings.BACKEND_CORS_ORIGINS],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+
+    app.middleware("http")(log_requests)
+    if settings.QUERY_DIAGNOSTICS_ENABLED:
+        app.add_middleware(QueryDiagnosticsMiddleware)
+    if settings.METRICS_ENABLED:
+        # Added last so it is outermost and times the whole stack
+        app.add_middleware(MetricsMiddleware)
+    app.add_exception_handler(PasswordHasherBusy, password_hasher_busy_handler)
+    app.add_exception_handler(PoolExhausted, pool_exhausted_handler)
+    app.add_exception_handler(InvalidCursor, invalid_cursor_handler)
+    app.add_exception_handler(VersionConflict, version_conflict_handler)
+
+    def custom_openapi():
+        # Built on the first request for the schema, not at startup
+        if app.openapi_schema:
+            return app.openapi_schema
+
+        openapi_schema = get_openapi(
+            title=settings.PROJECT_NAME,
+            version="1.0.0",
+            description="ParentPal API Documentation",
+            routes=app.routes,
+        )
+
+        # Add Bearer token security scheme
+        openapi_schema["components"]["securitySchemes"] = {
+            "bearerAuth": {
+                "type": "http",
+                "scheme": "bearer",
+                "bearerFormat": "JWT"
+            }
+        }
+
+        # Apply security globally
+        openapi_schema["security"] = [{"bearerAuth": []}]
+
+        app.openapi_schema = openapi_schema
+        return app.openapi_schema
+
+    app.openapi = custom_openapi
+
+    app.get("/health")(health_check)
+    if settings.METRICS_ENABLED:
+        app.get("/metrics", include_in_schema=False)(metrics)
+
+    # Include API router with correct prefix
+    app.include_router(api_router, prefix=settings.API_V1_STR)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for route in app.routes:
+            # Included routers are listed as a whole, without a path
+            logger.debug("Mounted route %s %s", getattr(route, "methods", None), getattr(route, "path", route))
+    return app
+
+_app: Optional[FastAPI] = None
 
-# Print mounted routes for debugging
-print("\nMounted routes:")
-for route in app.routes:
-    print(f"{route.methods} {route.path}")
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    # Lazily built `app` for `uvicorn app.main:app`
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,22 @@
-from sqlalchemy import Column, String, JSON, Integer, ForeignKey, Enum, DateTime, Index
+from sqlalchemy import DDL, Column, String, Integer, Float, ForeignKey, Enum, DateTime, Index, event, literal_column
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
 from app.db.base_class import Base
+from app.db.types import JSONDocument
 from app.models.enums import ActivityType, SyncStatus
 
 class Activity(Base):
     id = Column(String, primary_key=True, index=True)
     baby_id = Column(String, ForeignKey("baby.id"), nullable=False)
     type = Column(Enum(ActivityType), nullable=False)
-    start_time = Column(DateTime, nullable=False, index=True)
+    # Part of the table's primary key because Postgres partitions on it;
+    # rows are still identified by id alone (see __mapper_args__ and
+    # ACTIVITY_KEY_DDL)
+    start_time = Column(DateTime, primary_key=True, nullable=False, index=True)
     end_time = Column(DateTime, nullable=True)
-    activity_metadata = Column(JSON, default={})
+    activity_metadata = Column(JSONDocument, default={})
     created_by = Column(String, ForeignKey("user.id"), nullable=False)
     version = Column(Integer, default=1)
     sync_status = Column(Enum(SyncStatus), default=SyncStatus.PENDING)
@@ -20,8 +27,94 @@ class Activity(Base):
     baby = relationship("Baby", back_populates="activities")
     created_by_user = relationship("User", back_populates="activities")
 
-    # Indexes for efficient querying
+    # Indexes for efficient querying; on Postgres each is created per
+    # monthly partition (app.db.partitions)
     __table_args__ = (
         Index('idx_activity_baby_time', 'baby_id', 'start_time'),
         Index('idx_activity_sync', 'sync_status', 'last_sync_attempt'),
-    )
\ No newline at end of file
+        Index('idx_activity_baby_updated', 'baby_id', 'updated_at'),
+        {'postgresql_partition_by': 'RANGE (start_time)'},
+    )
+    __mapper_args__ = {'primary_key': [id]}
+
+def metadata_text(key: str):
+    """activity_metadata ->> 'key', with the key inline rather than a bound
+    parameter so the planner can match it to the expression indexes below"""
+    return Activity.activity_metadata.op("->>", return_type=String)(literal_column(f"'{key}'"))
+
+class metadata_number(ColumnElement):
+    """activity_metadata's `key` as a float, NULL unless it is a JSON number.
+
+    Metadata is whatever clients send, so a plain cast would fail on "120ml"
+    or true, and with it every write of such a row once the cast is indexed.
+    """
+    type = Float()
+    inherit_cache = True
+    _traverse_internals = [("key", InternalTraversal.dp_string)]
+
+    def __init__(self, key: str):
+        self.key = key
+
+@compiles(metadata_number)
+def _compile_metadata_number(element: metadata_number, compiler, **kw) -> str:
+    document = compiler.process(Activity.__table__.c.activity_metadata, **kw)
+    key = element.key
+    if compiler.dialect.name == "postgresql":
+        is_number = f"jsonb_typeof({document} -> '{key}') = 'number'"
+    else:
+        is_number = f"json_type({document}, '$.{key}') IN ('integer', 'real')"
+    # Parenthesised: index DDL needs it around anything but a function call
+    return f"(CASE WHEN {is_number} THEN CAST({document} ->> '{key}' AS FLOAT) END)"
+
+# Hot metadata keys, shared by the indexes, app.services.filters and rollups
+FEED_SIDE = metadata_text("side")
+FEED_AMOUNT_ML = metadata_number("amount_ml")
+SLEEP_LOCATION = metadata_text("location")
+
+# Postgres-only: containment (@>) on any metadata key, and partial indexes on
+# the hot keys per baby. A comparison on the key implies it is not null, so
+# the partial indexes also serve prepared (generic) plans.
+Index(
+    'idx_activity_metadata', Activity.activity_metadata,
+    postgresql_using='gin', postgresql_ops={'activity_metadata': 'jsonb_path_ops'}
+).ddl_if(dialect='postgresql')
+Index(
+    'idx_activity_feed_side', Activity.baby_id, FEED_SIDE, Activity.start_time,
+    postgresql_where=FEED_SIDE.is_not(None)
+).ddl_if(dialect='postgresql')
+Index(
+    'idx_activity_feed_amount', Activity.baby_id, FEED_AMOUNT_ML,
+    postgresql_where=FEED_AMOUNT_ML.is_not(None)
+).ddl_if(dialect='postgresql')
+Index(
+    'idx_activity_sleep_location', Activity.baby_id, SLEEP_LOCATION, Activity.start_time,
+    postgresql_where=SLEEP_LOCATION.is_not(None)
+).ddl_if(dialect='postgresql')
+
+# A partitioned table's unique indexes must include start_time, so on
+# Postgres ids are registered in the unpartitioned activity_key table by a
+# trigger: a second row with the same id fails its insert, whatever its
+# month or baby. Moving a row between partitions deletes and reinserts its
+# key. Elsewhere a plain unique index does the job.
+ACTIVITY_KEY_DDL = [
+    "CREATE TABLE activity_key (id VARCHAR PRIMARY KEY)",
+    """CREATE FUNCTION activity_key_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO activity_key (id) VALUES (NEW.id);
+    ELSE
+        DELETE FROM activity_key WHERE id = OLD.id;
+    END IF;
+    RETURN NULL;
+END $$""",
+    "CREATE TRIGGER activity_key_sync AFTER INSERT OR DELETE ON activity "
+    "FOR EACH ROW EXECUTE FUNCTION activity_key_sync()",
+]
+for statement in ACTIVITY_KEY_DDL:
+    event.listen(Activity.__table__, "after_create", DDL(statement).execute_if(dialect='postgresql'))
+for statement in ("DROP TABLE IF EXISTS activity_key", "DROP FUNCTION IF EXISTS activity_key_sync()"):
+    event.listen(Activity.__table__, "after_drop", DDL(statement).execute_if(dialect='postgresql'))
+
+Index('uq_activity_id', Activity.id, unique=True).ddl_if(
+    callable_=lambda ddl, target, bind, **kw: kw["dialect"].name != 'postgresql'
+)
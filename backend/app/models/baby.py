@@ -1,17 +1,23 @@
-from sqlalchemy import Column, String, JSON, Integer, ForeignKey, Enum
+from sqlalchemy import Column, String, Integer, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
+from app.db.types import JSONDocument
 from app.models.enums import SyncStatus
 
 class Baby(Base):
     id = Column(String, primary_key=True, index=True)
     name = Column(String, nullable=False)
     primary_caregiver_id = Column(String, ForeignKey("user.id"), nullable=False)
-    development_data = Column(JSON, default={})
+    development_data = Column(JSONDocument, default={})
     version = Column(Integer, default=1)
     sync_status = Column(Enum(SyncStatus), default=SyncStatus.SYNCED)
 
     # Relationships
     primary_caregiver = relationship("User", back_populates="babies")
     care_team = relationship("CareTeamMember", back_populates="baby")
-    activities = relationship("Activity", back_populates="baby")
\ No newline at end of file
+    activities = relationship("Activity", back_populates="baby")
+
+    # Indexes for delta sync
+    __table_args__ = (
+        Index('idx_baby_caregiver_updated', 'primary_caregiver_id', 'updated_at'),
+    )
\ No newline at end of file
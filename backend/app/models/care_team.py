@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, JSON, Integer, ForeignKey, Enum, DateTime, Index
+from sqlalchemy import Column, String, Integer, ForeignKey, Enum, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
+from app.db.types import JSONDocument
 from app.models.enums import CareTeamRole, SyncStatus
 
 class CareTeamMember(Base):
@@ -8,7 +9,7 @@ class CareTeamMember(Base):
     baby_id = Column(String, ForeignKey("baby.id"), nullable=False)
     user_id = Column(String, ForeignKey("user.id"), nullable=False)
     role = Column(Enum(CareTeamRole), nullable=False)
-    permissions = Column(JSON, default={})
+    permissions = Column(JSONDocument, default={})
     version = Column(Integer, default=1)
     sync_status = Column(Enum(SyncStatus), default=SyncStatus.PENDING)
     sync_attempts = Column(Integer, default=0)
@@ -21,5 +22,7 @@ class CareTeamMember(Base):
     # Indexes
     __table_args__ = (
         Index('idx_care_team_access', 'baby_id', 'user_id', 'role'),
-        Index('idx_care_team_sync', 'sync_status', 'last_sync_attempt')
+        Index('idx_care_team_sync', 'sync_status', 'last_sync_attempt'),
+        Index('idx_care_team_user', 'user_id', 'baby_id'),
+        Index('idx_care_team_baby_updated', 'baby_id', 'updated_at'),
     )
\ No newline at end of file
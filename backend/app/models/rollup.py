@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, Enum, Date, DateTime
+from app.db.base_class import Base
+from app.models.enums import ActivityType
+
+class ActivityDailyRollup(Base):
+    """Per-baby, per-day (UTC), per-type activity totals for dashboards"""
+    baby_id = Column(String, ForeignKey("baby.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    type = Column(Enum(ActivityType), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    # Sum of end_time - start_time for activities that have ended
+    total_duration_seconds = Column(Float, nullable=False, default=0)
+    # Sum of activity_metadata.amount_ml, for feeds
+    total_amount_ml = Column(Float, nullable=False, default=0)
+    first_start = Column(DateTime, nullable=False)
+    last_start = Column(DateTime, nullable=False)
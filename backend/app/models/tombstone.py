@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, Index
+from app.db.base_class import Base
+
+class Tombstone(Base):
+    """Marker left behind when a synced row is deleted, so clients can drop it"""
+    id = Column(String, primary_key=True, index=True)
+    entity_type = Column(String, nullable=False)
+    entity_id = Column(String, nullable=False)
+    # Baby whose care team can see the deletion
+    baby_id = Column(String, nullable=True)
+    # Set when only one user needs to see it, e.g. after losing access to a baby
+    user_id = Column(String, nullable=True)
+
+    # Indexes for delta sync
+    __table_args__ = (
+        Index('idx_tombstone_baby_updated', 'baby_id', 'updated_at'),
+        Index('idx_tombstone_user_updated', 'user_id', 'updated_at'),
+    )
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Boolean, JSON, Integer, DateTime
+from sqlalchemy import Column, String, Boolean, Integer, DateTime
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
+from app.db.types import JSONDocument
 
 class User(Base):
     id = Column(String, primary_key=True, index=True)
@@ -8,8 +9,10 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     full_name = Column(String)
     is_active = Column(Boolean, default=True)
-    preferences = Column(JSON, default={})
+    preferences = Column(JSONDocument, default={})
     version = Column(Integer, default=1)
+    # Bumped to invalidate every token issued to the user, e.g. on a password change
+    token_version = Column(Integer, default=1, nullable=False)
     last_sync = Column(DateTime, nullable=True)
 
     # Relationships
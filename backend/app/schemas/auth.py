@@ -10,8 +10,10 @@ class Token(BaseModel):
 class TokenPayload(BaseModel):
     sub: str
     exp: int
-    type: str
+    type: str = "access"
     version: int = 1
+    jti: Optional[str] = None
+    fam: Optional[str] = None
 
 class Login(BaseModel):
     email: EmailStr
@@ -0,0 +1,24 @@
+from datetime import date, datetime
+from typing import List, Optional
+from pydantic import BaseModel
+from app.models.enums import ActivityType
+
+class DailyActivitySummary(BaseModel):
+    day: date
+    type: ActivityType
+    count: int
+    total_duration_seconds: float
+    total_amount_ml: float
+    first_start: datetime
+    last_start: datetime
+
+class ActivitySummary(BaseModel):
+    baby_id: str
+    start: date
+    end: date
+    days: List[DailyActivitySummary]
+    total_sleep_seconds: float
+    feed_count: int
+    total_feed_amount_ml: float
+    average_feed_interval_seconds: Optional[float] = None
+    last_diaper_at: Optional[datetime] = None
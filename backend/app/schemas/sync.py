@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, field_validator
+from app.core.config import settings
+from app.models.enums import ActivityType
+
+class SyncItemStatus(str, Enum):
+    ACCEPTED = "accepted"
+    CONFLICT = "conflict"
+    REJECTED = "rejected"
+
+class ActivitySyncItem(BaseModel):
+    """Client copy of an activity; version is the version after the client's edit"""
+    id: str
+    baby_id: str
+    type: ActivityType
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    activity_metadata: Dict[str, Any] = {}
+    version: int = 1
+
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def to_naive_utc(cls, v: Optional[datetime]) -> Optional[datetime]:
+        # Timestamps are stored as naive UTC
+        if v is not None and v.tzinfo is not None:
+            return v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
+
+class ActivitySyncBatch(BaseModel):
+    activities: List[ActivitySyncItem]
+
+    @field_validator("activities")
+    @classmethod
+    def check_batch_size(cls, v: List[ActivitySyncItem]) -> List[ActivitySyncItem]:
+        if len(v) > settings.MAX_SYNC_BATCH_SIZE:
+            raise ValueError(
+                f"At most {settings.MAX_SYNC_BATCH_SIZE} activities can be synced per batch"
+            )
+        return v
+
+class ActivitySyncResult(BaseModel):
+    id: str
+    status: SyncItemStatus
+    version: Optional[int] = None
+    server_copy: Optional[ActivitySyncItem] = None
+    detail: Optional[str] = None
+
+class ActivitySyncResponse(BaseModel):
+    results: List[ActivitySyncResult]
+    accepted: int
+    conflicts: int
+    rejected: int
@@ -0,0 +1,95 @@
+from typing import Iterable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy import inspect as sa_inspect
+from app.core.access_index import ALL_PERMISSIONS, BabyAccess, UserAccess, access_index
+from app.db.routing import use_primary
+from app.models.baby import Baby
+from app.models.care_team import CareTeamMember
+from app.models.enums import CareTeamRole
+from . import hooks
+
+PENDING_KEY = hooks.pending("access_index_pending")
+
+def _queue(db: AsyncSession, message: dict) -> None:
+    db.info.setdefault(PENDING_KEY, []).append(message)
+
+def _old_values(obj, attr: str) -> list:
+    state = sa_inspect(obj)
+    values = [getattr(obj, attr)]
+    if state.persistent:
+        values.extend(getattr(state.attrs, attr).history.deleted)
+    return [v for v in values if v is not None]
+
+@hooks.on_write(CareTeamMember)
+def mark_membership(db: AsyncSession, obj: CareTeamMember) -> None:
+    for user_id in _old_values(obj, "user_id"):
+        _queue(db, {"user_id": user_id, "baby_id": obj.baby_id, "version": obj.version or 0})
+
+@hooks.on_write(Baby)
+def mark_baby(db: AsyncSession, obj: Baby) -> None:
+    # A new or deleted baby, or a changed primary caregiver, can affect the
+    # whole care team
+    _queue(db, {"baby_id": obj.id, "all_users": True})
+    for user_id in _old_values(obj, "primary_caregiver_id"):
+        _queue(db, {"user_id": user_id})
+
+@hooks.after_commit
+async def publish_pending(db: AsyncSession) -> None:
+    messages = db.info.pop(PENDING_KEY, None)
+    if messages:
+        await access_index.invalidate(messages)
+
+class AccessService:
+    """Answers which babies a user may read and log activities for, and with
+    which role and permissions, from the in-process access index"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _load(self, user_id: str) -> UserAccess:
+        # Cached process-wide: a lagging replica could bring back access that
+        # was just revoked and keep it for the index's TTL
+        use_primary(self.db)
+        access: UserAccess = {}
+        result = await self.db.execute(
+            select(CareTeamMember.baby_id, CareTeamMember.role, CareTeamMember.permissions, CareTeamMember.version)
+            .where(CareTeamMember.user_id == user_id)
+        )
+        for baby_id, role, permissions, version in result:
+            access[baby_id] = BabyAccess(
+                role=role,
+                permissions=frozenset(k for k, v in (permissions or {}).items() if v),
+                version=version or 0
+            )
+
+        result = await self.db.execute(
+            select(Baby.id, Baby.version).where(Baby.primary_caregiver_id == user_id)
+        )
+        for baby_id, version in result:
+            access[baby_id] = BabyAccess(
+                role=CareTeamRole.PRIMARY,
+                permissions=frozenset({ALL_PERMISSIONS}),
+                version=version or 0
+            )
+        return access
+
+    async def get_access(self, user_id: str) -> UserAccess:
+        """All babies the user can access, keyed by baby_id"""
+        access = access_index.get(user_id)
+        if access is None:
+            access = await self._load(user_id)
+            access_index.set(user_id, access)
+        return access
+
+    async def get_baby_access(self, user_id: str, baby_id: str) -> Optional[BabyAccess]:
+        return (await self.get_access(user_id)).get(baby_id)
+
+    async def has_permission(self, user_id: str, baby_id: str, permission: str) -> bool:
+        baby_access = await self.get_baby_access(user_id, baby_id)
+        return baby_access is not None and baby_access.allows(permission)
+
+    async def accessible_baby_ids(self, user_id: str, baby_ids: Iterable[str]) -> set[str]:
+        """Filter baby_ids down to those the user is a caregiver for"""
+        access = await self.get_access(user_id)
+        return {baby_id for baby_id in baby_ids if baby_id in access}
@@ -1,76 +1,348 @@
-from typing import Generic, TypeVar, Type, Any, Optional
+from functools import lru_cache
+from typing import Generic, TypeVar, Type, Any, Optional, Sequence
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, insert, update, delete, func, tuple_, literal, column, values, Enum as SAEnum
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import InstrumentedAttribute, selectinload, joinedload, raiseload
+from sqlalchemy.orm.util import identity_key
 from sqlalchemy.sql import Select
-from fastapi.encoders import jsonable_encoder
+from app.core.etag import Validator, list_validator, resource_validator
 from app.db.base_class import Base
+from . import hooks
+from .delta import build_tombstones
+from .pagination import Cursor, Page, encode_cursor, decode_cursor
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+class VersionConflict(Exception):
+    """Raised when an update expected a version the row no longer has"""
+
+    def __init__(self, model: str, id: Any, expected_version: int | None):
+        super().__init__(f"{model} {id} is no longer at version {expected_version}")
+        self.model = model
+        self.id = id
+        self.expected_version = expected_version
+
+# Relationship path -> strategy, e.g. {"activities": "selectin", "care_team.user": "joined"}
+Load = dict[str, str]
+
+LOADERS = {"selectin": selectinload, "joined": joinedload, "raise": raiseload}
+
+@lru_cache(maxsize=None)
+def _column_keys(model: type) -> frozenset[str]:
+    return frozenset(sa_inspect(model).columns.keys())
+
 class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType], db: AsyncSession):
         self.model = model
         self.db = db
 
-    async def get(self, id: Any) -> Optional[ModelType]:
+    def load_options(self, load: Load | None) -> list:
+        """Loader options for the relationships a caller is going to touch.
+
+        Relationships are lazy by default, which on an async session either
+        raises or issues one query per parent; name them here instead.
+        """
+        options = []
+        for path, strategy in (load or {}).items():
+            if strategy not in LOADERS:
+                raise ValueError(f"Unknown loading strategy {strategy!r} for {path}")
+            entity, option = self.model, None
+            for name in path.split("."):
+                attr = getattr(entity, name)
+                option = LOADERS[strategy](attr) if option is None else getattr(option, f"{strategy}load")(attr)
+                entity = attr.property.mapper.class_
+            options.append(option)
+        return options
+
+    async def get(self, id: Any, *, load: Load | None = None) -> Optional[ModelType]:
         """Get a single record by id"""
-        query = select(self.model).where(self.model.id == id)
+        query = select(self.model).where(self.model.id == id).options(*self.load_options(load))
         result = await self.db.execute(query)
-        return result.scalar_one_or_none()
+        return result.unique().scalar_one_or_none()
 
     async def get_multi(
         self, 
         *,
         skip: int = 0,
         limit: int = 100,
-        query: Select | None = None
+        query: Select | None = None,
+        load: Load | None = None
     ) -> list[ModelType]:
         """Get multiple records with optional filtering"""
         if query is None:
             query = select(self.model)
         
-        query = query.offset(skip).limit(limit)
+        query = query.options(*self.load_options(load)).offset(skip).limit(limit)
+        result = await self.db.execute(query)
+        return result.unique().scalars().all()
+
+    def _page_query(
+        self,
+        *,
+        order_by: Sequence[InstrumentedAttribute] | None,
+        cursor: str | None,
+        limit: int,
+        descending: bool,
+        query: Select | None
+    ) -> tuple[Select, list[str], Cursor | None]:
+        """The keyset query for a page (limit + 1 rows), its order keys and
+        the decoded cursor"""
+        if order_by is None:
+            order_by = (self.model.updated_at, self.model.id)
+        keys = [column.key for column in order_by]
+        if query is None:
+            query = select(self.model)
+
+        position: Cursor | None = None
+        if cursor is not None:
+            position = decode_cursor(cursor, keys, descending)
+            values = [
+                literal(
+                    column.type.enum_class(value)
+                    if isinstance(column.type, SAEnum) and column.type.enum_class
+                    else value,
+                    column.type
+                )
+                for column, value in zip(order_by, position.values)
+            ]
+            # Paging backwards walks the index in the opposite direction
+            if position.before != descending:
+                query = query.where(tuple_(*order_by) < tuple_(*values))
+            else:
+                query = query.where(tuple_(*order_by) > tuple_(*values))
+
+        reverse = (position is not None and position.before) != descending
+        query = query.order_by(
+            *(column.desc() if reverse else column.asc() for column in order_by)
+        ).limit(limit + 1)
+        return query, keys, position
+
+    async def get_page(
+        self,
+        *,
+        order_by: Sequence[InstrumentedAttribute] | None = None,
+        cursor: str | None = None,
+        limit: int = 100,
+        descending: bool = False,
+        query: Select | None = None,
+        load: Load | None = None
+    ) -> Page[ModelType]:
+        """Get a page of records using keyset (cursor) pagination.
+
+        Rows are ordered by the `order_by` column tuple, which must be
+        non-null and unique, e.g. (baby_id, start_time, id) for activity
+        history or the default (updated_at, id). Pass a page's next_cursor
+        or prev_cursor back in to move forwards or backwards.
+        """
+        query, keys, position = self._page_query(
+            order_by=order_by, cursor=cursor, limit=limit, descending=descending, query=query
+        )
+        query = query.options(*self.load_options(load))
         result = await self.db.execute(query)
-        return result.scalars().all()
-
-    async def create(self, *, obj_in: CreateSchemaType) -> ModelType:
-        """Create a new record"""
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data)
-        self.db.add(db_obj)
-        await self.db.commit()
-        await self.db.refresh(db_obj)
+        items = list(result.unique().scalars().all())
+        before = position is not None and position.before
+
+        has_more = len(items) > limit
+        items = items[:limit]
+        if before:
+            items.reverse()
+        if not items:
+            return Page(items=items)
+
+        def cursor_for(obj: ModelType, is_before: bool) -> str:
+            return encode_cursor(Cursor(
+                keys=tuple(keys),
+                values=[getattr(obj, key) for key in keys],
+                before=is_before,
+                descending=descending
+            ))
+
+        page = Page(items=items)
+        if has_more or before:
+            page.next_cursor = cursor_for(items[-1], False)
+        if position is not None and (has_more or not before):
+            page.prev_cursor = cursor_for(items[0], True)
+        return page
+
+    def validator(self, obj: ModelType) -> Validator:
+        """ETag and Last-Modified of a loaded record"""
+        return resource_validator(obj.version, obj.updated_at)
+
+    def page_validator(self, page: Page[ModelType]) -> Validator:
+        """ETag and Last-Modified of a loaded page"""
+        return list_validator((obj.id, obj.version, obj.updated_at) for obj in page.items)
+
+    async def get_validator(self, id: Any) -> Optional[Validator]:
+        """The record's validator from its version alone, None if it is gone.
+
+        Lets a conditional GET answer 304 without loading the row.
+        """
+        result = await self.db.execute(
+            select(self.model.version, self.model.updated_at).where(self.model.id == id)
+        )
+        row = result.one_or_none()
+        return None if row is None else resource_validator(row.version, row.updated_at)
+
+    async def get_page_validator(
+        self,
+        *,
+        order_by: Sequence[InstrumentedAttribute] | None = None,
+        cursor: str | None = None,
+        limit: int = 100,
+        query: Select | None = None,
+        descending: bool = False
+    ) -> Validator:
+        """The validator get_page's result would have, from the same keyset
+        query reading only id, version and updated_at"""
+        query, _, position = self._page_query(
+            order_by=order_by, cursor=cursor, limit=limit, descending=descending, query=query
+        )
+        result = await self.db.execute(
+            query.with_only_columns(self.model.id, self.model.version, self.model.updated_at)
+        )
+        rows = result.all()[:limit]
+        # Same order as the page's items, so the ETags agree
+        if position is not None and position.before:
+            rows.reverse()
+        return list_validator(rows)
+
+    def _write_data(self, data: dict[str, Any]) -> dict[str, Any]:
+        """Columns a caller may set; id and version are managed here"""
+        columns = _column_keys(self.model)
+        return {
+            key: value for key, value in data.items()
+            if key in columns and key not in ("id", "version")
+        }
+
+    async def create(self, *, obj_in: CreateSchemaType | dict[str, Any]) -> ModelType:
+        """Create a new record with a single INSERT ... RETURNING"""
+        obj_in_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump()
+        stmt = insert(self.model).values(**obj_in_data).returning(self.model)
+        db_obj = (await self.db.scalars(stmt)).one()
+        hooks.notify_write(self.db, db_obj)
+        await hooks.commit(self.db)
         return db_obj
 
+    async def create_many(
+        self,
+        *,
+        objs_in: Sequence[CreateSchemaType | dict[str, Any]]
+    ) -> list[ModelType]:
+        """Create records with one multi-row INSERT ... RETURNING"""
+        if not objs_in:
+            return []
+        rows = [obj if isinstance(obj, dict) else obj.model_dump() for obj in objs_in]
+        result = await self.db.scalars(insert(self.model).returning(self.model), rows)
+        db_objs = list(result.all())
+        for db_obj in db_objs:
+            hooks.notify_write(self.db, db_obj)
+        await hooks.commit(self.db)
+        return db_objs
+
     async def update(
         self,
         *,
         db_obj: ModelType,
-        obj_in: UpdateSchemaType | dict[str, Any]
+        obj_in: UpdateSchemaType | dict[str, Any],
+        expected_version: int | None = None
     ) -> ModelType:
-        """Update a record"""
-        obj_data = jsonable_encoder(db_obj)
+        """Update a record with a single UPDATE ... WHERE version = :v RETURNING.
+
+        The write only applies if the row is still at expected_version (by
+        default the version db_obj was loaded at) and bumps the version;
+        otherwise VersionConflict is raised. A row with no version yet counts
+        as version 1.
+        """
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
-        
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        
-        self.db.add(db_obj)
-        await self.db.commit()
-        await self.db.refresh(db_obj)
-        return db_obj
+        update_data = self._write_data(update_data)
+        if expected_version is None:
+            expected_version = db_obj.version or 1
+
+        # Hooks see the old values now and the new values after the write
+        hooks.notify_write(self.db, db_obj)
+        current_version = func.coalesce(self.model.version, 1)
+        stmt = (
+            update(self.model)
+            .where(self.model.id == db_obj.id, current_version == expected_version)
+            .values(**update_data, version=current_version + 1)
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        updated = (await self.db.scalars(stmt)).one_or_none()
+        if updated is None:
+            raise VersionConflict(self.model.__name__, db_obj.id, expected_version)
+        hooks.notify_write(self.db, updated)
+        await hooks.commit(self.db)
+        return updated
+
+    async def update_many(self, *, objs_in: Sequence[dict[str, Any]]) -> list[ModelType]:
+        """Update records with one UPDATE ... FROM (VALUES ...) per set of columns.
+
+        Each dict holds the row's id, the version the caller last saw and the
+        columns to change. Rows whose version has moved on are left alone and
+        are missing from the result, so callers can diff to find conflicts.
+        A row with no version yet counts as version 1.
+        """
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for obj in objs_in:
+            if obj.get("version") is None:
+                raise ValueError(f"update_many needs the version the caller last saw for {obj.get('id')!r}")
+            data = self._write_data(obj)
+            groups.setdefault(tuple(sorted(data)), []).append(
+                {"id": obj["id"], "expected_version": obj["version"], **data}
+            )
+
+        table = self.model.__table__
+        updated: list[ModelType] = []
+        for keys, rows in groups.items():
+            for row in rows:
+                old = self.db.identity_map.get(identity_key(self.model, row["id"]))
+                if old is not None:
+                    hooks.notify_write(self.db, old)
+
+            incoming = values(
+                column("id", table.c.id.type),
+                column("expected_version", table.c.version.type),
+                *(column(key, table.c[key].type) for key in keys),
+                name="incoming"
+            ).data([
+                (row["id"], row["expected_version"], *(row[key] for key in keys))
+                for row in rows
+            ])
+            current_version = func.coalesce(self.model.version, 1)
+            stmt = (
+                update(self.model)
+                .where(
+                    self.model.id == incoming.c.id,
+                    current_version == incoming.c.expected_version
+                )
+                .values(
+                    {key: incoming.c[key] for key in keys}
+                )
+                .values(version=current_version + 1)
+                .returning(self.model)
+                .execution_options(synchronize_session=False, populate_existing=True)
+            )
+            updated.extend((await self.db.scalars(stmt)).all())
+
+        for db_obj in updated:
+            hooks.notify_write(self.db, db_obj)
+        await hooks.commit(self.db)
+        return updated
 
     async def delete(self, *, id: Any) -> ModelType:
-        """Delete a record"""
+        """Delete a record, leaving tombstones for delta sync"""
         obj = await self.get(id)
         if obj:
+            self.db.add_all(await build_tombstones(self.db, obj))
+            hooks.notify_write(self.db, obj)
             await self.db.delete(obj)
-            await self.db.commit()
+            await hooks.commit(self.db)
         return obj
\ No newline at end of file
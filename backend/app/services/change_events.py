@@ -0,0 +1,63 @@
+from typing import Any, Iterable, Mapping
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import inspect as sa_inspect
+from app.core.change_feed import change_feed
+from app.core.serialization import dumps
+from app.models.activity import Activity
+from app.models.baby import Baby
+from . import hooks
+
+# Written objects, then the events built from them right before commit;
+# both dropped on rollback so only committed changes are announced
+OBJECTS_KEY = hooks.pending("change_event_objects")
+EVENTS_KEY = hooks.pending("change_events")
+
+ACTIVITY_FIELDS = ("id", "baby_id", "type", "start_time", "end_time", "activity_metadata", "version")
+BABY_FIELDS = ("id", "name", "development_data", "version")
+
+def change_event(entity: str, baby_id: str, values: Mapping[str, Any], *, deleted: bool = False) -> dict:
+    """A change event as sent to subscribers; `values` are the row's fields"""
+    fields = ACTIVITY_FIELDS if entity == Activity.__tablename__ else BABY_FIELDS
+    return {
+        "type": "change",
+        "entity": entity,
+        "op": "delete" if deleted else "upsert",
+        "baby_id": baby_id,
+        "id": values["id"],
+        "version": values.get("version"),
+        # Plain JSON types, detached from the session's objects
+        "data": None if deleted else orjson.loads(dumps({field: values.get(field) for field in fields})),
+    }
+
+def queue_events(db: AsyncSession, events: Iterable[dict]) -> None:
+    """Announce events once the session commits, for writes made without
+    notify_write (bulk statements)"""
+    db.info.setdefault(EVENTS_KEY, []).extend(events)
+
+@hooks.on_write(Activity)
+@hooks.on_write(Baby)
+def mark_changed(db: AsyncSession, obj: Any) -> None:
+    # Called before and after an update; the object is read at commit time
+    db.info.setdefault(OBJECTS_KEY, {})[type(obj), obj.id] = obj
+
+@hooks.before_commit
+async def collect_events(db: AsyncSession) -> None:
+    objects = db.info.pop(OBJECTS_KEY, None)
+    if not objects:
+        return
+    events = []
+    for obj in objects.values():
+        state = sa_inspect(obj)
+        deleted = state.was_deleted or obj in db.deleted
+        # Loaded attributes only: nothing here may trigger a lazy load
+        values = state.dict
+        baby_id = values["baby_id"] if isinstance(obj, Activity) else values["id"]
+        events.append(change_event(obj.__tablename__, baby_id, values, deleted=deleted))
+    queue_events(db, events)
+
+@hooks.after_commit
+async def publish_events(db: AsyncSession) -> None:
+    events = db.info.pop(EVENTS_KEY, None)
+    if events:
+        await change_feed.publish(events)
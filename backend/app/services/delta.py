@@ -0,0 +1,111 @@
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, or_, union
+from app.core.config import settings
+from app.db.routing import use_primary
+from app.models.activity import Activity
+from app.models.baby import Baby
+from app.models.care_team import CareTeamMember
+from app.models.tombstone import Tombstone
+
+@dataclass
+class DeltaChunk:
+    entity: str
+    items: list[dict[str, Any]]
+
+async def build_tombstones(db: AsyncSession, obj: Any) -> list[Tombstone]:
+    """Tombstones to record when obj is deleted, empty for unsynced models"""
+    entity_type = obj.__tablename__
+    if isinstance(obj, Baby):
+        # Nobody can see the baby once it is gone, so notify each caregiver
+        result = await db.execute(
+            select(CareTeamMember.user_id).where(CareTeamMember.baby_id == obj.id)
+        )
+        user_ids = {obj.primary_caregiver_id, *result.scalars().all()}
+        return [
+            Tombstone(id=str(uuid.uuid4()), entity_type=entity_type, entity_id=obj.id, user_id=user_id)
+            for user_id in user_ids
+        ]
+    if isinstance(obj, CareTeamMember):
+        return [
+            Tombstone(id=str(uuid.uuid4()), entity_type=entity_type, entity_id=obj.id, baby_id=obj.baby_id),
+            # The removed member loses access to the baby itself
+            Tombstone(id=str(uuid.uuid4()), entity_type=Baby.__tablename__, entity_id=obj.baby_id, user_id=obj.user_id),
+        ]
+    if isinstance(obj, Activity):
+        return [
+            Tombstone(id=str(uuid.uuid4()), entity_type=entity_type, entity_id=obj.id, baby_id=obj.baby_id)
+        ]
+    return []
+
+class DeltaSyncService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def high_water_mark(self) -> datetime:
+        """Upper bound for this sync; the client stores it as its next `since`"""
+        return datetime.utcnow() - timedelta(seconds=settings.DELTA_SYNC_SAFETY_SECONDS)
+
+    def _visible_baby_ids(self, user_id: str):
+        return union(
+            select(Baby.id).where(Baby.primary_caregiver_id == user_id),
+            select(CareTeamMember.baby_id).where(CareTeamMember.user_id == user_id)
+        ).scalar_subquery()
+
+    async def changes_since(
+        self,
+        *,
+        user_id: str,
+        since: Optional[datetime],
+        until: datetime,
+        chunk_size: int | None = None
+    ) -> AsyncIterator[DeltaChunk]:
+        """Yield rows visible to the user with since < updated_at <= until.
+
+        Babies whose care team the user joined after `since` are new to the
+        client, so all of their rows up to `until` are included. Rows are
+        read with a server-side cursor and yielded in chunks of at most
+        chunk_size, so memory stays bounded for a full first sync.
+        """
+        chunk_size = chunk_size or settings.DELTA_SYNC_CHUNK_SIZE
+        # A lagging replica could miss rows below the high-water mark for good
+        use_primary(self.db)
+        if since is not None and since.tzinfo is not None:
+            # Timestamps are stored as naive UTC
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        visible = self._visible_baby_ids(user_id)
+        joined = select(CareTeamMember.baby_id).where(
+            CareTeamMember.user_id == user_id,
+            CareTeamMember.created_at > since,
+            CareTeamMember.created_at <= until
+        ).scalar_subquery() if since is not None else None
+
+        queries = [
+            (Baby, Baby.id.in_(visible), Baby.id),
+            (CareTeamMember, CareTeamMember.baby_id.in_(visible), CareTeamMember.baby_id),
+            (Activity, Activity.baby_id.in_(visible), Activity.baby_id),
+            (Tombstone, or_(
+                Tombstone.baby_id.in_(visible),
+                and_(
+                    Tombstone.user_id == user_id,
+                    # Lost access to a baby, then rejoined: the baby stays
+                    ~and_(Tombstone.entity_type == Baby.__tablename__, Tombstone.entity_id.in_(visible))
+                )
+            ), None),
+        ]
+        for model, scope, baby_id in queries:
+            table = model.__table__
+            query = select(table).where(scope, table.c.updated_at <= until)
+            if since is not None:
+                changed = table.c.updated_at > since
+                if baby_id is not None:
+                    changed = or_(changed, baby_id.in_(joined))
+                query = query.where(changed)
+            query = query.order_by(table.c.updated_at, table.c.id)
+
+            result = await self.db.stream(query.execution_options(yield_per=chunk_size))
+            async for partition in result.mappings().partitions(chunk_size):
+                yield DeltaChunk(entity=table.name, items=[dict(row) for row in partition])
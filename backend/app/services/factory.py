@@ -1,17 +1,39 @@
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
+from . import hooks
 from .user import UserService
 from .baby import BabyService
 from .activity import ActivityService
 from .care_team import CareTeamService
+from .access import AccessService
+from .sync import SyncService
+from .delta import DeltaSyncService
+from .rollup import RollupService
+from .export import ExportService
 
 class ServiceFactory:
+    """Services sharing one session.
+
+    By default every service write commits on its own. Inside unit_of_work()
+    writes are only flushed and the whole block commits once at the end:
+
+        async with services.unit_of_work():
+            baby = await services.baby.create(obj_in=baby_in)
+            await services.care_team.create(obj_in=member_in)
+    """
+
     def __init__(self, db: AsyncSession):
         self.db = db
         self._user_service: Optional[UserService] = None
         self._baby_service: Optional[BabyService] = None
         self._activity_service: Optional[ActivityService] = None
         self._care_team_service: Optional[CareTeamService] = None
+        self._access_service: Optional[AccessService] = None
+        self._sync_service: Optional[SyncService] = None
+        self._delta_service: Optional[DeltaSyncService] = None
+        self._rollup_service: Optional[RollupService] = None
+        self._export_service: Optional[ExportService] = None
 
     @property
     def user(self) -> UserService:
@@ -35,4 +57,75 @@ class ServiceFactory:
     def care_team(self) -> CareTeamService:
         if not self._care_team_service:
             self._care_team_service = CareTeamService(self.db)
-        return self._care_team_service
\ No newline at end of file
+        return self._care_team_service
+
+    @property
+    def access(self) -> AccessService:
+        if not self._access_service:
+            self._access_service = AccessService(self.db)
+        return self._access_service
+
+    @property
+    def sync(self) -> SyncService:
+        if not self._sync_service:
+            self._sync_service = SyncService(self.db)
+        return self._sync_service
+
+    @property
+    def delta(self) -> DeltaSyncService:
+        if not self._delta_service:
+            self._delta_service = DeltaSyncService(self.db)
+        return self._delta_service
+
+    @property
+    def rollup(self) -> RollupService:
+        if not self._rollup_service:
+            self._rollup_service = RollupService(self.db)
+        return self._rollup_service
+
+    @property
+    def export(self) -> ExportService:
+        if not self._export_service:
+            self._export_service = ExportService(self.db)
+        return self._export_service
+
+    @property
+    def in_unit_of_work(self) -> bool:
+        return bool(self.db.info.get(hooks.UNIT_OF_WORK_KEY))
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator["ServiceFactory"]:
+        """Run the block as one transaction: commit on exit, roll back on error.
+
+        Entering it again while one is open opens a savepoint instead.
+        """
+        if self.in_unit_of_work:
+            async with self.savepoint():
+                yield self
+            return
+
+        self.db.info[hooks.UNIT_OF_WORK_KEY] = True
+        try:
+            yield self
+        except BaseException:
+            self.db.info.pop(hooks.UNIT_OF_WORK_KEY, None)
+            await hooks.rollback(self.db)
+            raise
+        self.db.info.pop(hooks.UNIT_OF_WORK_KEY, None)
+        try:
+            await hooks.commit(self.db)
+        except BaseException:
+            await hooks.rollback(self.db)
+            raise
+
+    @asynccontextmanager
+    async def savepoint(self) -> AsyncIterator["ServiceFactory"]:
+        """Roll back only the writes made in the block if it raises"""
+        # Hook work queued in the block must not fire for rolled-back writes
+        saved = hooks.snapshot(self.db)
+        try:
+            async with self.db.begin_nested():
+                yield self
+        except BaseException:
+            hooks.restore(self.db, saved)
+            raise
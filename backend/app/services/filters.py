@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Mapping, Optional, Sequence
+from sqlalchemy import type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import ColumnElement
+from app.models.activity import Activity, FEED_AMOUNT_ML, FEED_SIDE, SLEEP_LOCATION
+from app.models.enums import ActivityType
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+@dataclass(frozen=True)
+class ActivityFilter:
+    """Typed filter over a baby's activity history.
+
+    Each field compiles to a predicate one of activity's indexes can serve:
+    start/end bound start_time (and prune partitions), the feed and sleep
+    fields compare the expression-indexed metadata keys, and `metadata`
+    is a JSONB containment test for the GIN index (Postgres only). Setting a
+    feed or sleep field also restricts the type.
+    """
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    types: Optional[Sequence[ActivityType]] = None
+    feed_side: Optional[str] = None
+    min_amount_ml: Optional[float] = None
+    max_amount_ml: Optional[float] = None
+    sleep_location: Optional[str] = None
+    metadata: Optional[Mapping[str, Any]] = None
+
+    def conditions(self) -> list[ColumnElement[bool]]:
+        """The filter as WHERE clauses on activity"""
+        conditions: list[ColumnElement[bool]] = []
+        if self.start is not None:
+            conditions.append(Activity.start_time >= _naive_utc(self.start))
+        if self.end is not None:
+            conditions.append(Activity.start_time < _naive_utc(self.end))
+        if self.types:
+            conditions.append(Activity.type.in_(list(self.types)))
+
+        if self.feed_side is not None:
+            conditions.append(FEED_SIDE == self.feed_side)
+        if self.min_amount_ml is not None:
+            conditions.append(FEED_AMOUNT_ML >= self.min_amount_ml)
+        if self.max_amount_ml is not None:
+            conditions.append(FEED_AMOUNT_ML <= self.max_amount_ml)
+        if self.feed_side is not None or self.min_amount_ml is not None or self.max_amount_ml is not None:
+            conditions.append(Activity.type == ActivityType.FEED)
+        if self.sleep_location is not None:
+            conditions.append(SLEEP_LOCATION == self.sleep_location)
+            conditions.append(Activity.type == ActivityType.SLEEP)
+
+        if self.metadata:
+            conditions.append(
+                type_coerce(Activity.activity_metadata, JSONB).contains(dict(self.metadata))
+            )
+        return conditions
@@ -0,0 +1,78 @@
+import copy
+from collections import defaultdict
+from typing import Any, Awaitable, Callable
+from sqlalchemy.ext.asyncio import AsyncSession
+
+WriteHook = Callable[[AsyncSession, Any], None]
+CommitHook = Callable[[AsyncSession], Awaitable[None]]
+
+_write_hooks: dict[type, list[WriteHook]] = defaultdict(list)
+_commit_hooks: list[CommitHook] = []
+_after_commit_hooks: list[CommitHook] = []
+_pending_keys: set[str] = set()
+
+# db.info flag set while a unit of work owns the transaction
+UNIT_OF_WORK_KEY = "unit_of_work"
+
+def on_write(model: type) -> Callable[[WriteHook], WriteHook]:
+    """Register a hook called when a service adds, changes or deletes a model
+    instance. It runs before the change is flushed, so attribute history still
+    holds the old values."""
+    def register(hook: WriteHook) -> WriteHook:
+        _write_hooks[model].append(hook)
+        return hook
+    return register
+
+def before_commit(hook: CommitHook) -> CommitHook:
+    """Register a hook that runs inside the transaction right before commit"""
+    _commit_hooks.append(hook)
+    return hook
+
+def after_commit(hook: CommitHook) -> CommitHook:
+    """Register a hook that runs once the transaction has committed"""
+    _after_commit_hooks.append(hook)
+    return hook
+
+def pending(key: str) -> str:
+    """Register a db.info key that hooks queue work under, so it is dropped
+    along with the transaction on rollback"""
+    _pending_keys.add(key)
+    return key
+
+def snapshot(db: AsyncSession) -> dict[str, Any]:
+    """Copies of the work queued under pending keys, for restore()"""
+    return {key: copy.copy(db.info[key]) for key in _pending_keys if key in db.info}
+
+def restore(db: AsyncSession, saved: dict[str, Any]) -> None:
+    """Put queued work back as it was at snapshot(), dropping anything
+    queued since"""
+    for key in _pending_keys:
+        if key in saved:
+            db.info[key] = saved[key]
+        else:
+            db.info.pop(key, None)
+
+def notify_write(db: AsyncSession, obj: Any) -> None:
+    for hook in _write_hooks.get(type(obj), ()):
+        hook(db, obj)
+
+async def commit(db: AsyncSession) -> None:
+    """Run before-commit hooks, commit the session, then run after-commit hooks.
+
+    Inside a unit of work this only flushes; the hooks run once when the unit
+    of work commits.
+    """
+    if db.info.get(UNIT_OF_WORK_KEY):
+        await db.flush()
+        return
+    for hook in _commit_hooks:
+        await hook(db)
+    await db.commit()
+    for hook in _after_commit_hooks:
+        await hook(db)
+
+async def rollback(db: AsyncSession) -> None:
+    """Roll the session back and drop any work hooks queued for the commit"""
+    await db.rollback()
+    for key in _pending_keys:
+        db.info.pop(key, None)
@@ -0,0 +1,89 @@
+import base64
+import hashlib
+import hmac
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Generic, Optional, Sequence, TypeVar
+from app.core.config import settings
+
+T = TypeVar("T")
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token is malformed, tampered with or for another ordering"""
+
+@dataclass
+class Page(Generic[T]):
+    items: list[T]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+@dataclass(frozen=True)
+class Cursor:
+    """Decoded cursor: page strictly after (or before) the row with these key values"""
+    keys: tuple[str, ...]
+    values: list[Any]
+    before: bool = False
+    descending: bool = False
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$d" in value:
+            return date.fromisoformat(value["$d"])
+        raise InvalidCursor("Unknown cursor value")
+    return value
+
+def _sign(body: bytes) -> str:
+    digest = hmac.new(settings.SECRET_KEY.encode(), body, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).rstrip(b"=").decode()
+
+def encode_cursor(cursor: Cursor) -> str:
+    """Encode a cursor as an opaque, signed token"""
+    payload = {
+        "k": list(cursor.keys),
+        "v": [_encode_value(v) for v in cursor.values],
+        "b": cursor.before,
+        "d": cursor.descending,
+    }
+    body = base64.urlsafe_b64encode(
+        json.dumps(payload, separators=(",", ":")).encode()
+    ).rstrip(b"=")
+    return f"{body.decode()}.{_sign(body)}"
+
+def decode_cursor(token: str, keys: Sequence[str], descending: bool = False) -> Cursor:
+    """Decode and verify a cursor token issued for the given ordering"""
+    try:
+        body, signature = token.split(".", 1)
+        if not hmac.compare_digest(signature, _sign(body.encode())):
+            raise InvalidCursor("Bad cursor signature")
+        padded = body + "=" * (-len(body) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        values = [_decode_value(v) for v in payload["v"]]
+        cursor = Cursor(
+            keys=tuple(payload["k"]),
+            values=values,
+            before=bool(payload["b"]),
+            descending=bool(payload["d"])
+        )
+    except InvalidCursor:
+        raise
+    except Exception as e:
+        raise InvalidCursor("Malformed cursor") from e
+
+    if cursor.keys != tuple(keys) or cursor.descending != descending:
+        raise InvalidCursor("Cursor was issued for a different ordering")
+    if len(cursor.values) != len(cursor.keys):
+        raise InvalidCursor("Malformed cursor")
+    return cursor
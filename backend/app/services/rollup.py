@@ -0,0 +1,224 @@
+from datetime import date, datetime, time, timedelta
+from typing import Any, Iterable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, and_, or_, true, func, cast, exists, literal, Date, DateTime
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models.activity import FEED_AMOUNT_ML, Activity
+from app.models.enums import ActivityType
+from app.models.rollup import ActivityDailyRollup
+from app.schemas.rollup import ActivitySummary, DailyActivitySummary
+from . import hooks
+
+DayKey = tuple[str, date]
+
+PENDING_KEY = hooks.pending("rollup_pending_days")
+
+def _day_range(day: date) -> tuple[datetime, datetime]:
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+def mark_days(db: AsyncSession, keys: Iterable[DayKey]) -> None:
+    """Queue (baby_id, day) rollups to be recomputed before the session commits"""
+    db.info.setdefault(PENDING_KEY, set()).update(keys)
+
+@hooks.on_write(Activity)
+def mark_activity(db: AsyncSession, obj: Activity) -> None:
+    """Queue the days an activity is counted on, before and after the change"""
+    keys = set()
+    if obj.baby_id and obj.start_time:
+        keys.add((obj.baby_id, obj.start_time.date()))
+    state = sa_inspect(obj)
+    if state.persistent:
+        old_babies = state.attrs.baby_id.history.deleted or [obj.baby_id]
+        old_starts = state.attrs.start_time.history.deleted or [obj.start_time]
+        keys.update(
+            (baby_id, start.date())
+            for baby_id in old_babies
+            for start in old_starts
+            if baby_id and start
+        )
+    mark_days(db, keys)
+
+@hooks.before_commit
+async def refresh_pending(db: AsyncSession) -> None:
+    keys = db.info.pop(PENDING_KEY, None)
+    if keys:
+        await RollupService(db).refresh_days(keys)
+
+class RollupService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _aggregate_query(self, condition: Any):
+        """Per (baby, day, type) totals over raw activities matching condition"""
+        day = cast(Activity.start_time, Date)
+        return select(
+            Activity.baby_id,
+            day.label("day"),
+            Activity.type,
+            func.count().label("count"),
+            func.coalesce(
+                func.sum(func.extract("epoch", Activity.end_time - Activity.start_time)), 0
+            ).label("total_duration_seconds"),
+            func.coalesce(
+                # NULL for amounts that are not numbers, rather than an error
+                func.sum(FEED_AMOUNT_ML), 0
+            ).label("total_amount_ml"),
+            func.min(Activity.start_time).label("first_start"),
+            func.max(Activity.start_time).label("last_start"),
+        ).where(condition).group_by(Activity.baby_id, day, Activity.type)
+
+    async def _upsert_from(self, condition: Any) -> None:
+        now = datetime.utcnow()
+        aggregate = self._aggregate_query(condition).add_columns(
+            literal(now).label("created_at"),
+            literal(now).label("updated_at")
+        )
+        stmt = pg_insert(ActivityDailyRollup).from_select(
+            [
+                "baby_id", "day", "type", "count", "total_duration_seconds",
+                "total_amount_ml", "first_start", "last_start", "created_at", "updated_at",
+            ],
+            aggregate
+        )
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["baby_id", "day", "type"],
+            set_={
+                "count": excluded.count,
+                "total_duration_seconds": excluded.total_duration_seconds,
+                "total_amount_ml": excluded.total_amount_ml,
+                "first_start": excluded.first_start,
+                "last_start": excluded.last_start,
+                "updated_at": excluded.updated_at,
+            }
+        )
+        await self.db.execute(stmt)
+
+    async def _lock_days(self, keys: Iterable[DayKey]) -> None:
+        """Serialise recomputes of each (baby_id, day) until commit.
+
+        Without it two writers to the same day each count from a snapshot
+        that misses the other's rows, and the last to commit wins. Once the
+        lock is granted the other writer has committed, and the next
+        statement sees its rows.
+        """
+        if self.db.get_bind().dialect.name != "postgresql":
+            # SQLite allows one writer at a time anyway
+            return
+        for baby_id, day in sorted(keys):
+            await self.db.execute(
+                select(func.pg_advisory_xact_lock(func.hashtext(baby_id), day.toordinal()))
+            )
+
+    async def refresh_days(self, keys: Iterable[DayKey]) -> None:
+        """Recompute the rollups for each (baby_id, day) from raw activities"""
+        keys = set(keys)
+        if not keys:
+            return
+        await self.db.flush()
+        await self._lock_days(keys)
+
+        raw_ranges = []
+        rollup_keys = []
+        for baby_id, day in keys:
+            start, end = _day_range(day)
+            raw_ranges.append(and_(
+                Activity.baby_id == baby_id,
+                Activity.start_time >= start,
+                Activity.start_time < end
+            ))
+            rollup_keys.append(and_(
+                ActivityDailyRollup.baby_id == baby_id,
+                ActivityDailyRollup.day == day
+            ))
+
+        await self._upsert_from(or_(*raw_ranges))
+
+        # Drop types that no longer have any activity on those days
+        day_start = cast(ActivityDailyRollup.day, DateTime)
+        await self.db.execute(
+            delete(ActivityDailyRollup).where(
+                or_(*rollup_keys),
+                ~exists().where(
+                    Activity.baby_id == ActivityDailyRollup.baby_id,
+                    Activity.type == ActivityDailyRollup.type,
+                    Activity.start_time >= day_start,
+                    Activity.start_time < day_start + timedelta(days=1)
+                )
+            )
+        )
+
+    async def rebuild(
+        self,
+        *,
+        baby_id: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> None:
+        """Recompute rollups from scratch for backfills, optionally scoped"""
+        raw = []
+        stored = []
+        if baby_id is not None:
+            raw.append(Activity.baby_id == baby_id)
+            stored.append(ActivityDailyRollup.baby_id == baby_id)
+        if start is not None:
+            raw.append(Activity.start_time >= _day_range(start)[0])
+            stored.append(ActivityDailyRollup.day >= start)
+        if end is not None:
+            raw.append(Activity.start_time < _day_range(end)[1])
+            stored.append(ActivityDailyRollup.day <= end)
+
+        await self.db.execute(delete(ActivityDailyRollup).where(and_(true(), *stored)))
+        await self._upsert_from(and_(true(), *raw))
+        await hooks.commit(self.db)
+
+    async def summary(self, *, baby_id: str, start: date, end: date) -> ActivitySummary:
+        """Summarize activities from start to end (inclusive, UTC days).
+
+        Complete days come from the rollup table; only the current day, which
+        may still be receiving activities, is aggregated from raw rows.
+        """
+        today = datetime.utcnow().date()
+        rows = []
+        if start < today:
+            query = select(ActivityDailyRollup).where(
+                ActivityDailyRollup.baby_id == baby_id,
+                ActivityDailyRollup.day >= start,
+                ActivityDailyRollup.day <= min(end, today - timedelta(days=1))
+            )
+            result = await self.db.execute(query)
+            rows.extend(
+                DailyActivitySummary.model_validate(row, from_attributes=True)
+                for row in result.scalars().all()
+            )
+        if start <= today <= end:
+            today_start, today_end = _day_range(today)
+            result = await self.db.execute(self._aggregate_query(and_(
+                Activity.baby_id == baby_id,
+                Activity.start_time >= today_start,
+                Activity.start_time < today_end
+            )))
+            rows.extend(DailyActivitySummary.model_validate(dict(row)) for row in result.mappings())
+
+        rows.sort(key=lambda r: (r.day, r.type.value))
+        feeds = [r for r in rows if r.type == ActivityType.FEED]
+        feed_count = sum(r.count for r in feeds)
+        average_feed_interval = None
+        if feed_count > 1:
+            span = max(r.last_start for r in feeds) - min(r.first_start for r in feeds)
+            average_feed_interval = span.total_seconds() / (feed_count - 1)
+        diapers = [r.last_start for r in rows if r.type == ActivityType.DIAPER]
+
+        return ActivitySummary(
+            baby_id=baby_id,
+            start=start,
+            end=end,
+            days=rows,
+            total_sleep_seconds=sum(r.total_duration_seconds for r in rows if r.type == ActivityType.SLEEP),
+            feed_count=feed_count,
+            total_feed_amount_ml=sum(r.total_amount_ml for r in feeds),
+            average_feed_interval_seconds=average_feed_interval,
+            last_diaper_at=max(diapers) if diapers else None
+        )
@@ -0,0 +1,217 @@
+from datetime import datetime
+from typing import Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import String, cast, column, exists, func, literal, select, union_all, update, values
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from app.db.routing import use_primary
+from app.models.activity import Activity
+from app.models.enums import SyncStatus
+from app.schemas.sync import (
+    ActivitySyncItem,
+    ActivitySyncResult,
+    ActivitySyncResponse,
+    SyncItemStatus
+)
+from . import hooks
+from .access import AccessService
+from .change_events import change_event, queue_events
+from .rollup import mark_days
+
+activity_table = Activity.__table__
+
+class SyncService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.access = AccessService(db)
+
+    async def upload_activities(
+        self,
+        *,
+        user_id: str,
+        items: list[ActivitySyncItem]
+    ) -> ActivitySyncResponse:
+        """Write a batch of client activities in one statement and one transaction.
+
+        Each row is inserted, or updated when the client's version is newer
+        than the server's. A row the server already holds at the same or a
+        newer version is reported as a conflict together with the server copy.
+        """
+        results: dict[str, ActivitySyncResult] = {}
+
+        # One statement cannot write the same row twice, so keep only the
+        # newest copy of each id
+        latest: dict[str, ActivitySyncItem] = {}
+        for item in items:
+            current = latest.get(item.id)
+            if current is None or item.version > current.version:
+                latest[item.id] = item
+
+        allowed = await self.access.accessible_baby_ids(
+            user_id, {item.baby_id for item in latest.values()}
+        )
+        writable = []
+        for item in latest.values():
+            if item.baby_id in allowed:
+                writable.append(item)
+            else:
+                results[item.id] = ActivitySyncResult(
+                    id=item.id,
+                    status=SyncItemStatus.REJECTED,
+                    detail="Not a caregiver for this baby"
+                )
+
+        if writable:
+            # The upsert is a SELECT that writes; keep it and the rest of
+            # the transaction on the primary
+            use_primary(self.db)
+            await self._lock_ids({item.id for item in writable})
+            rows = await self.db.execute(self._upsert_query(user_id, writable))
+            changed_days = set()
+            events = []
+            for row in rows.mappings():
+                item_id = row["accepted_id"] or row["id"]
+                item = latest[item_id]
+                results[item_id] = self._result_for(row, item)
+                if row["accepted_id"] is not None:
+                    changed_days.add((item.baby_id, item.start_time.date()))
+                    if row["start_time"] is not None:
+                        changed_days.add((row["baby_id"], row["start_time"].date()))
+                    events.append(change_event(
+                        activity_table.name,
+                        item.baby_id,
+                        {**item.model_dump(), "version": row["accepted_version"]}
+                    ))
+            mark_days(self.db, changed_days)
+            queue_events(self.db, events)
+            await hooks.commit(self.db)
+
+        ordered = [results[item_id] for item_id in dict.fromkeys(item.id for item in items)]
+        return ActivitySyncResponse(
+            results=ordered,
+            accepted=sum(r.status == SyncItemStatus.ACCEPTED for r in ordered),
+            conflicts=sum(r.status == SyncItemStatus.CONFLICT for r in ordered),
+            rejected=sum(r.status == SyncItemStatus.REJECTED for r in ordered)
+        )
+
+    def _upsert_query(self, user_id: str, items: list[ActivitySyncItem]):
+        """Build the upsert and the read-back of server copies as one statement.
+
+        activity is partitioned on start_time, so id alone carries no unique
+        index for ON CONFLICT to target: newer versions of rows the server
+        holds are updated, ids it does not hold are inserted, and the caller
+        serialises writers per id (see _lock_ids).
+        """
+        now = datetime.utcnow()
+        fields = ("type", "start_time", "end_time", "activity_metadata")
+        incoming = values(
+            column("id", activity_table.c.id.type),
+            column("baby_id", activity_table.c.baby_id.type),
+            *(column(field, activity_table.c[field].type) for field in fields),
+            column("version", activity_table.c.version.type),
+            name="incoming"
+        ).data([
+            (
+                item.id, item.baby_id, item.type, item.start_time, item.end_time,
+                item.activity_metadata, item.version
+            )
+            for item in items
+        ]).cte("incoming")
+        # A column of VALUES that is NULL in every row (end_time) comes back
+        # untyped, so cast on the way into the table
+        incoming_fields = {
+            field: cast(incoming.c[field], activity_table.c[field].type) for field in fields
+        }
+
+        # Every CTE sees the table as it was before the statement, so rows
+        # missing from `accepted` come back with the server's copy
+        existing = select(activity_table).where(
+            activity_table.c.id.in_([item.id for item in items])
+        ).cte("existing")
+
+        updated = update(activity_table).where(
+            activity_table.c.id == incoming.c.id,
+            activity_table.c.version < incoming.c.version,
+            activity_table.c.baby_id == incoming.c.baby_id
+        ).values(
+            **incoming_fields,
+            version=incoming.c.version,
+            sync_status=SyncStatus.SYNCED,
+            sync_attempts=0,
+            last_sync_attempt=now,
+            updated_at=now
+        ).returning(activity_table.c.id, activity_table.c.version).cte("updated")
+
+        inserted = pg_insert(activity_table).from_select(
+            [
+                "id", "baby_id", *fields, "version", "created_by", "sync_status",
+                "sync_attempts", "last_sync_attempt", "created_at", "updated_at"
+            ],
+            select(
+                incoming.c.id,
+                incoming.c.baby_id,
+                *incoming_fields.values(),
+                incoming.c.version,
+                literal(user_id, activity_table.c.created_by.type),
+                literal(SyncStatus.SYNCED, activity_table.c.sync_status.type),
+                literal(0),
+                literal(now, activity_table.c.last_sync_attempt.type),
+                literal(now, activity_table.c.created_at.type),
+                literal(now, activity_table.c.updated_at.type)
+            ).where(
+                ~exists().where(existing.c.id == incoming.c.id)
+            )
+        ).on_conflict_do_nothing().returning(
+            activity_table.c.id, activity_table.c.version
+        ).cte("inserted")
+
+        accepted = union_all(
+            select(updated.c.id, updated.c.version),
+            select(inserted.c.id, inserted.c.version)
+        ).subquery("accepted")
+
+        return select(
+            accepted.c.id.label("accepted_id"),
+            accepted.c.version.label("accepted_version"),
+            *existing.c
+        ).select_from(
+            accepted.join(existing, accepted.c.id == existing.c.id, full=True)
+        )
+
+    async def _lock_ids(self, ids: set[str]) -> None:
+        """Serialise uploads per activity id until commit, in one statement.
+
+        Two batches holding the same new id, for the same baby or not, would
+        otherwise both see it missing; the key table would then fail the
+        second insert instead of reporting a conflict. Locks are taken in
+        sorted order so batches cannot deadlock.
+        """
+        locked = func.unnest(literal(sorted(ids), ARRAY(String))).column_valued("id")
+        await self.db.execute(select(func.pg_advisory_xact_lock(func.hashtext(locked))))
+
+    def _result_for(self, row: Any, item: ActivitySyncItem) -> ActivitySyncResult:
+        if row["accepted_id"] is not None:
+            return ActivitySyncResult(
+                id=item.id,
+                status=SyncItemStatus.ACCEPTED,
+                version=row["accepted_version"]
+            )
+        if row["baby_id"] != item.baby_id:
+            return ActivitySyncResult(
+                id=item.id,
+                status=SyncItemStatus.REJECTED,
+                detail="Activity id belongs to a different baby"
+            )
+        return ActivitySyncResult(
+            id=item.id,
+            status=SyncItemStatus.CONFLICT,
+            version=row["version"],
+            server_copy=ActivitySyncItem(
+                id=row["id"],
+                baby_id=row["baby_id"],
+                type=row["type"],
+                start_time=row["start_time"],
+                end_time=row["end_time"],
+                activity_metadata=row["activity_metadata"] or {},
+                version=row["version"]
+            )
+        )
@@ -1,13 +1,30 @@
-from typing import Optional, Dict
+import uuid
+from typing import Optional, Dict, Any
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from passlib.context import CryptContext
+from sqlalchemy import or_, select, update
+from sqlalchemy import inspect as sa_inspect
+from app.core.hashing import password_hasher
+from app.core.principal_cache import principal_cache
+from app.db.write_behind import write_behind
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
+from . import hooks
 from .base import BaseService
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+PENDING_KEY = hooks.pending("principal_cache_pending")
+
+@hooks.on_write(User)
+def mark_principal(db: AsyncSession, obj: User) -> None:
+    """Queue a written user's cached principal to be dropped once it commits"""
+    if sa_inspect(obj).persistent:
+        db.info.setdefault(PENDING_KEY, set()).add(obj.id)
+
+@hooks.after_commit
+async def invalidate_principals(db: AsyncSession) -> None:
+    # Not before: another request could cache the old row again in between
+    for user_id in db.info.pop(PENDING_KEY, ()):
+        await principal_cache.invalidate(user_id)
 
 class UserService(BaseService[User, UserCreate, UserUpdate]):
     def __init__(self, db: AsyncSession):
@@ -21,47 +38,58 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
 
     async def create(self, user_data: Dict) -> User:
         """Create new user directly from data"""
-        db_obj = User(**user_data)
-        self.db.add(db_obj)
-        await self.db.commit()
-        await self.db.refresh(db_obj)
-        return db_obj
+        return await super().create(obj_in=user_data)
 
     async def create_with_password(self, *, obj_in: UserCreate) -> User:
         """Create new user from UserCreate schema"""
-        db_obj = User(
-            email=obj_in.email,
-            hashed_password=self.get_password_hash(obj_in.password),
-            full_name=obj_in.full_name,
-            preferences=obj_in.preferences
-        )
-        self.db.add(db_obj)
-        await self.db.commit()
-        await self.db.refresh(db_obj)
-        return db_obj
+        return await super().create(obj_in={
+            "id": str(uuid.uuid4()),
+            "email": obj_in.email,
+            "hashed_password": await self.get_password_hash(obj_in.password),
+            "full_name": obj_in.full_name,
+            "preferences": obj_in.preferences
+        })
+
+    async def change_password(self, *, user: User, new_password: str) -> User:
+        """Set a new password and invalidate every token issued so far"""
+        return await self.update(db_obj=user, obj_in={
+            "hashed_password": await self.get_password_hash(new_password),
+            "token_version": (user.token_version or 1) + 1
+        })
 
     async def authenticate(self, *, email: str, password: str) -> Optional[User]:
         """Authenticate user"""
         user = await self.get_by_email(email=email)
         if not user:
             return None
-        if not self.verify_password(password, user.hashed_password):
+        if not await self.verify_password(password, user.hashed_password):
             return None
         return user
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify password"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return await password_hasher.verify(plain_password, hashed_password)
 
-    def get_password_hash(self, password: str) -> str:
+    async def get_password_hash(self, password: str) -> str:
         """Hash a password"""
-        return pwd_context.hash(password)
+        return await password_hasher.hash(password)
+
+    async def update_last_sync(self, *, user_id: str, last_sync: datetime) -> None:
+        """Move the user's last sync timestamp forward.
 
-    async def update_last_sync(self, *, user_id: str, last_sync: datetime) -> User:
-        """Update user's last sync timestamp"""
-        user = await self.get(user_id)
-        if user:
-            user.last_sync = last_sync
-            await self.db.commit()
-            await self.db.refresh(user)
-        return user
\ No newline at end of file
+        Only the latest value matters, so while the write-behind flusher runs
+        this is buffered and coalesced with other syncs instead of being its
+        own UPDATE and commit.
+        """
+        if write_behind.running:
+            await write_behind.record(User, user_id, last_sync=last_sync)
+            return
+        stmt = (
+            update(User)
+            .where(User.id == user_id)
+            .where(or_(User.last_sync.is_(None), User.last_sync < last_sync))
+            .values(last_sync=last_sync)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(stmt)
+        await hooks.commit(self.db)
@@ -0,0 +1,222 @@
+"""Background retry of PENDING/FAILED sync records.
+
+Runs inside the API process when SYNC_RETRY_WORKER_ENABLED is set, or on its
+own with:
+
+    python -m app.workers.sync_retry
+"""
+import asyncio
+import logging
+import signal
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+from sqlalchemy import select, update, func, or_, literal_column
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.access_index import access_index
+from app.core.config import settings
+from app.core.metrics import sync_retry_oldest_age, sync_retry_queue_depth, sync_retry_rows
+from app.db.session import AsyncSessionLocal, init_engine, dispose_engine
+from app.models.activity import Activity
+from app.models.care_team import CareTeamMember
+from app.models.enums import SyncStatus
+from app.services.rollup import RollupService
+
+logger = logging.getLogger(__name__)
+
+SyncHandler = Callable[[AsyncSession, list[RowMapping]], Awaitable[None]]
+
+RETRY_STATUSES = (SyncStatus.PENDING, SyncStatus.FAILED)
+
+async def handle_activities(db: AsyncSession, rows: list[RowMapping]) -> None:
+    await RollupService(db).refresh_days(
+        {(row["baby_id"], row["start_time"].date()) for row in rows}
+    )
+
+async def handle_care_team(db: AsyncSession, rows: list[RowMapping]) -> None:
+    await access_index.invalidate(
+        {"user_id": row["user_id"], "baby_id": row["baby_id"], "version": row["version"] or 0}
+        for row in rows
+    )
+
+# Work to (re)do for each claimed row before it is marked SYNCED
+sync_handlers: dict[type, SyncHandler] = {
+    Activity: handle_activities,
+    CareTeamMember: handle_care_team,
+}
+
+class SyncRetryWorker:
+    """Claims due PENDING/FAILED rows and processes them with bounded parallelism.
+
+    A claim bumps sync_attempts and last_sync_attempt in the same statement
+    that selects the rows with FOR UPDATE SKIP LOCKED, and is committed
+    immediately. The bumped timestamp doubles as a lease: no other worker
+    sees the row again until its backoff has elapsed, so several workers can
+    run side by side without processing a row twice.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        handlers: Optional[dict[type, SyncHandler]] = None
+    ):
+        self.session_factory = session_factory
+        self.handlers = handlers if handlers is not None else sync_handlers
+        self.interval = settings.SYNC_RETRY_INTERVAL_SECONDS
+        self.batch_size = settings.SYNC_RETRY_BATCH_SIZE
+        self._semaphore = asyncio.Semaphore(settings.SYNC_RETRY_CONCURRENCY)
+        self._stopping = asyncio.Event()
+        self._in_flight: set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: dict[str, dict[str, Any]] = {}
+
+    def _due(self, model: type):
+        """Rows that are waiting for a retry and whose backoff has elapsed"""
+        delay = func.least(
+            settings.SYNC_RETRY_MAX_DELAY_SECONDS,
+            settings.SYNC_RETRY_BASE_DELAY_SECONDS * func.power(2, model.sync_attempts)
+        ) * literal_column("interval '1 second'")
+        return (
+            model.sync_status.in_(RETRY_STATUSES),
+            model.sync_attempts < settings.SYNC_RETRY_MAX_ATTEMPTS,
+            or_(
+                model.last_sync_attempt.is_(None),
+                model.last_sync_attempt <= func.timezone("utc", func.now()) - delay
+            ),
+        )
+
+    async def claim(self, model: type) -> list[RowMapping]:
+        """Lease a batch of due rows for this worker"""
+        table = model.__table__
+        due = (
+            select(table.c.id)
+            .where(*self._due(model))
+            .order_by(table.c.last_sync_attempt.asc().nulls_first())
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(table)
+            .where(table.c.id.in_(due.scalar_subquery()))
+            .values(
+                sync_attempts=table.c.sync_attempts + 1,
+                last_sync_attempt=datetime.utcnow(),
+                # Bookkeeping only; must not resend the row in delta syncs
+                updated_at=table.c.updated_at
+            )
+            .returning(*table.c)
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(stmt)
+            rows = list(result.mappings().all())
+            await db.commit()
+        return rows
+
+    async def _process(self, model: type, rows: list[RowMapping]) -> None:
+        table = model.__table__
+        ids = [row["id"] for row in rows]
+        async with self._semaphore:
+            async with self.session_factory() as db:
+                try:
+                    await self.handlers[model](db, rows)
+                    status = SyncStatus.SYNCED
+                except Exception:
+                    logger.exception("Sync retry failed for %d %s rows", len(rows), table.name)
+                    await db.rollback()
+                    status = SyncStatus.FAILED
+                # Only settle rows still in the state we claimed them in
+                await db.execute(
+                    update(table)
+                    .where(table.c.id.in_(ids), table.c.sync_status.in_(RETRY_STATUSES))
+                    .values(sync_status=status, updated_at=table.c.updated_at)
+                )
+                await db.commit()
+            sync_retry_rows.labels(table.name, status.value.lower()).inc(len(rows))
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def collect_metrics(self) -> None:
+        """Queue depth and age of the oldest waiting row, per table, also
+        exported as the sync_retry_* gauges on /metrics"""
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            for model in self.handlers:
+                table = model.__table__
+                result = await db.execute(
+                    select(
+                        func.count(),
+                        func.min(func.coalesce(table.c.last_sync_attempt, table.c.created_at))
+                    ).where(table.c.sync_status.in_(RETRY_STATUSES))
+                )
+                depth, oldest = result.one()
+                age = (now - oldest).total_seconds() if oldest else 0.0
+                self.metrics[table.name] = {"queue_depth": depth, "oldest_age_seconds": age}
+                sync_retry_queue_depth.labels(table.name).set(depth)
+                sync_retry_oldest_age.labels(table.name).set(age)
+
+    async def run_once(self) -> int:
+        """Claim one batch per table and start processing it; returns rows claimed"""
+        claimed = 0
+        for model in self.handlers:
+            # Do not claim more than the workers can get through
+            while len(self._in_flight) >= settings.SYNC_RETRY_CONCURRENCY:
+                await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+            rows = await self.claim(model)
+            claimed += len(rows)
+            concurrency = settings.SYNC_RETRY_CONCURRENCY
+            chunk = max(1, -(-len(rows) // concurrency))
+            for start in range(0, len(rows), chunk):
+                self._spawn(self._process(model, rows[start:start + chunk]))
+        return claimed
+
+    async def run(self) -> None:
+        logger.info("Sync retry worker started")
+        while not self._stopping.is_set():
+            try:
+                claimed = await self.run_once()
+                await self.collect_metrics()
+                if claimed:
+                    logger.info("Sync retry claimed %d rows; queues: %s", claimed, self.metrics)
+            except Exception:
+                logger.exception("Sync retry loop failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        logger.info("Sync retry worker stopped")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def request_stop(self) -> None:
+        self._stopping.set()
+
+    async def stop(self) -> None:
+        """Stop claiming and wait for in-flight batches to finish"""
+        self.request_stop()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    init_engine()
+    worker = SyncRetryWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.request_stop)
+    try:
+        await worker.run()
+    finally:
+        await dispose_engine()
+
+if __name__ == "__main__":
+    asyncio.run(main())
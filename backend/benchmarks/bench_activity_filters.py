@@ -0,0 +1,148 @@
+"""Compare filtered activity history queries on JSON and on indexed JSONB.
+
+Runs the same ActivityFilter history queries (a baby's latest 50 matching
+activities) with activity_metadata as plain JSON and no metadata indexes,
+then as JSONB with the GIN and expression indexes from app.models.activity,
+and reports latency percentiles and the scan each plan uses. The table is
+left as JSONB with its indexes. Postgres only; seed it first:
+
+    python -m benchmarks.seed --database-url postgresql+asyncpg://u:p@localhost/parentpal_bench
+    python -m benchmarks.bench_activity_filters --database-url postgresql+asyncpg://u:p@localhost/parentpal_bench
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Any, Optional
+
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "parentpal")
+os.environ.setdefault("POSTGRES_PASSWORD", "parentpass")
+os.environ.setdefault("POSTGRES_DB", "parentpal_bench")
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from app.models.activity import Activity
+from app.models.enums import ActivityType
+from app.services.filters import ActivityFilter
+from benchmarks.loadtest import percentile
+from benchmarks.seed import baby_id
+
+METADATA_INDEXES = [
+    index for index in Activity.__table__.indexes
+    if index.name in {
+        "idx_activity_metadata", "idx_activity_feed_side",
+        "idx_activity_feed_amount", "idx_activity_sleep_location",
+    }
+]
+
+CASES: list[tuple[str, ActivityFilter, bool]] = [
+    # name, filter, needs JSONB
+    ("feed side = left", ActivityFilter(feed_side="left"), False),
+    ("feed amount >= 120", ActivityFilter(min_amount_ml=120), False),
+    ("sleep location = car", ActivityFilter(sleep_location="car"), False),
+    ("diaper wet and dirty", ActivityFilter(
+        types=[ActivityType.DIAPER], metadata={"wet": True, "dirty": True}
+    ), True),
+]
+
+def history_query(baby: str, filter: ActivityFilter):
+    return (
+        select(Activity.__table__)
+        .where(Activity.baby_id == baby, *filter.conditions())
+        .order_by(Activity.start_time.desc())
+        .limit(50)
+    )
+
+async def set_metadata_type(engine: AsyncEngine, jsonb: bool) -> None:
+    async with engine.begin() as conn:
+        for index in METADATA_INDEXES:
+            await conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+        type_name = "jsonb" if jsonb else "json"
+        await conn.exec_driver_sql(
+            f"ALTER TABLE activity ALTER COLUMN activity_metadata "
+            f"TYPE {type_name} USING activity_metadata::{type_name}"
+        )
+        if jsonb:
+            for index in METADATA_INDEXES:
+                await conn.run_sync(index.create)
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("ANALYZE activity")
+
+async def plan_scan(engine: AsyncEngine, query) -> str:
+    """The first scan node of the query's plan, with parameters bound as
+    the application binds them"""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    async with engine.connect() as conn:
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            (await conn.execute(query)).all()
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        statement, parameters = captured[-1]
+        lines = [row[0] for row in await conn.exec_driver_sql("EXPLAIN " + statement, parameters)]
+    scans = [line.strip().lstrip("-> ").split("  ")[0] for line in lines if "Scan" in line]
+    return scans[0] if scans else lines[0].strip()
+
+async def run_case(
+    engine: AsyncEngine, filter: ActivityFilter, *, iterations: int, users: int
+) -> dict[str, Any]:
+    rng = random.Random(0)
+    latencies = []
+    async with engine.connect() as conn:
+        for i in range(iterations + 10):
+            query = history_query(baby_id(rng.randrange(users), 0), filter)
+            started = time.perf_counter()
+            (await conn.execute(query)).all()
+            # The first few warm the caches and the prepared statement
+            if i >= 10:
+                latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "plan": await plan_scan(engine, history_query(baby_id(0, 0), filter)),
+    }
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--users", type=int, default=2000, help="Seeded users to address")
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        sys.exit("JSONB and its indexes are Postgres only")
+
+    results: dict[tuple[str, str], Optional[dict[str, Any]]] = {}
+    try:
+        for label, jsonb in (("json", False), ("jsonb", True)):
+            await set_metadata_type(engine, jsonb)
+            for name, filter, needs_jsonb in CASES:
+                results[name, label] = (
+                    await run_case(engine, filter, iterations=args.iterations, users=args.users)
+                    if jsonb or not needs_jsonb else None
+                )
+    finally:
+        await engine.dispose()
+
+    print(f"{'query':<24}{'type':<7}{'p50 ms':>9}{'p95 ms':>9}  plan")
+    for name, _, _ in CASES:
+        for label in ("json", "jsonb"):
+            r = results[name, label]
+            if r is None:
+                print(f"{name:<24}{label:<7}{'n/a':>9}{'n/a':>9}  (containment needs jsonb)")
+            else:
+                print(f"{name:<24}{label:<7}{r['p50_ms']:>9}{r['p95_ms']:>9}  {r['plan']}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
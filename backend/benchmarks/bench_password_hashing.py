@@ -0,0 +1,121 @@
+"""Measure /health latency while login requests hash passwords.
+
+Compares verifying bcrypt hashes inline on the event loop with verifying them
+through the bounded PasswordHasher pool. Run from the backend directory:
+
+    python -m benchmarks.bench_password_hashing --logins 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "parentpal")
+os.environ.setdefault("POSTGRES_PASSWORD", "parentpass")
+os.environ.setdefault("POSTGRES_DB", "parentpal_bench")
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from app.core.hashing import PasswordHasher, PasswordHasherBusy
+from app.core.security import verify_password, get_password_hash
+
+PASSWORD = "correct horse battery staple"
+
+def build_app(hasher: PasswordHasher | None, hashed: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.post("/login")
+    async def login():
+        if hasher is None:
+            ok = verify_password(PASSWORD, hashed)
+        else:
+            try:
+                ok = await hasher.verify(PASSWORD, hashed)
+            except PasswordHasherBusy:
+                raise HTTPException(status_code=503)
+        return {"ok": ok}
+
+    return app
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run(app: FastAPI, logins: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    health_latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for i in range(logins):
+            queue.put_nowait(i)
+
+        async def login_worker():
+            while not queue.empty():
+                queue.get_nowait()
+                response = await client.post("/login")
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def health_probe():
+            # Probes are due every `interval`; a probe that could not even be
+            # sent because the event loop was blocked is recorded as late by
+            # the time it waited, so a stalled loop cannot hide its latency.
+            interval = 0.01
+            due = time.perf_counter()
+            while True:
+                await client.get("/health")
+                finished = time.perf_counter()
+                while due <= finished:
+                    health_latencies.append((finished - due) * 1000)
+                    due += interval
+                if done.is_set():
+                    break
+                await asyncio.sleep(due - finished)
+
+        probe = asyncio.create_task(health_probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "login_statuses": statuses,
+        "health_samples": len(health_latencies),
+        "health_p50_ms": round(statistics.median(health_latencies), 2),
+        "health_p99_ms": round(percentile(health_latencies, 99), 2),
+    }
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--processes", action="store_true")
+    args = parser.parse_args()
+
+    hashed = get_password_hash(PASSWORD)
+    hasher = PasswordHasher(args.workers, args.max_queue, use_processes=args.processes)
+
+    before = await run(build_app(None, hashed), args.logins, args.concurrency)
+    after = await run(build_app(hasher, hashed), args.logins, args.concurrency)
+    hasher.shutdown()
+
+    print(f"inline bcrypt:  {before}")
+    print(f"worker pool:    {after}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
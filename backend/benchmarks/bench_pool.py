@@ -0,0 +1,143 @@
+"""Measure query throughput against connection pool size under concurrent load.
+
+For each pool size, builds an engine from Settings (engine_options) with
+max_overflow 0, then runs --concurrency clients for --duration seconds, each
+repeatedly opening a session and reading a page of a random baby's
+activities, the way a request handler would. Reports throughput, latency
+percentiles, mean checkout wait and pool timeouts. Seed the database first:
+
+    python -m benchmarks.seed --database-url postgresql+asyncpg://u:p@localhost/parentpal_bench
+    python -m benchmarks.bench_pool --database-url postgresql+asyncpg://u:p@localhost/parentpal_bench \\
+        --pool-sizes 2,5,10,20,40 --concurrency 100
+    python -m benchmarks.bench_pool --database-url ... --pgbouncer   # NullPool, no statement cache
+
+SQLite runs with the same pool but serialises access to the file, so only
+Postgres numbers say much about pool sizing.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import Any
+
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "parentpal")
+os.environ.setdefault("POSTGRES_PASSWORD", "parentpass")
+os.environ.setdefault("POSTGRES_DB", "parentpal_bench")
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.core.config import settings
+from app.core.metrics import db_pool_wait
+from app.db.pool import AppQueuePool, PoolExhausted, engine_options
+from app.models.activity import Activity
+from benchmarks.loadtest import percentile
+from benchmarks.seed import baby_id
+
+def _wait_totals() -> tuple[int, float]:
+    return sum(db_pool_wait.counts), db_pool_wait.sum
+
+async def run(
+    database_url: str,
+    *,
+    pool_size: int,
+    pgbouncer: bool,
+    concurrency: int,
+    duration: float,
+    users: int
+) -> dict[str, Any]:
+    config = settings.model_copy(update={
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "DB_POOL_SIZE": pool_size,
+        "DB_MAX_OVERFLOW": 0,
+        "DB_PGBOUNCER": pgbouncer,
+    })
+    options = engine_options(config)
+    if database_url.startswith("sqlite"):
+        options.update(poolclass=AppQueuePool, pool_size=pool_size, max_overflow=0, pool_timeout=config.DB_POOL_TIMEOUT)
+    engine = create_async_engine(database_url, **options)
+    rng = random.Random(0)
+
+    async def request() -> None:
+        async with AsyncSession(engine) as db:
+            result = await db.execute(
+                select(Activity.__table__)
+                .where(Activity.baby_id == baby_id(rng.randrange(users), 0))
+                .order_by(Activity.start_time.desc())
+                .limit(50)
+            )
+            result.all()
+
+    latencies: list[float] = []
+    timeouts = 0
+
+    async def worker(until: float) -> None:
+        nonlocal timeouts
+        while time.perf_counter() < until:
+            started = time.perf_counter()
+            try:
+                await request()
+            except PoolExhausted:
+                timeouts += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    try:
+        # Open the pool's connections before measuring
+        await asyncio.gather(*(worker(time.perf_counter() + 0.5) for _ in range(concurrency)))
+        latencies.clear()
+        timeouts = 0
+        waits_before, wait_seconds_before = _wait_totals()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(started + duration) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await engine.dispose()
+
+    waits, wait_seconds = _wait_totals()
+    waits -= waits_before
+    return {
+        "pool_size": "null" if pgbouncer else pool_size,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "checkout_wait_ms": round((wait_seconds - wait_seconds_before) / waits * 1000, 2) if waits else 0.0,
+        "timeouts": timeouts,
+    }
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///bench.db")
+    parser.add_argument("--pool-sizes", default="1,2,5,10,20")
+    parser.add_argument("--pgbouncer", action="store_true", help="Also run with the PgBouncer settings")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=5, help="Seconds per pool size")
+    parser.add_argument("--users", type=int, default=2000, help="Seeded users to address")
+    args = parser.parse_args()
+
+    runs = [(int(size), False) for size in args.pool_sizes.split(",") if size]
+    if args.pgbouncer:
+        runs.append((0, True))
+
+    print(f"{'pool':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'wait ms':>10}{'timeouts':>10}")
+    for pool_size, pgbouncer in runs:
+        r = await run(
+            args.database_url,
+            pool_size=pool_size,
+            pgbouncer=pgbouncer,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            users=args.users
+        )
+        print(
+            f"{r['pool_size']:>6}{r['throughput_rps']:>10}{r['p50_ms']!s:>10}{r['p95_ms']!s:>10}"
+            f"{r['p99_ms']!s:>10}{r['checkout_wait_ms']:>10}{r['timeouts']:>10}"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,173 @@
+"""Per-response CPU cost of serializing typical user, baby and activity payloads.
+
+Compares three ways of turning ORM rows into a JSON response body:
+
+  jsonable_encoder   the old register path: jsonable_encoder on the ORM row,
+                     build the schema, then jsonable_encoder + json.dumps
+  response_model     schema via from_attributes, then FastAPI's own
+                     validate-and-dump of the response model
+  model_response     app.core.serialization.model_response: one
+                     from_attributes pass dumped straight to bytes
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_serialization --iterations 2000
+"""
+import argparse
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "parentpal")
+os.environ.setdefault("POSTGRES_PASSWORD", "parentpass")
+os.environ.setdefault("POSTGRES_DB", "parentpal_bench")
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict
+from app.core.serialization import model_response, to_schema, type_adapter
+from app.models.user import User
+from app.models.baby import Baby
+from app.models.activity import Activity
+from app.models.care_team import CareTeamMember  # noqa: F401 (mapper setup)
+from app.models.enums import ActivityType, SyncStatus
+
+# Response shapes mirroring the model columns
+class UserOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: str
+    email: str
+    full_name: Optional[str] = None
+    is_active: bool
+    preferences: Dict[str, Any]
+    version: int
+    last_sync: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+
+class BabyOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: str
+    name: str
+    primary_caregiver_id: str
+    development_data: Dict[str, Any]
+    version: int
+    sync_status: SyncStatus
+    created_at: datetime
+    updated_at: datetime
+
+class ActivityOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: str
+    baby_id: str
+    type: ActivityType
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    activity_metadata: Dict[str, Any]
+    created_by: str
+    version: int
+    sync_status: SyncStatus
+    created_at: datetime
+    updated_at: datetime
+
+def make_user(now: datetime) -> User:
+    return User(
+        id=str(uuid.uuid4()),
+        email="parent@example.com",
+        hashed_password="x" * 60,
+        full_name="Sam Parent",
+        is_active=True,
+        preferences={
+            "units": "metric",
+            "notifications": {f"channel_{i}": {"enabled": i % 2 == 0, "quiet_hours": [22, 7]} for i in range(20)},
+            "dashboard": [{"widget": f"w{i}", "position": i} for i in range(20)],
+        },
+        version=3,
+        last_sync=now,
+        created_at=now,
+        updated_at=now,
+    )
+
+def make_baby(now: datetime, caregiver_id: str) -> Baby:
+    return Baby(
+        id=str(uuid.uuid4()),
+        name="Robin",
+        primary_caregiver_id=caregiver_id,
+        development_data={
+            "milestones": [{"name": f"milestone {i}", "reached_at": now.isoformat()} for i in range(30)],
+            "growth": [{"week": i, "weight_kg": 3.2 + i * 0.15, "length_cm": 50 + i * 0.7} for i in range(52)],
+        },
+        version=7,
+        sync_status=SyncStatus.SYNCED,
+        created_at=now,
+        updated_at=now,
+    )
+
+def make_activity(now: datetime, baby_id: str, user_id: str, i: int) -> Activity:
+    start = now - timedelta(hours=3 * i)
+    return Activity(
+        id=str(uuid.uuid4()),
+        baby_id=baby_id,
+        type=ActivityType.FEED,
+        start_time=start,
+        end_time=start + timedelta(minutes=20),
+        activity_metadata={"amount_ml": 120, "side": "left", "notes": "fed well " * 10},
+        created_by=user_id,
+        version=1,
+        sync_status=SyncStatus.SYNCED,
+        created_at=now,
+        updated_at=now,
+    )
+
+def legacy(schema: Any, obj: Any) -> bytes:
+    if isinstance(obj, list):
+        models = [schema.__args__[0](**jsonable_encoder(o)) for o in obj]
+    else:
+        models = schema(**jsonable_encoder(obj))
+    return JSONResponse(jsonable_encoder(models)).body
+
+def response_model(schema: Any, obj: Any) -> bytes:
+    # What the handler returns, then what FastAPI does with it
+    value = to_schema(schema, obj)
+    adapter = type_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(value))
+
+def fast(schema: Any, obj: Any) -> bytes:
+    return model_response(schema, obj).body
+
+def measure(fn: Callable[[Any, Any], bytes], schema: Any, obj: Any, iterations: int) -> float:
+    fn(schema, obj)
+    started = time.process_time()
+    for _ in range(iterations):
+        fn(schema, obj)
+    return (time.process_time() - started) / iterations * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    now = datetime.utcnow().replace(microsecond=0)
+    user = make_user(now)
+    baby = make_baby(now, user.id)
+    activities = [make_activity(now, baby.id, user.id, i) for i in range(args.page_size)]
+    payloads = [
+        ("user", UserOut, user),
+        ("baby", BabyOut, baby),
+        ("activity", ActivityOut, activities[0]),
+        (f"activity page ({args.page_size})", List[ActivityOut], activities),
+    ]
+
+    print(f"{'payload':<24}{'jsonable_encoder':>18}{'response_model':>18}{'model_response':>18}  (us/response)")
+    for name, schema, obj in payloads:
+        costs = [measure(fn, schema, obj, args.iterations) for fn in (legacy, response_model, fast)]
+        print(f"{name:<24}" + "".join(f"{cost:>18.1f}" for cost in costs))
+
+if __name__ == "__main__":
+    main()
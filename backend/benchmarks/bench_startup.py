@@ -0,0 +1,88 @@
+"""Measure worker startup: process spawn and import to the first served request.
+
+Starts uvicorn in a subprocess for each run and polls /health until it answers,
+reporting the time from spawn to the first 200 and, separately, the time spent
+importing the app module. Run from the backend directory:
+
+    python -m benchmarks.bench_startup --runs 10
+    python -m benchmarks.bench_startup --warmup-connections 5   # needs Postgres
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+ENV_DEFAULTS = {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "parentpal",
+    "POSTGRES_PASSWORD": "parentpass",
+    "POSTGRES_DB": "parentpal_bench",
+    "REDIS_HOST": "localhost",
+    "SECRET_KEY": "benchmark-secret",
+}
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def time_import(env: dict[str, str]) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        env=env, capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip()) * 1000
+
+def time_first_request(target: list[str], env: dict[str, str], timeout: float) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *target, "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        with httpx.Client() as client:
+            while time.perf_counter() - started < timeout:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited: {proc.stderr.read().decode()[-2000:]}")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                        return (time.perf_counter() - started) * 1000
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+        raise TimeoutError(f"No response within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target", default="app.main:create_app --factory",
+                        help="uvicorn app argument(s), e.g. 'app.main:app'")
+    parser.add_argument("--warmup-connections", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    env = {**ENV_DEFAULTS, **os.environ}
+    env["DB_WARMUP_CONNECTIONS"] = str(args.warmup_connections)
+    env["PYTHONPATH"] = os.getcwd()
+
+    imports = [time_import(env) for _ in range(args.runs)]
+    first = [time_first_request(args.target.split(), env, args.timeout) for _ in range(args.runs)]
+
+    for name, samples in (("import app.main", imports), ("spawn to first request", first)):
+        print(
+            f"{name:<24} median {statistics.median(samples):8.1f} ms"
+            f"  min {min(samples):8.1f} ms  max {max(samples):8.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
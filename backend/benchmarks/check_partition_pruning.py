@@ -0,0 +1,134 @@
+"""Check that time-bounded service queries only scan the activity months they need.
+
+Runs the service layer's time-range reads (export, today's summary, rollup
+refresh and rebuild) against a seeded Postgres database, captures every
+statement they send that reads activity, and runs it again under EXPLAIN
+ANALYZE with the same parameters, in a transaction that is rolled back.
+Reports how many partitions each statement scanned against how many months
+the range overlaps, and exits non-zero if any scanned more:
+
+    python -m benchmarks.seed --database-url postgresql+asyncpg://u:p@localhost/parentpal_bench
+    python -m benchmarks.check_partition_pruning --database-url postgresql+asyncpg://u:p@localhost/parentpal_bench
+
+Partitions pruned at run time (bounds only known per row, as in correlated
+subqueries) stay in the plan as "(never executed)" and count as pruned.
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "parentpal")
+os.environ.setdefault("POSTGRES_PASSWORD", "parentpass")
+os.environ.setdefault("POSTGRES_DB", "parentpal_bench")
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.db.partitions import add_months, list_partitions, month_start
+from app.services.export import ExportService
+from app.services.filters import ActivityFilter
+from app.services.rollup import RollupService
+from benchmarks.seed import baby_id
+
+SCANNED = re.compile(r"\bon (activity_(?:p\d{4}_\d{2}|default))\b")
+
+def months_overlapping(start: datetime, end: datetime) -> int:
+    months = 0
+    month = month_start(start)
+    while month < end:
+        months += 1
+        month = add_months(month, 1)
+    return months
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        sys.exit("Partition pruning only applies to Postgres")
+
+    captured: list[tuple[str, Any]] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "activity." in statement and not statement.startswith("EXPLAIN"):
+            captured.append((statement, parameters))
+
+    now = datetime.utcnow()
+    this_month = month_start(now)
+    last_month = add_months(this_month, -1)
+    baby = baby_id(0, 0)
+
+    async def export_last_month(db: AsyncSession) -> None:
+        async for _ in ExportService(db).activities(
+            baby_id=baby, filter=ActivityFilter(start=last_month, end=this_month)
+        ):
+            pass
+
+    async def export_last_week(db: AsyncSession) -> None:
+        async for _ in ExportService(db).activities(
+            baby_id=baby, filter=ActivityFilter(start=now - timedelta(days=7), end=now)
+        ):
+            pass
+
+    async def summary_today(db: AsyncSession) -> None:
+        await RollupService(db).summary(baby_id=baby, start=now.date(), end=now.date())
+
+    async def refresh_yesterday(db: AsyncSession) -> None:
+        await RollupService(db).refresh_days([(baby, (now - timedelta(days=1)).date())])
+        await db.rollback()
+
+    async def rebuild_last_month(db: AsyncSession) -> None:
+        await RollupService(db).rebuild(
+            baby_id=baby, start=last_month.date(), end=(this_month - timedelta(days=1)).date()
+        )
+
+    day_start = datetime(now.year, now.month, now.day)
+    cases: list[tuple[str, Callable[[AsyncSession], Awaitable[None]], int]] = [
+        ("export last month", export_last_month, 1),
+        ("export last 7 days", export_last_week, months_overlapping(now - timedelta(days=7), now)),
+        ("summary today", summary_today, 1),
+        ("refresh yesterday", refresh_yesterday, months_overlapping(day_start - timedelta(days=1), day_start)),
+        ("rebuild last month", rebuild_last_month, 1),
+    ]
+
+    failed = False
+    try:
+        async with engine.connect() as conn:
+            total = len(await list_partitions(conn))
+        print(f"{total} activity partitions\n")
+        print(f"{'case':<22}{'scanned':>9}{'expected':>10}  statement")
+        for name, run, expected in cases:
+            captured.clear()
+            async with AsyncSession(engine) as db:
+                await run(db)
+            statements = list(captured)
+            async with engine.connect() as conn:
+                for statement, parameters in statements:
+                    result = await conn.exec_driver_sql("EXPLAIN ANALYZE " + statement, parameters)
+                    scanned = {
+                        match.group(1)
+                        for (line,) in result
+                        if "never executed" not in line
+                        for match in [SCANNED.search(line)] if match
+                    }
+                    await conn.rollback()
+                    count = len(scanned)
+                    ok = count <= expected
+                    failed = failed or not ok
+                    summary = " ".join(statement.split())[:60]
+                    print(f"{name:<22}{count:>9}{expected:>10}  {summary}{'' if ok else '  <-- not pruned'}")
+    finally:
+        await engine.dispose()
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    asyncio.run(main())
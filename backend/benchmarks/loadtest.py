@@ -0,0 +1,302 @@
+"""Load test the auth and data endpoints against a seeded local database.
+
+Runs each scenario with a fixed number of concurrent clients for a fixed
+duration and reports throughput and p50/p95/p99 latency. The app runs in this
+process against the database given by --database-url, or pass --base-url to
+drive an already running server. Seed the database first (or pass --seed):
+
+    python -m benchmarks.seed --database-url sqlite+aiosqlite:///bench.db --users 2000
+    python -m benchmarks.loadtest --database-url sqlite+aiosqlite:///bench.db --save baseline.json
+    # ...change something...
+    python -m benchmarks.loadtest --database-url sqlite+aiosqlite:///bench.db --compare baseline.json
+
+--compare exits non-zero if any scenario's p95 grew, or its throughput fell,
+by more than --tolerance percent. The run also exits non-zero if /metrics is
+served but labels no API request with its full /api/v1/... route.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import re
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "parentpal")
+os.environ.setdefault("POSTGRES_PASSWORD", "parentpass")
+os.environ.setdefault("POSTGRES_DB", "parentpal_bench")
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import httpx
+
+API = "/api/v1"
+
+@dataclass
+class Context:
+    users: int
+    babies_per_user: int
+    rng: random.Random
+    access_tokens: dict[int, str] = field(default_factory=dict)
+    refresh_tokens: dict[int, str] = field(default_factory=dict)
+    # Users with a refresh in flight; a refresh token is single use
+    refreshing: set[int] = field(default_factory=set)
+
+    def user(self) -> int:
+        return self.rng.randrange(self.users)
+
+    def auth(self, i: int) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.access_tokens[i]}"}
+
+Request = Callable[[httpx.AsyncClient, Context], Awaitable[httpx.Response]]
+
+async def login_storm(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    from benchmarks.seed import PASSWORD, user_email
+    return await client.post(
+        f"{API}/auth/login/access-token",
+        json={"email": user_email(ctx.user()), "password": PASSWORD}
+    )
+
+async def token_refresh(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    i = ctx.user()
+    while i in ctx.refreshing:
+        i = ctx.user()
+    ctx.refreshing.add(i)
+    try:
+        response = await client.post(
+            f"{API}/auth/refresh-token",
+            json={"refresh_token": ctx.refresh_tokens[i]}
+        )
+        if response.status_code == 200:
+            ctx.refresh_tokens[i] = response.json()["refresh_token"]
+        return response
+    finally:
+        ctx.refreshing.discard(i)
+
+async def authenticated_reads(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    from benchmarks.seed import baby_id
+    i = ctx.user()
+    return await client.get(
+        f"{API}/babies/{baby_id(i, ctx.rng.randrange(ctx.babies_per_user))}/summary",
+        headers=ctx.auth(i)
+    )
+
+async def paged_history(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    # A client catching up on the last week, read to the end of the stream
+    i = ctx.user()
+    since = (datetime.utcnow() - timedelta(days=7)).isoformat()
+    async with client.stream(
+        "GET", f"{API}/sync/changes", params={"since": since}, headers=ctx.auth(i)
+    ) as response:
+        async for _ in response.aiter_bytes():
+            pass
+    return response
+
+async def sync_uploads(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    from benchmarks.seed import baby_id
+    i = ctx.user()
+    now = datetime.utcnow()
+    activities = [
+        {
+            "id": str(uuid.uuid4()),
+            "baby_id": baby_id(i, 0),
+            "type": "feed",
+            "start_time": (now - timedelta(minutes=30 * n)).isoformat(),
+            "end_time": (now - timedelta(minutes=30 * n - 15)).isoformat(),
+            "activity_metadata": {"amount_ml": 120, "side": "left"},
+            "version": 1,
+        }
+        for n in range(20)
+    ]
+    return await client.post(f"{API}/sync/activities", json={"activities": activities}, headers=ctx.auth(i))
+
+# name -> (request, runs on SQLite)
+SCENARIOS: dict[str, tuple[Request, bool]] = {
+    "login_storm": (login_storm, True),
+    "token_refresh": (token_refresh, True),
+    "paged_history": (paged_history, True),
+    # Summaries and ON CONFLICT upserts use Postgres date and JSON functions
+    "authenticated_reads": (authenticated_reads, False),
+    "sync_uploads": (sync_uploads, False),
+}
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    ctx: Context,
+    request: Request,
+    *,
+    concurrency: int,
+    duration: float
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = str((await request(client, ctx)).status_code)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "errors": len(latencies) - ok,
+        "statuses": statuses,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], tolerance: float) -> bool:
+    """Print per-scenario changes; returns False if any exceed the tolerance"""
+    ok = True
+    print(f"\n{'scenario':<22}{'rps':>18}{'p95 ms':>22}")
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        rps_change = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100
+        p95_change = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+        regressed = rps_change < -tolerance or p95_change > tolerance
+        ok = ok and not regressed
+        print(
+            f"{name:<22}{before['throughput_rps']:>8} -> {result['throughput_rps']:<8}"
+            f"{before['p95_ms']:>10} -> {result['p95_ms']:<9}"
+            f"{'REGRESSED' if regressed else ''}"
+        )
+    return ok
+
+ROUTE_LABEL = re.compile(r'^http_requests_total\{[^}]*route="([^"]*)"', re.MULTILINE)
+
+async def check_route_labels(client: httpx.AsyncClient) -> bool:
+    """Whether /metrics labels API requests by their full route template"""
+    response = await client.get("/metrics")
+    if response.status_code == 404:
+        print("route labels          skipped (metrics disabled)")
+        return True
+    routes = set(ROUTE_LABEL.findall(response.text))
+    ok = any(route.startswith(API + "/") for route in routes)
+    print(f"route labels          {'ok' if ok else 'MISSING ' + API + ' PREFIX'}: {', '.join(sorted(routes))}")
+    return ok
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///bench.db")
+    parser.add_argument("--base-url", help="Drive a running server instead of an in-process app")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario")
+    parser.add_argument("--users", type=int, default=2000, help="Seeded users to address")
+    parser.add_argument("--babies-per-user", type=int, default=1)
+    parser.add_argument("--activities-per-baby", type=int, default=500)
+    parser.add_argument("--seed", action="store_true", help="Seed the database first")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a saved JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=10, help="Allowed regression, percent")
+    args = parser.parse_args()
+
+    os.environ["SQLALCHEMY_DATABASE_URI"] = args.database_url
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    if args.seed:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from benchmarks.seed import seed
+        engine = create_async_engine(args.database_url)
+        print(await seed(
+            engine,
+            users=args.users,
+            babies_per_user=args.babies_per_user,
+            activities_per_baby=args.activities_per_baby
+        ))
+        await engine.dispose()
+
+    from app.core.security import create_access_token, create_refresh_token
+    from benchmarks.seed import user_id
+
+    ctx = Context(users=args.users, babies_per_user=args.babies_per_user, rng=random.Random(0))
+    for i in range(args.users):
+        ctx.access_tokens[i] = create_access_token(user_id(i), expires_delta=timedelta(hours=1))
+        ctx.refresh_tokens[i] = create_refresh_token(user_id(i))
+
+    sqlite = args.base_url is None and args.database_url.startswith("sqlite")
+    names = [name for name in args.scenarios.split(",") if name]
+    results: dict[str, Any] = {}
+    labels_ok = True
+
+    async def run_all(client: httpx.AsyncClient) -> None:
+        nonlocal labels_ok
+        for name in names:
+            request, on_sqlite = SCENARIOS[name]
+            if sqlite and not on_sqlite:
+                print(f"{name:<22}skipped (needs Postgres)")
+                continue
+            # Warm caches and connections before measuring
+            await run_scenario(client, ctx, request, concurrency=args.concurrency, duration=1)
+            results[name] = await run_scenario(
+                client, ctx, request, concurrency=args.concurrency, duration=args.duration
+            )
+            r = results[name]
+            print(
+                f"{name:<22}{r['throughput_rps']:>8} rps  p50 {r['p50_ms']:>8} ms"
+                f"  p95 {r['p95_ms']:>8} ms  p99 {r['p99_ms']:>8} ms  errors {r['errors']}"
+            )
+        if results:
+            labels_ok = await check_route_labels(client)
+
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+            await run_all(client)
+    else:
+        from app.main import create_app
+        app = create_app()
+        # The lifespan turns on INFO logging; one line per request would
+        # dominate the run
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                await run_all(client)
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "database": args.base_url or args.database_url.split("://")[0],
+        "python": platform.python_version(),
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "scenarios": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(baseline, report, args.tolerance):
+            return 1
+    return 0 if labels_ok else 1
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,193 @@
+"""Seed a throwaway database with realistic benchmark data.
+
+Creates the schema and inserts users, their babies, co-parent care team
+memberships and a history of activities per baby. Ids and emails are derived
+from indexes so the load test can address the same rows without a manifest.
+Every user's password is PASSWORD. Run from the backend directory:
+
+    python -m benchmarks.seed --database-url sqlite+aiosqlite:///bench.db
+    python -m benchmarks.seed --database-url postgresql+asyncpg://u:p@localhost/parentpal_bench \\
+        --users 5000 --activities-per-baby 400
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Iterator
+
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "parentpal")
+os.environ.setdefault("POSTGRES_PASSWORD", "parentpass")
+os.environ.setdefault("POSTGRES_DB", "parentpal_bench")
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from app.core.security import get_password_hash
+from app.db.base_class import Base
+from app.models.user import User
+from app.models.baby import Baby
+from app.models.care_team import CareTeamMember
+from app.models.activity import Activity
+from app.models.tombstone import Tombstone  # noqa: F401 (create_all)
+from app.models.rollup import ActivityDailyRollup  # noqa: F401 (create_all)
+from app.models.enums import ActivityType, CareTeamRole, SyncStatus
+
+PASSWORD = "benchmark password"
+NAMESPACE = uuid.UUID("6f1c1a52-8a35-4c55-9a8e-3f1f0c6b2b10")
+
+def user_id(i: int) -> str:
+    return str(uuid.uuid5(NAMESPACE, f"user-{i}"))
+
+def user_email(i: int) -> str:
+    return f"user{i}@bench.parentpal.dev"
+
+def baby_id(i: int, j: int) -> str:
+    return str(uuid.uuid5(NAMESPACE, f"baby-{i}-{j}"))
+
+def _chunks(rows: Iterator[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _activity_metadata(rng: random.Random, type: ActivityType) -> dict[str, Any]:
+    if type == ActivityType.FEED:
+        return {"amount_ml": rng.choice([60, 90, 120, 150]), "side": rng.choice(["left", "right", "bottle"])}
+    if type == ActivityType.SLEEP:
+        return {"location": rng.choice(["crib", "stroller", "car"])}
+    if type == ActivityType.DIAPER:
+        return {"wet": rng.random() < 0.8, "dirty": rng.random() < 0.4}
+    return {"notes": "tummy time"}
+
+async def seed(
+    engine: AsyncEngine,
+    *,
+    users: int,
+    babies_per_user: int,
+    activities_per_baby: int,
+    batch_size: int = 5000,
+    random_seed: int = 0
+) -> dict[str, int]:
+    """Create the schema and insert the data set; returns row counts"""
+    rng = random.Random(random_seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    hashed = get_password_hash(PASSWORD)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        if engine.dialect.name == "postgresql":
+            # Month partitions for the whole generated history
+            from app.db.partitions import ensure_partitions
+            await ensure_partitions(
+                conn, months_ahead=1, since=now - timedelta(hours=2.5 * activities_per_baby)
+            )
+
+    def user_rows():
+        for i in range(users):
+            yield {
+                "id": user_id(i), "email": user_email(i), "hashed_password": hashed,
+                "full_name": f"Bench User {i}", "is_active": True,
+                "preferences": {"units": "metric", "theme": rng.choice(["light", "dark"])},
+                "version": 1, "created_at": now, "updated_at": now,
+            }
+
+    def baby_rows():
+        for i in range(users):
+            for j in range(babies_per_user):
+                yield {
+                    "id": baby_id(i, j), "name": f"Baby {i}-{j}", "primary_caregiver_id": user_id(i),
+                    "development_data": {"birth_weight_kg": round(rng.uniform(2.5, 4.5), 2)},
+                    "version": 1, "sync_status": SyncStatus.SYNCED, "created_at": now, "updated_at": now,
+                }
+
+    def care_team_rows():
+        # Each baby also has the next user as a co-parent
+        for i in range(users):
+            for j in range(babies_per_user):
+                yield {
+                    "id": str(uuid.uuid5(NAMESPACE, f"care-{i}-{j}")), "baby_id": baby_id(i, j),
+                    "user_id": user_id((i + 1) % users), "role": CareTeamRole.COPARENT,
+                    "permissions": {"read": True, "log_activity": True}, "version": 1,
+                    "sync_status": SyncStatus.SYNCED, "sync_attempts": 0,
+                    "created_at": now, "updated_at": now,
+                }
+
+    types = list(ActivityType)
+    weights = [3, 5, 4, 1]
+
+    def activity_rows():
+        for i in range(users):
+            for j in range(babies_per_user):
+                start = now - timedelta(hours=2.5 * activities_per_baby)
+                for _ in range(activities_per_baby):
+                    start += timedelta(minutes=rng.randint(60, 240))
+                    type = rng.choices(types, weights)[0]
+                    duration = timedelta(minutes=rng.randint(5, 120)) if type != ActivityType.DIAPER else None
+                    yield {
+                        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                        "baby_id": baby_id(i, j), "type": type,
+                        "start_time": start, "end_time": start + duration if duration else None,
+                        "activity_metadata": _activity_metadata(rng, type), "created_by": user_id(i),
+                        "version": 1, "sync_status": SyncStatus.SYNCED, "sync_attempts": 0,
+                        "created_at": start, "updated_at": start,
+                    }
+
+    counts = {}
+    for model, rows in (
+        (User, user_rows()),
+        (Baby, baby_rows()),
+        (CareTeamMember, care_team_rows()),
+        (Activity, activity_rows()),
+    ):
+        count = 0
+        for chunk in _chunks(rows, batch_size):
+            async with engine.begin() as conn:
+                await conn.execute(insert(model.__table__), chunk)
+            count += len(chunk)
+        counts[model.__tablename__] = count
+
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.ext.asyncio import AsyncSession
+        from app.services.rollup import RollupService
+        async with AsyncSession(engine) as db:
+            await RollupService(db).rebuild()
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.exec_driver_sql("ANALYZE")
+    return counts
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///bench.db")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--babies-per-user", type=int, default=1)
+    parser.add_argument("--activities-per-baby", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--random-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.database_url)
+    started = time.perf_counter()
+    counts = await seed(
+        engine,
+        users=args.users,
+        babies_per_user=args.babies_per_user,
+        activities_per_baby=args.activities_per_baby,
+        batch_size=args.batch_size,
+        random_seed=args.random_seed
+    )
+    await engine.dispose()
+    print(f"seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    asyncio.run(main())